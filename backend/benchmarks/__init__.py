@@ -0,0 +1 @@
+# Benchmarks for the NeuroLearn AI backend
@@ -0,0 +1,178 @@
+"""
+Benchmark of the JSON paths used by the API endpoints.
+
+Compares FastAPI's default handling with the fast path in services/fast_json.py:
+
+- responses: response_model revalidation, conversion to Python objects and
+  JSONResponse (json.dumps) versus ModelJSONResponse (pydantic-core / orjson)
+- requests: json.loads followed by model validation versus model_validate_json
+  on the raw body bytes
+
+Payloads mirror the real ones: a /clone response carrying base64 audio, a large
+progress summary, and story / progress summary request bodies.
+
+    python -m benchmarks.json_bench
+    python -m benchmarks.json_bench --audio-mb 8 --repeat 20 --output json_bench.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models.requests import ProgressSummaryRequest, StoryGenerationRequest
+from models.responses import IEPGoalProgress, LearningInsight, ProgressSummaryResponse, VoiceCloneResponse
+from services.fast_json import ModelJSONResponse
+
+
+def clone_response(audio_mb: float) -> VoiceCloneResponse:
+    audio = os.urandom(int(audio_mb * 1024 * 1024))
+    return VoiceCloneResponse(
+        success=True,
+        audio_base64=base64.b64encode(audio).decode("ascii"),
+        output_path="outputs/output.wav",
+        duration_seconds=audio_mb * 1024 * 1024 / (22050 * 2),
+        message="Voice cloning completed successfully",
+    )
+
+
+def progress_summary_response(goals: int) -> ProgressSummaryResponse:
+    return ProgressSummaryResponse(
+        student_name="Alex",
+        time_period="Autumn term",
+        overview="Alex made steady progress across reading and number goals. " * 20,
+        iep_goal_progress=[
+            IEPGoalProgress(
+                goal_id=f"goal_{i}",
+                goal_description=f"Count objects up to {i + 10} with visual supports",
+                current_progress=0.5 + (i % 50) / 100,
+                progress_change=0.05,
+                status="on_track",
+                evidence=[f"Session {j}: counted {j + 5} blocks" for j in range(10)],
+                next_steps=["Introduce number line", "Practice with coins"],
+            )
+            for i in range(goals)
+        ],
+        insights=[
+            LearningInsight(
+                category="attention",
+                insight="Focus improves with movement breaks every 10 minutes",
+                supporting_data="Attention logs",
+                recommendation="Schedule short breaks",
+                priority="high",
+            )
+            for _ in range(goals)
+        ],
+        celebration_highlights=["Counted to 20 independently"] * 10,
+        areas_for_focus=["Subtraction within 10"] * 10,
+        parent_collaboration_summary="Practice counting during daily routines.",
+        recommended_home_activities=["Count stairs", "Sort socks by colour"] * 5,
+        next_meeting_talking_points=["Review counting goal"] * 5,
+        overall_progress_score=0.78,
+        visual_data={"weekly_scores": [[week, 0.5 + week / 100] for week in range(52)]},
+    )
+
+
+def story_request_body(memory_kb: int) -> bytes:
+    return json.dumps({
+        "student_name": "Alex",
+        "subject": "addition up to ten",
+        "memory_context": "Alex loves trains and counting wheels. " * (memory_kb * 1024 // 40),
+        "previous_context": "Last story: the train had 3 carriages.",
+        "characters": ["train driver", "robot"],
+    }).encode("utf-8")
+
+
+def progress_request_body(items: int) -> bytes:
+    return json.dumps({
+        "student_name": "Alex",
+        "time_period": "Autumn term",
+        "progress_data": [
+            {"goal_id": f"goal_{i}", "score": i % 10, "notes": "Counted blocks with support", "tags": ["math", "counting"]}
+            for i in range(items)
+        ],
+        "learning_insights": [{"category": "attention", "insight": "Breaks help"} for _ in range(items // 10)],
+        "visual_progress_data": {"scores": list(range(items))},
+    }).encode("utf-8")
+
+
+def fastapi_default_response(model: Any) -> bytes:
+    field = create_response_field(name="response", type_=type(model))
+    content = asyncio.run(serialize_response(field=field, response_content=model))
+    return JSONResponse(content).body
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 2) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000}
+
+
+def run_benchmark(args) -> Dict[str, Dict[str, Any]]:
+    responses = {
+        "clone_response": clone_response(args.audio_mb),
+        "progress_summary_response": progress_summary_response(args.goals),
+    }
+    requests = {
+        "story_request": (StoryGenerationRequest, story_request_body(args.memory_kb)),
+        "progress_request": (ProgressSummaryRequest, progress_request_body(args.items)),
+    }
+
+    results = {}
+    for name, model in responses.items():
+        default_body = fastapi_default_response(model)
+        fast_body = ModelJSONResponse(model).body
+        # Same document, so clients see no difference
+        assert json.loads(default_body) == json.loads(fast_body), name
+        results[name] = {
+            "bytes": len(fast_body),
+            "default": measure(lambda: fastapi_default_response(model), args.repeat),
+            "fast": measure(lambda: ModelJSONResponse(model).body, args.repeat),
+        }
+    for name, (model_type, body) in requests.items():
+        results[name] = {
+            "bytes": len(body),
+            "default": measure(lambda: model_type.model_validate(json.loads(body)), args.repeat),
+            "fast": measure(lambda: model_type.model_validate_json(body), args.repeat),
+        }
+    return results
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"{'payload':<28}{'bytes':>12}{'default ms':>13}{'fast ms':>11}{'speedup':>10}")
+    for name, result in results.items():
+        default, fast = result["default"]["median_ms"], result["fast"]["median_ms"]
+        print(f"{name:<28}{result['bytes']:>12}{default:>13.2f}{fast:>11.2f}{default / fast:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON request parsing and response rendering")
+    parser.add_argument("--audio-mb", type=float, default=4.0, help="raw audio size in the /clone response")
+    parser.add_argument("--goals", type=int, default=200, help="IEP goals and insights in the progress summary")
+    parser.add_argument("--memory-kb", type=int, default=64, help="memory_context size in the story request")
+    parser.add_argument("--items", type=int, default=2000, help="progress_data items in the progress request")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
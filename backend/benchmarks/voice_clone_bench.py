@@ -0,0 +1,257 @@
+"""
+Per-stage benchmark for VoiceCloneService.clone_voice.
+
+Times each stage of a clone request separately over a fixed corpus of texts
+(benchmarks/fixtures/texts.json) and reference clips, and records real-time
+factor and peak RSS. Results are written as JSON so runs on different commits
+can be compared:
+
+    python -m benchmarks.voice_clone_bench --output before.json
+    python -m benchmarks.voice_clone_bench --output after.json --compare before.json
+
+Runs on CPU by default. Reference clips are synthesized deterministically
+(voiced harmonics with a syllable-rate envelope) unless real recordings are
+passed with --reference.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+STAGES = [
+    "decode_reference",
+    "base_tts",
+    "extract_se",
+    "load_source_se",
+    "tone_conversion",
+    "encode_base64",
+    "audio_duration",
+]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=FIXTURES_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def synthesize_reference_clip(path: str, seconds: float, f0: float, seed: int, sample_rate: int = 22050):
+    """Write a deterministic voice-like clip: harmonics with vibrato, syllable envelope and pauses"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = f0 * (1 + 0.03 * np.sin(2 * np.pi * 5 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    pauses = (np.sin(2 * np.pi * 0.4 * t) > -0.6).astype(np.float64)
+    audio = 0.3 * voice * syllables * pauses + 0.003 * rng.standard_normal(len(t))
+    sf.write(path, (audio / np.max(np.abs(audio)) * 0.8).astype(np.float32), sample_rate)
+
+
+def prepare_references(paths: List[str], work_dir: str) -> List[Dict[str, str]]:
+    if paths:
+        return [{"id": os.path.basename(path), "path": path} for path in paths]
+    references = []
+    for seconds, f0, seed in ((3.0, 120.0, 1), (8.0, 210.0, 2)):
+        path = os.path.join(work_dir, f"reference_{int(seconds)}s.wav")
+        synthesize_reference_clip(path, seconds, f0, seed)
+        references.append({"id": os.path.basename(path), "path": path})
+    return references
+
+
+def run_case(service, text: str, reference_path: str, speed: float, language: str, work_dir: str):
+    """Run one clone request stage by stage, mirroring VoiceCloneService.clone_voice.
+
+    Returns per-stage seconds and the process peak RSS observed after each stage.
+    """
+    timings: Dict[str, float] = {}
+    rss: Dict[str, float] = {}
+
+    def timed(stage: str, fn: Callable[[], Any]):
+        start = time.perf_counter()
+        result = fn()
+        timings[stage] = time.perf_counter() - start
+        rss[stage] = peak_rss_mb()
+        return result
+
+    base_path = os.path.join(work_dir, "base.wav")
+    output_path = os.path.join(work_dir, "output.wav")
+    with open(reference_path, "rb") as reference_file:
+        reference_base64 = base64.b64encode(reference_file.read()).decode("utf-8")
+
+    temp_reference = timed("decode_reference", lambda: service.decode_audio_from_base64(reference_base64))
+    try:
+        timed("base_tts", lambda: service.generate_base_audio(text, base_path, speed=speed, language=language))
+        target_se = timed("extract_se", lambda: service.extract_speaker_embedding(temp_reference))
+        source_se = timed("load_source_se", lambda: service.read_source_embedding(language))
+        timed("tone_conversion", lambda: service.convert_tone(base_path, source_se, target_se, output_path))
+        timed("encode_base64", lambda: service.encode_audio_to_base64(output_path))
+        timed("audio_duration", lambda: service.get_audio_duration(output_path))
+        audio_seconds = sf.info(output_path).duration
+    finally:
+        for path in (temp_reference, base_path, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return timings, rss, audio_seconds
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "max_ms": max(samples) * 1000,
+        "samples": len(samples),
+    }
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    import torch
+    from services.voice_clone_service import VoiceCloneService
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with open(args.texts, "r", encoding="utf-8") as texts_file:
+        texts = json.load(texts_file)
+
+    rss_before_models = peak_rss_mb()
+    start = time.perf_counter()
+    service = VoiceCloneService(device=args.device)
+    init_seconds = time.perf_counter() - start
+    rss_after_models = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory(prefix="voice_clone_bench_") as work_dir:
+        references = prepare_references(args.reference, work_dir)
+        stage_samples: Dict[str, List[float]] = {stage: [] for stage in STAGES + ["total"]}
+        stage_peak_rss: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        rtf_samples: Dict[str, List[float]] = {"base_tts": [], "tone_conversion": [], "total": []}
+        cases = []
+
+        for text in texts:
+            for reference in references:
+                case_samples: Dict[str, List[float]] = {stage: [] for stage in STAGES + ["total"]}
+                audio_seconds = 0.0
+                for iteration in range(args.warmup + args.repeat):
+                    timings, rss, audio_seconds = run_case(
+                        service, text["text"], reference["path"], args.speed, args.language, work_dir
+                    )
+                    if iteration < args.warmup:
+                        continue
+                    timings["total"] = sum(timings.values())
+                    for stage, seconds in timings.items():
+                        case_samples[stage].append(seconds)
+                        stage_samples[stage].append(seconds)
+                    for stage in rtf_samples:
+                        rtf_samples[stage].append(timings[stage] / audio_seconds if audio_seconds else 0.0)
+                    for stage in STAGES:
+                        stage_peak_rss[stage] = max(stage_peak_rss[stage], rss[stage])
+                cases.append({
+                    "text_id": text["id"],
+                    "text_chars": len(text["text"]),
+                    "reference_id": reference["id"],
+                    "reference_seconds": sf.info(reference["path"]).duration,
+                    "audio_seconds": audio_seconds,
+                    "stages": {stage: summarize(samples) for stage, samples in case_samples.items()},
+                })
+                print(f"  {text['id']:<8} x {reference['id']:<20} total "
+                      f"{statistics.median(case_samples['total']) * 1000:8.1f} ms  audio {audio_seconds:5.2f} s")
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "device": service.device,
+        "threads": torch.get_num_threads(),
+        "repeat": args.repeat,
+        "model_init_seconds": init_seconds,
+        "peak_rss_mb": {
+            "before_models": rss_before_models,
+            "after_models": rss_after_models,
+            "end": peak_rss_mb(),
+            "by_stage": stage_peak_rss,
+        },
+        "stages": {stage: summarize(samples) for stage, samples in stage_samples.items()},
+        "real_time_factor": {stage: statistics.median(samples) for stage, samples in rtf_samples.items()},
+        "cases": cases,
+    }
+
+
+def print_results(results: Dict[str, Any]):
+    print(f"\ncommit {results['commit']}  device {results['device']}  threads {results['threads']}  "
+          f"model init {results['model_init_seconds']:.2f}s  peak RSS {results['peak_rss_mb']['end']:.0f} MB")
+    print(f"{'stage':<18}{'median ms':>12}{'mean ms':>12}{'max ms':>12}")
+    for stage, stats in results["stages"].items():
+        print(f"{stage:<18}{stats['median_ms']:>12.1f}{stats['mean_ms']:>12.1f}{stats['max_ms']:>12.1f}")
+    print("real-time factor: " + ", ".join(f"{k} {v:.3f}" for k, v in results["real_time_factor"].items()))
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """Print per-stage changes against a baseline run; return True if any stage regressed"""
+    print(f"\ncompared with {baseline.get('commit')}:")
+    regressed = False
+    for stage, stats in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before or not before["median_ms"]:
+            continue
+        change = stats["median_ms"] / before["median_ms"] - 1
+        flag = ""
+        # Ignore sub-millisecond jitter on the cheap stages
+        if change > threshold and stats["median_ms"] - before["median_ms"] > 1.0:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"  {stage:<18}{before['median_ms']:>10.1f} -> {stats['median_ms']:>10.1f} ms  {change * 100:+6.1f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark VoiceCloneService stages")
+    parser.add_argument("--texts", default=os.path.join(FIXTURES_DIR, "texts.json"))
+    parser.add_argument("--reference", action="append", default=[], help="reference clip (repeatable)")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed median slowdown per stage")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as baseline_file:
+            if compare(results, json.load(baseline_file), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
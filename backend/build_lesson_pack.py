@@ -0,0 +1,72 @@
+"""
+Pre-render a lesson plan into a lesson pack the API serves without live inference.
+
+The plan is JSONL, one story request per line; "subjects" and "speaker_ids"
+lists expand a line into every objective narrated in every voice (speakers must
+be registered through /speakers first). "tenant" is the tenant header value of
+the callers served; without it the pack serves anonymous callers:
+
+    {"tenant": "school-a", "student_name": "Ali", "subjects": ["addition", "subtraction"], "speaker_ids": ["9f2c41d0a7b3e8c5"]}
+
+Stories are generated with the same prompt as live /storygeneration, at most
+--concurrency at a time; narration runs in --narration-workers processes. Finished items are
+checkpointed in <pack>/manifest.jsonl and audio goes to the artifact store, so
+an interrupted build picks up where it stopped when run again:
+
+    python build_lesson_pack.py plans/autumn.jsonl packs/autumn --concurrency 4 --narration-workers 2
+
+Point LESSON_PACK_DIRS at the pack directory to have the API serve it.
+"""
+import argparse
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+from models.requests import StoryGenerationRequest
+from services.artifact_store import ARTIFACTS_DIR, ArtifactStore
+from services.lesson_pack import LessonPackBuilder, load_plan
+from services.llm_backends import create_llm_client
+from services.logging_setup import configure_logging
+from services.story_prompt import build_story_payload
+from services.voice_backends import VOICE_SERVICE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render stories and narration for a lesson plan")
+    parser.add_argument("plan", help="JSONL lesson plan")
+    parser.add_argument("pack_dir", help="directory for the pack manifest")
+    parser.add_argument("--concurrency", type=int, default=4, help="stories generated at once")
+    parser.add_argument("--narration-workers", type=int, default=1, help="narration processes, each loading the voice models")
+    parser.add_argument("--voice-backend", default=VOICE_SERVICE, choices=["openvoice", "stub", "remote"])
+    parser.add_argument("--artifacts-dir", default=ARTIFACTS_DIR, help="artifact store shared with the API")
+    args = parser.parse_args()
+
+    load_dotenv()
+    configure_logging()
+    llm_client = create_llm_client()
+
+    async def generate(request: StoryGenerationRequest) -> str:
+        data = await llm_client.chat_completion(build_story_payload(request), timeout=60.0, operation="lesson_pack")
+        return llm_client.message_content(data)
+
+    builder = LessonPackBuilder(
+        args.pack_dir,
+        generate,
+        ArtifactStore(args.artifacts_dir),
+        concurrency=args.concurrency,
+        narration_workers=args.narration_workers,
+        voice_backend=args.voice_backend
+    )
+    summary = asyncio.run(builder.build(load_plan(args.plan)))
+    print(
+        f"Planned {summary['planned']}, already built {summary['skipped']}, "
+        f"built {summary['built']}, failed {summary['failed']}"
+    )
+    if summary["failed"]:
+        print("Run the same command again to retry failed items")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,17 @@
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, List, Optional
+import orjson
 import statistics
-import httpx
 
 from models.requests import ProgressSummaryRequest
 from models.responses import ProgressSummaryResponse, IEPGoalProgress, LearningInsight
+from services import metrics
+from services.fast_json import dumps
+from services.llm_backends import create_llm_client
+from services.prompt_builder import PromptBuilder, PromptTemplate, SharedPrefixPrompt
 
-class ProgressSummaryChain:
-    def __init__(self):
-        self.api_url = "http://localhost:1234/v1/chat/completions"
-        self.headers = {"Content-Type": "application/json"}
 
-    def _get_progress_prompt_template(self) -> str:
-        return """
-You are an expert educational progress analyst specializing in neurodivergent learners. Analyze the student's progress data and create a comprehensive progress summary for parents and educators.
-
-STUDENT INFORMATION:
-- Name: {student_name}
-- Reporting period: {time_period}
-
-PROGRESS DATA:
-{progress_data}
-
-LEARNING INSIGHTS:
-{learning_insights}
-
-VISUAL PROGRESS DATA:
-{visual_progress_data}
+# Static instructions and schema; identical for every request so the server can reuse its KV-cache
+PROGRESS_SYSTEM_PROMPT = """You are an expert educational progress analyst specializing in neurodivergent learners. Analyze the student's progress data given in the user message and create a comprehensive progress summary for parents and educators.
 
 ANALYSIS REQUIREMENTS:
 1. Provide an overall progress overview
@@ -37,10 +22,10 @@ ANALYSIS REQUIREMENTS:
 
 OUTPUT FORMAT:
 Return a JSON object with the following structure:
-{{
+{
     "overview": "Overall progress summary",
     "iep_goal_progress": [
-        {{
+        {
             "goal_id": "goal identifier",
             "goal_description": "description of the goal",
             "current_progress": 0.75,
@@ -48,16 +33,16 @@ Return a JSON object with the following structure:
             "status": "on track|ahead|needs attention",
             "evidence": ["specific examples of progress"],
             "next_steps": ["recommended next actions"]
-        }}
+        }
     ],
     "insights": [
-        {{
+        {
             "category": "learning pattern|behavior|engagement",
             "insight": "specific observation",
             "supporting_data": "data that supports this insight",
             "recommendation": "actionable recommendation",
             "priority": "high|medium|low"
-        }}
+        }
     ],
     "celebration_highlights": ["positive achievements to celebrate"],
     "areas_for_focus": ["areas that need additional attention"],
@@ -65,10 +50,37 @@ Return a JSON object with the following structure:
     "recommended_home_activities": ["specific activities for home"],
     "next_meeting_talking_points": ["key points for next IEP meeting"],
     "overall_progress_score": 0.78
-}}
+}
+
+Provide a comprehensive, data-driven analysis that supports both celebration and growth."""
+
+# Per-student data comes last, after the shared prefix
+PROGRESS_USER_TEMPLATE = """STUDENT INFORMATION:
+- Name: {student_name}
+- Reporting period: {time_period}
 
-Provide a comprehensive, data-driven analysis that supports both celebration and growth.
-"""
+PROGRESS DATA:
+{progress_data}
+
+LEARNING INSIGHTS:
+{learning_insights}
+
+VISUAL PROGRESS DATA:
+{visual_progress_data}
+
+Generate the progress summary now as a JSON object only."""
+
+
+class ProgressSummaryChain:
+    _progress_prompt = SharedPrefixPrompt(
+        "progress-summary", PROGRESS_SYSTEM_PROMPT, PromptBuilder(PromptTemplate(PROGRESS_USER_TEMPLATE))
+    )
+
+    def __init__(self, llm_client=None):
+        self.llm_client = llm_client or create_llm_client()
+
+    def _get_progress_prompt_template(self) -> SharedPrefixPrompt:
+        return self._progress_prompt
 
     def _process_progress_data(self, request: ProgressSummaryRequest) -> Dict[str, Any]:
         """Process and format progress data for analysis"""
@@ -82,37 +94,32 @@ Provide a comprehensive, data-driven analysis that supports both celebration and
             "student_name": request.student_name,
             "time_period": request.time_period,
             "progress_data": "\n".join(progress_summary),
-            "learning_insights": json.dumps(request.learning_insights, indent=2),
-            "visual_progress_data": json.dumps(request.visual_progress_data or {}, indent=2)
+            "learning_insights": dumps(request.learning_insights, indent=True),
+            "visual_progress_data": dumps(request.visual_progress_data or {}, indent=True)
         }
         
         return processed
 
     async def run(self, request: ProgressSummaryRequest) -> ProgressSummaryResponse:
         """Execute the progress summary chain"""
-        payload = {
+        prompt = self._get_progress_prompt_template()
+        payload = prompt.apply_cache_hints({
             "model": "gemma-3-27b-it",
-            "messages": [
-                {"role": "system", "content": self._get_progress_prompt_template()},
-                {"role": "user", "content": json.dumps(self._process_progress_data(request))}
-            ],
+            "messages": prompt.messages(self._process_progress_data(request)),
             "temperature": 0.2,
             "max_tokens": -1,
             "stream": False
-        }
+        })
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.api_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        data = await self.llm_client.chat_completion(payload, timeout=300.0, operation="progress_chain")
 
-        return self._parse_progress_response(data.get("choices", [{}])[0].get("message", {}).get("content", ""))
+        return self._parse_progress_response(self.llm_client.message_content(data))
     
     def _parse_progress_response(self, llm_output: str) -> ProgressSummaryResponse:
         """Parse LLM output into structured response"""
         try:
             # Try to parse as JSON
-            progress_data = json.loads(llm_output)
+            progress_data = orjson.loads(llm_output)
             
             # Convert IEP goal progress to proper format
             iep_goals = []
@@ -153,8 +160,9 @@ Provide a comprehensive, data-driven analysis that supports both celebration and
                 visual_data=progress_data.get("visual_data")
             )
             
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # Fallback for non-JSON responses
+            metrics.PARSE_FAILURES.labels(kind="progress_chain").inc()
             return ProgressSummaryResponse(
                 student_name="",
                 time_period="",
@@ -1,26 +1,23 @@
 from typing import Dict, Any, Optional, List
-import json
-import httpx
+import orjson
+import logging
+from starlette.concurrency import run_in_threadpool
 
 from models.requests import StoryGenerationRequest
 from models.responses import StoryGenerationResponse, InteractionPoint
+from services import metrics
+from services.llm_backends import LLMUpstreamError, create_llm_client
+from services.logging_setup import log_payload
+from services.prompt_builder import PromptBuilder, PromptTemplate, SharedPrefixPrompt
+from services.story_similarity_cache import StorySimilarityCache, personalize, personalize_characters
+from services.student_memory_index import StudentMemoryIndex, student_key
+from services.tenant_quotas import current_tenant
 
+logger = logging.getLogger(__name__)
 
-class StoryGenerationChain:
-    def __init__(self):
-        self.api_url = "http://localhost:1234/v1/chat/completions"
-        self.headers = {"Content-Type": "application/json"}
-
-    def _get_story_prompt_template(self) -> str:
-        return """
-You are an expert educational content creator specializing in neurodivergent learners. Create a personalized learning story based on the following student profile and requirements.
 
-STUDENT PROFILE:
-- Name: {student_name}
-- Subject area: {subject}
-- Characters: {characters}
-- Memory context: {memory_context}
-{topic_to_be_reached}
+# Static instructions and schema; identical for every request so the server can reuse its KV-cache
+STORY_SYSTEM_PROMPT = """You are an expert educational content creator specializing in neurodivergent learners. Create a personalized learning story based on the student profile and requirements given in the user message.
 
 OUTPUT FORMAT:
 Return a JSON object with the following structure:
@@ -42,30 +39,61 @@ Return a JSON object with the following structure:
     "estimated_duration_minutes": 15
 }
 
-Create an engaging, educational story that makes learning joyful and accessible for this specific student.
-"""
+Create an engaging, educational story that makes learning joyful and accessible for this specific student."""
 
-    def _process_student_data(self, request: StoryGenerationRequest) -> Dict[str, Any]:
+# Per-student data comes last, after the shared prefix
+STORY_USER_TEMPLATE = """STUDENT PROFILE:
+- Name: {student_name}
+- Subject area: {subject}
+- Characters: {characters}
+- Memory context: {memory_context}
+- Previous context: {previous_context}
+{topic_to_be_reached}
+Generate the story now as a JSON object only."""
+
+
+class StoryGenerationChain:
+    _story_prompt = SharedPrefixPrompt("story", STORY_SYSTEM_PROMPT, PromptBuilder(
+        PromptTemplate(STORY_USER_TEMPLATE),
+        optional_fields=("memory_context", "previous_context"),
+        empty_value="No context provided"
+    ))
+
+    def __init__(
+        self,
+        llm_client=None,
+        memory_index: Optional[StudentMemoryIndex] = None,
+        story_cache: Optional[StorySimilarityCache[StoryGenerationResponse]] = None
+    ):
+        self.llm_client = llm_client or create_llm_client()
+        self.memory_index = memory_index
+        self.story_cache = story_cache
+
+    def _get_story_prompt_template(self) -> SharedPrefixPrompt:
+        return self._story_prompt
+
+    def _process_student_data(self, request: StoryGenerationRequest, memory_context: Optional[str] = None) -> Dict[str, Any]:
         data = {
             "student_name": request.student_name,
             "subject": request.subject,
             "characters": ", ".join(request.characters) if request.characters else "None specified",
-            "memory_context": request.memory_context or "No context provided"
+            # Retrieved from the student's memory index when one is configured
+            "memory_context": request.memory_context if memory_context is None else memory_context,
+            "previous_context": request.previous_context
         }
         if request.topic_to_be_reached:
-            data["topic_to_be_reached"] = f"- Topic to be reached: {request.topic_to_be_reached}"
+            data["topic_to_be_reached"] = f"- Topic to be reached: {request.topic_to_be_reached}\n"
         else:
             data["topic_to_be_reached"] = ""
 
         return data
 
     def _parse_story_response(self, llm_output: str) -> StoryGenerationResponse:
-        print(f"Raw LLM output: {llm_output}")
-
         try:
-            story_data = json.loads(llm_output)
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {str(e)}")
+            story_data = orjson.loads(llm_output)
+        except orjson.JSONDecodeError as e:
+            logger.warning("Story JSON parsing error: %s", e)
+            metrics.PARSE_FAILURES.labels(kind="story_chain").inc()
             return StoryGenerationResponse(
                 title="Generated Learning Story",
                 content=llm_output,
@@ -99,52 +127,77 @@ Create an engaging, educational story that makes learning joyful and accessible
             estimated_duration_minutes=story_data.get("estimated_duration_minutes", 15)
         )
 
+    def _personalize_story(
+        self,
+        story: StoryGenerationResponse,
+        cached_request: StoryGenerationRequest,
+        request: StoryGenerationRequest
+    ) -> StoryGenerationResponse:
+        """Adapt a story generated for cached_request to the student and characters of request"""
+        update = {}
+        for field, value in story:
+            if isinstance(value, str):
+                update[field] = personalize(value, cached_request, request)
+            elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+                update[field] = personalize_characters(value, cached_request, request)
+        return story.model_copy(update=update)
+
     async def run(self, request: StoryGenerationRequest) -> StoryGenerationResponse:
-        processed_input = self._process_student_data(request)
-        payload = {
+        if self.story_cache is not None:
+            cached = self.story_cache.lookup(request, current_tenant())
+            if cached is not None:
+                return self._personalize_story(cached[1], cached[0], request)
+
+        memory_context = None
+        # Only students with an explicit id within a tenant have a memory index
+        student = student_key(request, current_tenant()) if self.memory_index is not None else None
+        if student is not None:
+            memory_context = await run_in_threadpool(self.memory_index.context_for, student, request)
+        processed_input = self._process_student_data(request, memory_context)
+        prompt = self._get_story_prompt_template()
+        payload = prompt.apply_cache_hints({
             "model": "gemma-3-27b-it",
-            "messages": [
-                {"role": "system", "content": self._get_story_prompt_template().format(**processed_input)},
-                {"role": "user", "content": json.dumps(processed_input)}
-            ],
+            "messages": prompt.messages(processed_input),
             "temperature": 0.7,
             "max_tokens": 2024,
             "stream": False
-        }
+        })
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(self.api_url, headers=self.headers, json=payload)
-                response.raise_for_status()
-                data = response.json()
-
-                print(f"Response headers: {response.headers}")
-                print(f"Response body: {data}")
-
-                raw_content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-
-                if isinstance(raw_content, str):
-                    return self._parse_story_response(raw_content)
-                else:
-                    return StoryGenerationResponse(
-                        title="Generated Learning Story",
-                        content=str(raw_content),
-                        characters=[],
-                        learning_points=[],
-                        interaction_points=[],
-                        vocabulary_words=[],
-                        comprehension_questions=[],
-                        adaptation_notes="Manual adaptation may be needed",
-                        estimated_duration_minutes=15
-                    )
-
-        except httpx.HTTPError as e:
-            print(f"HTTP error: {str(e)}")
-        except Exception as e:
-            import traceback
-            print(f"Unexpected error: {str(e)}")
-            print(traceback.format_exc())
-
+            data = await self.llm_client.chat_completion(payload, timeout=60.0, operation="story_chain")
+
+            log_payload(logger, "story_chain", "llm_response", data)
+
+            raw_content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+            if isinstance(raw_content, str):
+                story = self._parse_story_response(raw_content)
+                if student is not None and story.content:
+                    await run_in_threadpool(self.memory_index.add_story, student, story.content)
+                if self.story_cache is not None and story.content:
+                    # Keyed on the context the prompt actually carried, so personal stories are not shared
+                    prompt_request = request if memory_context is None else request.model_copy(update={"memory_context": memory_context})
+                    self.story_cache.store(prompt_request, story, current_tenant())
+                return story
+            else:
+                return StoryGenerationResponse(
+                    title="Generated Learning Story",
+                    content=str(raw_content),
+                    characters=[],
+                    learning_points=[],
+                    interaction_points=[],
+                    vocabulary_words=[],
+                    comprehension_questions=[],
+                    adaptation_notes="Manual adaptation may be needed",
+                    estimated_duration_minutes=15
+                )
+
+        except LLMUpstreamError as e:
+            logger.error("Story chain LLM error: %s", e)
+        except Exception:
+            logger.exception("Unexpected story chain error")
+
+        metrics.FALLBACKS.labels(kind="story_chain_error").inc()
         return StoryGenerationResponse(
             title="Generated Learning Story",
             content="An error occurred during story generation.",
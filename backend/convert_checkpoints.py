@@ -0,0 +1,46 @@
+"""
+Convert OpenVoice checkpoints to safetensors for memory-mapped loading.
+
+Writes `checkpoint.safetensors` next to every `checkpoint.pth` under the given
+directory (OpenVoice/checkpoints by default). VoiceCloneService picks the
+converted files up automatically.
+
+    python convert_checkpoints.py
+    python convert_checkpoints.py OpenVoice/checkpoints --force
+
+Checkpoints holding objects that `torch.load(weights_only=True)` refuses need
+--trust-pickle, which unpickles them fully; only use it on trusted files.
+"""
+import argparse
+import os
+
+from services.checkpoints import convert_checkpoint, safetensors_path
+
+
+DEFAULT_CHECKPOINTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "OpenVoice", "checkpoints")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert OpenVoice checkpoints to safetensors")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_CHECKPOINTS_DIR)
+    parser.add_argument("--force", action="store_true", help="overwrite existing conversions")
+    parser.add_argument("--trust-pickle", action="store_true",
+                        help="fully unpickle checkpoints that weights_only loading rejects (trusted files only)")
+    args = parser.parse_args()
+
+    converted = 0
+    for root, _, files in os.walk(args.directory):
+        if "checkpoint.pth" not in files:
+            continue
+        checkpoint_path = os.path.join(root, "checkpoint.pth")
+        if os.path.exists(safetensors_path(checkpoint_path)) and not args.force:
+            print(f"⏭️  {checkpoint_path} already converted")
+            continue
+        output_path = convert_checkpoint(checkpoint_path, trust_pickle=args.trust_pickle)
+        print(f"✅ {checkpoint_path} -> {output_path}")
+        converted += 1
+    print(f"Converted {converted} checkpoint(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,12 @@ This script demonstrates how to test both LangChain flows:
 
 import asyncio
 import json
+import os
 import httpx
 from typing import Dict, Any
 
-BASE_URL = "http://localhost:8000"
+# Point at another instance with BASE_URL=http://localhost:8001
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 
 # Test data for story generation
 story_request_data = {
@@ -244,7 +246,7 @@ async def test_health_check():
                 
         except Exception as e:
             print(f"❌ Error during health check: {e}")
-            print("💡 Make sure the backend is running at http://localhost:8000")
+            print(f"💡 Make sure the backend is running at {BASE_URL}")
             return False
 
 async def main():
@@ -0,0 +1 @@
+# Load generation and replay tools for the NeuroLearn AI API
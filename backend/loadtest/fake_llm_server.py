@@ -0,0 +1,134 @@
+"""
+Fake OpenAI-compatible chat completions server for load testing.
+
+Answers /v1/chat/completions with canned stories or progress summaries after a
+configurable time-to-first-token and decode rate, with or without streaming.
+
+    python -m loadtest.fake_llm_server --port 1235 --latency 0.3 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+FIRST_TOKEN_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.3"))
+TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "40"))
+
+PLAIN_STORY = (
+    "Ali the astronaut had 2 stars. Then he found 2 more. "
+    "He counted: 2 + 2 = 4 stars. How many stars does Ali have now?"
+)
+
+JSON_STORY = json.dumps({
+    "title": "Ali Counts the Stars",
+    "content": PLAIN_STORY,
+    "characters": ["Ali"],
+    "learning_points": ["Adding two small numbers"],
+    "interaction_points": [
+        {"type": "question", "prompt": "How many stars?", "expected_responses": ["4", "four"]}
+    ],
+    "vocabulary_words": ["count"],
+    "comprehension_questions": ["How many stars did Ali find?"],
+    "adaptation_notes": "Use fingers to count along.",
+    "estimated_duration_minutes": 5
+})
+
+PROGRESS_SUMMARY = json.dumps({
+    "student_name": "Ali",
+    "time_period": "This week",
+    "overview": "Steady progress in early addition.",
+    "iep_goal_progress": [],
+    "insights": [],
+    "celebration_highlights": ["Counted to ten independently"],
+    "areas_for_focus": ["Subtraction within five"],
+    "parent_collaboration_summary": "Practice counting objects at home.",
+    "recommended_home_activities": ["Count toys while tidying up"],
+    "next_meeting_talking_points": ["Introduce subtraction"],
+    "overall_progress_score": 0.7
+})
+
+app = FastAPI(title="Fake LLM Server")
+app.state.latency = FIRST_TOKEN_LATENCY_SECONDS
+app.state.tokens_per_second = TOKENS_PER_SECOND
+
+
+def _pick_response(messages: List[Dict[str, Any]]) -> str:
+    system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if "progress" in system_prompt.lower():
+        return PROGRESS_SUMMARY
+    if "JSON object" in system_prompt:
+        return JSON_STORY
+    return PLAIN_STORY
+
+
+def _tokens(text: str) -> List[str]:
+    # Word-sized pieces are close enough to real decode granularity
+    return [word + " " for word in text.split(" ")]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = _pick_response(body.get("messages", []))
+    tokens = _tokens(content)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    model = body.get("model", "fake")
+    token_delay = 1.0 / app.state.tokens_per_second if app.state.tokens_per_second > 0 else 0.0
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(app.state.latency)
+            for token in tokens:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(app.state.latency + token_delay * len(tokens))
+    prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+    return JSONResponse({
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_chars // 4 + len(tokens),
+        },
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1235)
+    parser.add_argument("--latency", type=float, default=FIRST_TOKEN_LATENCY_SECONDS,
+                        help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=TOKENS_PER_SECOND)
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.tokens_per_second = args.tokens_per_second
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Replay a JSONL request corpus against the NeuroLearn AI API and report latency.
+
+Each corpus line describes one request:
+
+    {"path": "/storygeneration", "json": {"student_name": "Ali", "subject": "addition"}}
+    {"path": "/clone", "form": {"text": "Hello", "speed": "1.0", "language": "English", "output_filename": "lt"}}
+
+Lines are replayed in order (cycling through the file) either open-loop at a
+fixed request rate (--rate) or closed-loop with a fixed number of concurrent
+clients (--concurrency). With --spawn the harness starts the API itself with
+the stub voice service and the fake LLM server, so runs are reproducible on
+any machine:
+
+    python -m loadtest.runner --spawn --concurrency 8 --requests 200
+    python -m loadtest.runner --base-url http://localhost:8000 --rate 5 --duration 60 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.stub_voice_clone_service import silent_wav_bytes
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.jsonl")
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    with open(path, "r", encoding="utf-8") as corpus_file:
+        for line_number, line in enumerate(corpus_file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            if "path" not in entry:
+                raise ValueError(f"{path}:{line_number}: corpus entries need a 'path'")
+            entries.append(entry)
+    if not entries:
+        raise ValueError(f"{path}: corpus is empty")
+    return entries
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_byte: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status_codes: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, latency: float, first_byte: Optional[float], status: int, ok: bool):
+        self.latencies[endpoint].append(latency)
+        if first_byte is not None:
+            self.first_byte[endpoint].append(first_byte)
+        self.status_codes[endpoint][status] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            first_byte = sorted(self.first_byte.get(endpoint, []))
+            endpoints[endpoint] = {
+                "requests": len(ordered),
+                "errors": self.errors[endpoint],
+                "error_rate": self.errors[endpoint] / len(ordered),
+                "throughput_rps": len(ordered) / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": percentile(ordered, 0.50) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "ttfb_p50_ms": percentile(first_byte, 0.50) * 1000,
+                "status_codes": {str(code): count for code, count in sorted(self.status_codes[endpoint].items())},
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "total_requests": total,
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": total / elapsed if elapsed > 0 else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def print_summary(summary: Dict[str, Any]):
+    print(f"\n{summary['total_requests']} requests in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['throughput_rps']:.2f} req/s, {summary['total_errors']} errors)\n")
+    header = f"{'endpoint':<28}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttfb ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"{endpoint:<28}{stats['requests']:>7}{stats['error_rate'] * 100:>6.1f}%{stats['throughput_rps']:>8.2f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['ttfb_p50_ms']:>10.1f}")
+
+
+def body_reports_success(content_type: str, body: bytes) -> bool:
+    """Detect failures that the API reports with a 200 status"""
+    if content_type.startswith("application/x-ndjson"):
+        # Streaming endpoints end with a "done" or "error" chunk
+        lines = body.strip().splitlines()
+        return bool(lines) and json.loads(lines[-1]).get("type") != "error"
+    if content_type.startswith("application/json") and body[:1] == b"{":
+        # /clone returns {"success": false, ...}
+        return json.loads(body).get("success", True) is not False
+    return True
+
+
+async def send(client: httpx.AsyncClient, entry: Dict[str, Any], results: Results):
+    endpoint = entry.get("name") or entry["path"]
+    method = entry.get("method", "POST").upper()
+    kwargs: Dict[str, Any] = {}
+    if "json" in entry:
+        kwargs["json"] = entry["json"]
+    if "form" in entry:
+        kwargs["data"] = entry["form"]
+
+    start = time.perf_counter()
+    first_byte = None
+    status = 0
+    ok = False
+    try:
+        async with client.stream(method, entry["path"], **kwargs) as response:
+            status = response.status_code
+            content_type = response.headers.get("content-type", "")
+            body = b""
+            async for chunk in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                body += chunk
+        ok = status < 400 and body_reports_success(content_type, body)
+    except (httpx.HTTPError, json.JSONDecodeError):
+        ok = False
+    results.record(endpoint, time.perf_counter() - start, first_byte, status, ok)
+
+
+async def replay(
+    corpus: List[Dict[str, Any]],
+    base_url: str,
+    rate: Optional[float],
+    concurrency: int,
+    total_requests: Optional[int],
+    duration: Optional[float],
+    timeout: float,
+) -> Results:
+    results = Results()
+    deadline = time.perf_counter() + duration if duration else None
+    limits = httpx.Limits(max_connections=max(concurrency, 100), max_keepalive_connections=max(concurrency, 20))
+    issued = 0
+
+    def next_entry() -> Optional[Dict[str, Any]]:
+        nonlocal issued
+        if total_requests is not None and issued >= total_requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        entry = corpus[issued % len(corpus)]
+        issued += 1
+        return entry
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(timeout), limits=limits) as client:
+        if rate:
+            # Open loop: arrivals do not wait for earlier responses
+            tasks = []
+            interval = 1.0 / rate
+            next_send = time.perf_counter()
+            while (entry := next_entry()) is not None:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(client, entry, results)))
+                next_send += interval
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: each worker sends its next request when the previous one completes
+            async def worker():
+                while (entry := next_entry()) is not None:
+                    await send(client, entry, results)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    results.finished = time.perf_counter()
+    return results
+
+
+def _wait_until_healthy(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited early with code {process.returncode}: {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def spawn_stack(args) -> List[subprocess.Popen]:
+    """Start the fake LLM server and the API with the stub voice service"""
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "loadtest.fake_llm_server", "--port", str(args.llm_port),
+         "--latency", str(args.llm_latency), "--tokens-per-second", str(args.llm_tokens_per_second)],
+        cwd=BACKEND_DIR,
+    )
+    env = dict(
+        os.environ,
+        VOICE_SERVICE="stub",
+        STUB_VOICE_LATENCY_SECONDS=str(args.voice_latency),
+        LLM_API_URL=f"http://127.0.0.1:{args.llm_port}/v1/chat/completions",
+        # The corpus asks for simple arithmetic, which templates would otherwise answer once the LLM is busy
+        STORY_TEMPLATES_MODE=os.getenv("STORY_TEMPLATES_MODE", "off"),
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(args.api_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    processes = [llm, api]
+    try:
+        _wait_until_healthy(f"http://127.0.0.1:{args.llm_port}/docs", llm)
+        _wait_until_healthy(f"http://127.0.0.1:{args.api_port}/health", api)
+    except Exception:
+        stop_stack(processes)
+        raise
+    return processes
+
+
+def stop_stack(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def upload_reference_audio(base_url: str, path: Optional[str]):
+    """Save a reference voice so corpus /clone entries can omit the upload"""
+    audio = open(path, "rb").read() if path else silent_wav_bytes(1.0)
+    response = httpx.post(
+        f"{base_url}/save-reference-audio",
+        files={"reference_audio": ("reference.wav", audio, "audio/wav")},
+        timeout=30.0,
+    )
+    response.raise_for_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a JSONL corpus against the NeuroLearn AI API")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--rate", type=float, help="open-loop arrival rate in requests per second")
+    parser.add_argument("--concurrency", type=int, default=4, help="closed-loop concurrent clients")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--duration", type=float, help="stop issuing requests after this many seconds")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="write the JSON summary to this file")
+    parser.add_argument("--reference-audio", help="reference voice to upload before the run")
+    parser.add_argument("--skip-reference-upload", action="store_true")
+
+    spawn = parser.add_argument_group("self-contained run")
+    spawn.add_argument("--spawn", action="store_true",
+                       help="start the API with the stub voice service and the fake LLM server")
+    spawn.add_argument("--api-port", type=int, default=8010)
+    spawn.add_argument("--llm-port", type=int, default=1235)
+    spawn.add_argument("--llm-latency", type=float, default=0.3, help="fake LLM time to first token")
+    spawn.add_argument("--llm-tokens-per-second", type=float, default=40.0)
+    spawn.add_argument("--voice-latency", type=float, default=0.5, help="stub voice service delay per call")
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = len(load_corpus(args.corpus))
+
+    processes = []
+    if args.spawn:
+        processes = spawn_stack(args)
+        args.base_url = f"http://127.0.0.1:{args.api_port}"
+
+    try:
+        if not args.skip_reference_upload:
+            upload_reference_audio(args.base_url, args.reference_audio)
+        results = asyncio.run(replay(
+            load_corpus(args.corpus),
+            args.base_url,
+            rate=args.rate,
+            concurrency=args.concurrency,
+            total_requests=args.requests,
+            duration=args.duration,
+            timeout=args.timeout,
+        ))
+    finally:
+        stop_stack(processes)
+
+    summary = results.summary()
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(summary, output_file, indent=2)
+    return 1 if summary["total_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
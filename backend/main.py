@@ -1,100 +1,109 @@
 import os
-import json
+import math
 import logging
-import httpx
 import uvicorn
-import shutil
 import base64
-import re
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+import uuid
+from fastapi import Depends, FastAPI, HTTPException, UploadFile, File, Form, Header, Query, Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from typing import Dict, Optional
 
-from services.voice_clone_service import VoiceCloneService
+from services.llm_backends import LLMUpstreamError, create_llm_client
+from services.llm_client import estimate_payload_tokens
+from services.voice_backends import create_voice_clone_service
+from services import metrics
+from services.fast_json import ModelJSONResponse, dumps, json_body, json_body_openapi
+from services.metrics import MetricsMiddleware, render_metrics
+from services.logging_setup import configure_logging, log_payload
+from services.profiling import PROFILE_MAX_SECONDS, ProfilingMiddleware, is_admin_token, profile_for, profile_store
+from services.text_cleaning import clean_narration_sentence, clean_story_text, replace_math_symbols
+from services.story_pregeneration_service import PREGENERATION_ENABLED, StoryPregenerationService
+from services.speaker_embedding_store import SpeakerEmbeddingStore
+from services.audio_upload import StoredUpload, UploadLimitMiddleware, UploadTooLargeError, file_sha256, save_upload
+from services.reference_audio import preprocess_to_file
+from services.story_narration_pipeline import StoryNarrationPipeline
+from services.artifact_store import ArtifactStore, artifact_response
+from services.tenant_quotas import TTS_SECONDS, TenantLease, current_tenant, estimate_tts_seconds, fair_share, record_usage, tenant_lease
+from services.student_memory_index import STUDENT_MEMORY_ENABLED, StudentMemoryIndex, student_key
+from services.story_similarity_cache import STORY_CACHE_ENABLED, StorySimilarityCache, personalize
+from services.lesson_pack import LESSON_PACK_DIRS, LessonPackIndex
+from services.story_prompt import build_story_payload
+from services.story_templates import STORY_TEMPLATES_MODE, render_story, template_story
 from models.requests import (
     StoryGenerationRequest,
     ProgressSummaryRequest,
     VoiceCloneRequest,
+    StoryNarrationRequest,
 )
 from models.responses import (
     StoryGenerationResponse,
     ProgressSummaryResponse,
     VoiceCloneResponse,
-    InteractionPoint
+    InteractionPoint,
+    SpeakerRegistrationResponse,
+    StoryNarrationChunk,
 )
 from models.enums import DifficultyLevel
+from services.prompt_builder import (
+    CHARS_PER_TOKEN,
+    apply_cache_hints,
+    estimate_tokens,
+    prompt_cache_key,
+)
 
 # Load environment variables
 load_dotenv()
 
 # Define paths for audio storage
-REFERENCE_AUDIO_PATH = os.path.join(os.path.dirname(__file__), "uploads", "reference_audio.wav")
+UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+OUTPUTS_DIR = os.path.join(os.path.dirname(__file__), "outputs")
+REFERENCE_AUDIO_PATH = os.path.join(UPLOADS_DIR, "reference_audio.wav")
 
-# Ensure uploads directory exists
-os.makedirs(os.path.dirname(REFERENCE_AUDIO_PATH), exist_ok=True)
+# Ensure uploads and outputs directories exist
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+os.makedirs(OUTPUTS_DIR, exist_ok=True)
 
 app = FastAPI(
     title="NeuroLearn AI API",
     description="AI-powered educational content generation for neurodivergent learners with Text-to-Speech capabilities",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
+# Added before CORS so 413 rejections still carry CORS headers
+app.add_middleware(UploadLimitMiddleware, paths=["/save-reference-audio", "/clone", "/speakers"])
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Type"],
+    expose_headers=["Content-Type", "Server-Timing", "X-Profile-Id", "Retry-After", "ETag", "Accept-Ranges", "Content-Range", "Content-Length"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+configure_logging()
+logger = logging.getLogger("neurolearn")
+
 
-logging.basicConfig(level=logging.INFO)
-voice_clone_service = VoiceCloneService()
-
-
-def clean_story_text(text: str) -> str:
-    """Clean and normalize story text from encoding issues"""
-    if not text:
-        return ""
-    
-    # Fix common UTF-8 encoding issues
-    cleaned_text = text
-    
-    # Handle smart quotes and apostrophes
-    cleaned_text = cleaned_text.replace('"', '"')  # Left double quote
-    cleaned_text = cleaned_text.replace('"', '"')  # Right double quote
-    cleaned_text = cleaned_text.replace(''', "'")  # Left single quote
-    cleaned_text = cleaned_text.replace(''', "'")  # Right single quote
-    cleaned_text = cleaned_text.replace('´', "'")  # Acute accent
-    cleaned_text = cleaned_text.replace('`', "'")  # Grave accent
-    
-    # Handle em dashes and en dashes
-    cleaned_text = cleaned_text.replace('—', '-')  # Em dash
-    cleaned_text = cleaned_text.replace('–', '-')  # En dash
-    
-    # Handle ellipsis
-    cleaned_text = cleaned_text.replace('…', '...')
-    
-    # Handle common encoding artifacts
-    cleaned_text = cleaned_text.replace('â€™', "'")  # Common apostrophe encoding
-    cleaned_text = cleaned_text.replace('â€œ', '"')  # Common left quote encoding
-    cleaned_text = cleaned_text.replace('â€', '"')   # Common right quote encoding
-    cleaned_text = cleaned_text.replace('â€"', '-')  # Common dash encoding
-    cleaned_text = cleaned_text.replace('Ã¢â‚¬â„¢', "'")  # Another apostrophe variant
-    cleaned_text = cleaned_text.replace('â', "'")    # Generic â replacement
-    
-    # Remove any remaining non-printable characters except newlines and tabs
-    cleaned_text = re.sub(r'[^\x20-\x7E\n\t]', '', cleaned_text)
-    
-    # Normalize whitespace
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-    cleaned_text = cleaned_text.strip()
-    
-    return cleaned_text
+voice_clone_service = create_voice_clone_service()
+llm_client = create_llm_client()
+speaker_embedding_store = SpeakerEmbeddingStore()
+artifact_store = ArtifactStore()
+student_memory_index = StudentMemoryIndex() if STUDENT_MEMORY_ENABLED else None
+story_cache: Optional[StorySimilarityCache[str]] = StorySimilarityCache("story") if STORY_CACHE_ENABLED else None
+lesson_packs = LessonPackIndex(LESSON_PACK_DIRS) if LESSON_PACK_DIRS else None
+
+PROGRESS_SYSTEM_PROMPT = "You are an expert educational progress analyst specializing in neurodivergent learners. Analyze the student's progress data and create a comprehensive progress summary for parents and educators."
+PROGRESS_PROMPT_CACHE_KEY = prompt_cache_key("classroom-progress", PROGRESS_SYSTEM_PROMPT)
+PROGRESS_MAX_TOKENS = 1024
 
 
 @app.get("/")
@@ -102,84 +111,175 @@ async def root():
     return {"message": "NeuroLearn AI LangChain Backend is running"}
 
 
-@app.post("/storygeneration", response_model=StoryGenerationResponse)
-async def generate_story_from_lmstudio(request: StoryGenerationRequest) -> StoryGenerationResponse:
-    try:
-        url = "http://localhost:1234/v1/chat/completions"
-        headers = {"Content-Type": "application/json"}
+async def with_student_memory(request: StoryGenerationRequest) -> StoryGenerationRequest:
+    """Replace the request's memory context with the relevant part of the student's history"""
+    student = student_key(request, current_tenant())
+    if student_memory_index is None or student is None:
+        return request
+    memory_context = await run_in_threadpool(student_memory_index.context_for, student, request)
+    return request.model_copy(update={"memory_context": memory_context})
 
-        prompt = f"""
-You are a teacher helping a young neurodivergent student understand a basic math or science concept through a very short story.
 
-### Instructions:
-- Use the student profile below to create a **simple story** that includes both a fun situation **and** teaches the core concept (e.g., addition, subtraction, fractions).
-- Be very clear and supportive. Say the steps out loud in the story.
-- Show how to solve the problem inside the story (e.g., "3 + 1 = 4").
-- Avoid using complex words, JSON formatting, or markdown.
-- End the story with a question to involve the student, based on what was just taught.
+async def generate_story_text(request: StoryGenerationRequest, operation: str = "story") -> str:
+    """Generate and clean a classroom story for the request via the LLM backend"""
+    request = await with_student_memory(request)
+    payload = build_story_payload(request)
 
-### Student Profile:
-- Name: {request.student_name}
-- Age: 3-6
-- Subject and Concept: {request.subject}
-- Memory Context: {request.memory_context or 'None'}
-- Characters: {', '.join(request.characters) if request.characters else 'None'}
+    log_payload(logger, operation, "llm_request", payload)
 
-Keep it short and friendly (about 2–4 lines). Example:
-"Ali the astronaut had 2 stars. Then he found 2 more. He counted: 2 + 2 = 4 stars. How many stars does Ali have now?"
-"""
+    data = await llm_client.chat_completion(payload, timeout=60.0, operation=operation)
 
+    log_payload(logger, operation, "llm_response", data)
 
-        payload = {
-            "model": "gemma-3-27b-it",
-            "messages": [
-                {"role": "system", "content": prompt.strip()},
-                {"role": "user", "content": "Generate the story now as plain text only."}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 256,
-            "stream": False
-        }
+    story_text = llm_client.message_content(data).strip()
+
+    if not story_text:
+        raise ValueError("Empty response from the LLM backend.")
 
-        logging.info(f"📤 Sending to LM Studio:\n{json.dumps(payload, indent=2)}")
+    # Clean the story text to fix encoding issues and spell out math symbols
+    cleaned_story = replace_math_symbols(clean_story_text(story_text))
+    logger.debug("Story cleaned", extra={"raw_chars": len(story_text), "cleaned_chars": len(cleaned_story)})
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0)) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+    if story_cache is not None:
+        story_cache.store(request, cleaned_story, current_tenant())
 
-        logging.info(f"📥 LM Studio response:\n{json.dumps(data, indent=2)}")
+    return cleaned_story
 
-        story_text = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
 
-        if not story_text:
-            raise ValueError("Empty response from LM Studio.")
+story_narration_pipeline = StoryNarrationPipeline(llm_client, voice_clone_service, clean_narration_sentence, artifact_store)
+
+story_pregeneration_service = StoryPregenerationService(
+    generate=lambda request: generate_story_text(request, operation="story_pregeneration"),
+    is_idle=lambda: llm_client.is_idle
+)
+
+
+@app.on_event("startup")
+async def start_story_pregeneration():
+    if PREGENERATION_ENABLED:
+        await story_pregeneration_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_story_pregeneration():
+    await story_pregeneration_service.stop()
 
-        # Clean the story text to fix encoding issues
-        cleaned_story = clean_story_text(story_text)
-        
-        logging.info(f"📝 Original story: {story_text}")
-        logging.info(f"✨ Cleaned story: {cleaned_story}")
 
-        cleaned_story = cleaned_story.replace("×", " multiplied by").replace("÷", " divided by ").replace("=", " equals").replace("+", " plus ").replace("-", " minus ")
-        
-        logging.info(f"🔢 Math symbols replaced: {cleaned_story}")
+def upstream_http_error(error: LLMUpstreamError, action: str) -> HTTPException:
+    """502/503/504 for LLM backend failures, with Retry-After while every circuit is open"""
+    headers = {"Retry-After": str(max(math.ceil(error.retry_after), 1))} if error.retry_after else None
+    return HTTPException(status_code=error.status_code, detail=f"{action}: {error}", headers=headers)
 
-        return StoryGenerationResponse(content=cleaned_story)
 
+@app.post("/storygeneration", response_model=StoryGenerationResponse, openapi_extra=json_body_openapi(StoryGenerationRequest))
+async def generate_story_from_lmstudio(
+    request: StoryGenerationRequest = json_body(StoryGenerationRequest),
+    lease: TenantLease = Depends(tenant_lease)
+) -> ModelJSONResponse:
+    packed = lesson_pack_lookup(lesson_packs.story_for, request, lease.tenant) if lesson_packs is not None else None
+    # Simple arithmetic concepts, or any recognized concept while the LLM is saturated, skip the LLM
+    templated = template_story(request, llm_client.in_flight) if packed is None else None
+    if packed is None and templated is None:
+        lease.admit(llm_tokens=estimate_payload_tokens(build_story_payload(request)))
+    try:
+        cleaned_story = None
+        # Students with a memory index get their retrieved memories, which a pre-generated or cached story lacks
+        personalized = student_memory_index is not None and student_key(request, lease.tenant) is not None
+        if PREGENERATION_ENABLED and packed is None and templated is None and not personalized:
+            cleaned_story = story_pregeneration_service.take(request, lease.tenant)
+        if packed is not None:
+            cleaned_story = packed["content"]
+            logger.info("📦 Serving lesson-pack story", extra={"student": request.student_name})
+        elif templated is not None:
+            templated_story, reason = templated
+            cleaned_story = replace_math_symbols(clean_story_text(templated_story))
+            metrics.TEMPLATE_STORIES.labels(reason=reason).inc()
+            logger.info("🧩 Serving template story", extra={"student": request.student_name})
+        elif cleaned_story is not None:
+            logger.info("⚡ Serving pre-generated story", extra={"student": request.student_name})
+        elif story_cache is not None and not personalized and (cached := story_cache.lookup(request, lease.tenant)) is not None:
+            cached_request, cached_story = cached
+            cleaned_story = personalize(cached_story, cached_request, request)
+            logger.info("⚡ Serving near-duplicate cached story", extra={"student": request.student_name})
+        else:
+            try:
+                cleaned_story = await generate_story_text(request)
+            except LLMUpstreamError:
+                # The LLM is down: simple concepts still get a story
+                if STORY_TEMPLATES_MODE == "off" or (fallback := render_story(request)) is None:
+                    raise
+                cleaned_story = replace_math_symbols(clean_story_text(fallback))
+                metrics.TEMPLATE_STORIES.labels(reason="upstream_error").inc()
+                logger.warning("🧩 LLM unavailable, serving template story", extra={"student": request.student_name})
+
+        if PREGENERATION_ENABLED and templated is None and not personalized:
+            story_pregeneration_service.observe(request, lease.tenant)
+        if student_memory_index is not None and (student := student_key(request, lease.tenant)) is not None:
+            await run_in_threadpool(student_memory_index.add_story, student, cleaned_story)
+
+        artifact = await run_in_threadpool(artifact_store.put_text, cleaned_story)
+        return ModelJSONResponse(StoryGenerationResponse(content=cleaned_story, url=artifact.url))
+
+    except LLMUpstreamError as e:
+        logger.error("🔥 Story generation upstream error: %s", e)
+        raise upstream_http_error(e, "Story generation failed")
     except Exception as e:
-        logging.error("🔥 Story generation error:\n")
+        logger.exception("🔥 Story generation error")
         raise HTTPException(status_code=500, detail=f"Story generation failed: {str(e)}")
 
 @app.post("/save-reference-audio")
 async def save_reference_audio(reference_audio: UploadFile = File(...)):
     """Save uploaded reference audio file to backend storage"""
     try:
-        with open(REFERENCE_AUDIO_PATH, "wb") as buffer:
-            shutil.copyfileobj(reference_audio.file, buffer)
-        return {"success": True, "message": "Reference audio saved successfully", "path": REFERENCE_AUDIO_PATH}
+        stored = await save_upload(reference_audio, REFERENCE_AUDIO_PATH)
+        # Decode, resample and trim the voice once now rather than on every clone
+        preprocessed_path = speaker_embedding_store.audio_path(stored.speaker_id)
+        if not os.path.exists(preprocessed_path):
+            await run_in_threadpool(preprocess_to_file, REFERENCE_AUDIO_PATH, preprocessed_path)
+        return {
+            "success": True,
+            "message": "Reference audio saved successfully",
+            "path": REFERENCE_AUDIO_PATH,
+            "sha256": stored.sha256
+        }
+    except UploadTooLargeError as e:
+        return ORJSONResponse(status_code=413, content={"success": False, "message": str(e)})
+    except ValueError as e:
+        return ORJSONResponse(status_code=400, content={"success": False, "message": str(e)})
     except Exception as e:
-        return JSONResponse(status_code=500, content={"success": False, "message": f"Failed to save reference audio: {str(e)}"})
+        return ORJSONResponse(status_code=500, content={"success": False, "message": f"Failed to save reference audio: {str(e)}"})
+
+
+async def _store_reference_upload(reference_audio: UploadFile) -> StoredUpload:
+    """Stream an uploaded reference recording to a temporary file, mapping limit errors to HTTP errors"""
+    try:
+        return await save_upload(reference_audio, os.path.join(UPLOADS_DIR, f"upload_{uuid.uuid4().hex}.wav"))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _register_reference(speaker_id: str, audio_path: str) -> bool:
+    """Register the embedding of a reference recording unless known, preprocessing it first if needed"""
+    if speaker_embedding_store.exists(speaker_id):
+        return False
+    preprocessed_path = speaker_embedding_store.audio_path(speaker_id)
+    if not os.path.exists(preprocessed_path):
+        await run_in_threadpool(preprocess_to_file, audio_path, preprocessed_path)
+    return await run_in_threadpool(
+        speaker_embedding_store.register,
+        speaker_id,
+        lambda: voice_clone_service.extract_speaker_embedding(preprocessed_path)
+    )
+
+
+def _read_base64(path: str) -> str:
+    with open(path, "rb") as audio_file:
+        audio_bytes = audio_file.read()
+    with metrics.timed(metrics.CODEC_SECONDS, operation="encode_audio_base64"):
+        return base64.b64encode(audio_bytes).decode("utf-8")
+
 
 @app.post("/clone", response_model=VoiceCloneResponse)
 async def clone_voice(
@@ -187,43 +287,64 @@ async def clone_voice(
     speed: float = Form(...),
     language: str = Form(...),
     output_filename: str = Form(...),
-    reference_audio: Optional[UploadFile] = File(None)
-) -> VoiceCloneResponse:
-    """Clone voice using reference audio and generate speech"""
+    reference_audio: Optional[UploadFile] = File(None),
+    inline_audio: bool = Form(True),
+    lease: TenantLease = Depends(tenant_lease)
+) -> ModelJSONResponse:
+    """Clone voice using reference audio and generate speech.
+
+    The audio is also stored as a content-addressed artifact at audio_url;
+    with inline_audio=false the base64 copy is left out of the response.
+    """
+    tts_seconds = estimate_tts_seconds(len(text), speed)
+    lease.admit(tts_seconds=tts_seconds)
+    uploaded = await _store_reference_upload(reference_audio) if reference_audio is not None else None
     try:
-        if reference_audio is not None:
-            audio_bytes = await reference_audio.read()
+        if uploaded is not None:
+            reference_path, speaker_id = uploaded.path, uploaded.speaker_id
+            metrics.PAYLOAD_BYTES.labels(payload="reference_audio").observe(uploaded.size_bytes)
         else:
-            # Load the saved reference audio from disk
-            with open(REFERENCE_AUDIO_PATH, "rb") as f:
-                audio_bytes = f.read()
-        reference_audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
+            # Use the saved reference audio on disk
+            reference_path = REFERENCE_AUDIO_PATH
+            speaker_id = (await file_sha256(reference_path))[:32]
+
+        output_name = os.path.basename(output_filename)
+        if not output_name.endswith(".wav"):
+            output_name += ".wav"
+        output_path = os.path.join(OUTPUTS_DIR, output_name)
+        artifact = None
 
-        # Try to use the voice clone service
+        # Try to use the voice clone service; the embedding is extracted once per distinct recording
         try:
-            output_path, audio_base64, duration = voice_clone_service.clone_voice(
-                text=text,
-                reference_audio_base64=reference_audio_base64,
-                speed=speed,
-                language=language,
-                output_filename=output_filename
-            )
+            await _register_reference(speaker_id, reference_path)
+            target_se = await run_in_threadpool(speaker_embedding_store.load, speaker_id, voice_clone_service.device)
+            async with fair_share(TTS_SECONDS, tts_seconds):
+                duration = await run_in_threadpool(
+                    voice_clone_service.synthesize_with_embedding,
+                    text,
+                    target_se,
+                    output_path,
+                    speed=speed,
+                    language=language
+                )
+            record_usage(TTS_SECONDS, duration)
+            artifact = await run_in_threadpool(artifact_store.put_file, output_path, "wav")
+            audio_base64 = await run_in_threadpool(_read_base64, output_path) if inline_audio else None
         except Exception as service_error:
-            logging.warning(f"Voice clone service failed: {service_error}")
+            logger.warning("Voice clone service failed: %s", service_error)
+            metrics.FALLBACKS.labels(kind="clone_outputs_file").inc()
             # Fallback: look for generated audio file in outputs directory
-            outputs_dir = os.path.join(os.path.dirname(__file__), "outputs")
-            
             # Try different possible file extensions and names
             possible_files = [
-                os.path.join(outputs_dir, f"base_{output_filename}.wav"),  # Most likely pattern
-                os.path.join(outputs_dir, f"base_{output_filename}.mp3"),
-                os.path.join(outputs_dir, f"base_{output_filename}"),
-                os.path.join(outputs_dir, output_filename),
-                os.path.join(outputs_dir, f"{output_filename}.wav"),
-                os.path.join(outputs_dir, f"{output_filename}.mp3"),
-                os.path.join(outputs_dir, "output.wav"),
-                os.path.join(outputs_dir, "output.mp3"),
-                os.path.join(outputs_dir, "base_output.wav")
+                os.path.join(OUTPUTS_DIR, f"base_{output_filename}.wav"),  # Most likely pattern
+                os.path.join(OUTPUTS_DIR, f"base_{output_filename}.mp3"),
+                os.path.join(OUTPUTS_DIR, f"base_{output_filename}"),
+                os.path.join(OUTPUTS_DIR, output_filename),
+                os.path.join(OUTPUTS_DIR, f"{output_filename}.wav"),
+                os.path.join(OUTPUTS_DIR, f"{output_filename}.mp3"),
+                os.path.join(OUTPUTS_DIR, "output.wav"),
+                os.path.join(OUTPUTS_DIR, "output.mp3"),
+                os.path.join(OUTPUTS_DIR, "base_output.wav")
             ]
             
             output_path = None
@@ -243,35 +364,148 @@ async def clone_voice(
             else:
                 raise Exception("No audio file found in outputs directory")
 
-        return VoiceCloneResponse(
+        if audio_base64 is not None:
+            metrics.PAYLOAD_BYTES.labels(payload="clone_audio_base64").observe(len(audio_base64))
+        return ModelJSONResponse(VoiceCloneResponse(
             success=True,
             audio_base64=audio_base64,
             output_path=output_path,
+            audio_url=artifact.url if artifact is not None else None,
             duration_seconds=duration,
             message="Voice cloning completed successfully"
-        )
+        ))
     except Exception as e:
-        return VoiceCloneResponse(
+        return ModelJSONResponse(VoiceCloneResponse(
             success=False,
             message=f"Voice cloning failed: {str(e)}"
-        )
+        ))
+    finally:
+        if uploaded is not None and os.path.exists(uploaded.path):
+            os.remove(uploaded.path)
+
 
+async def _resolve_speaker_embedding(speaker_id: Optional[str]):
+    """Load a registered speaker, registering the saved reference audio if none is given"""
+    if speaker_id is None:
+        if not os.path.exists(REFERENCE_AUDIO_PATH):
+            raise HTTPException(status_code=404, detail="No speaker_id given and no reference audio saved")
+        speaker_id = (await file_sha256(REFERENCE_AUDIO_PATH))[:32]
+        await _register_reference(speaker_id, REFERENCE_AUDIO_PATH)
 
-@app.post("/generate-progress-summary", response_model=ProgressSummaryResponse)
-async def generate_progress_summary(request: ProgressSummaryRequest) -> ProgressSummaryResponse:
     try:
-        url = "http://localhost:1234/v1/chat/completions"
-        headers = {"Content-Type": "application/json"}
-        payload = {
+        target_se = await run_in_threadpool(speaker_embedding_store.load, speaker_id, voice_clone_service.device)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if target_se is None:
+        raise HTTPException(status_code=404, detail=f"Unknown speaker: {speaker_id}")
+    return target_se
+
+
+@app.post("/speakers", response_model=SpeakerRegistrationResponse)
+async def register_speaker(reference_audio: UploadFile = File(...)) -> ModelJSONResponse:
+    """Register a reference voice once so narration requests can refer to it by id"""
+    uploaded = await _store_reference_upload(reference_audio)
+    speaker_id = uploaded.speaker_id
+    try:
+        created = await _register_reference(speaker_id, uploaded.path)
+    except Exception as e:
+        logger.error("🔥 Speaker registration error: %s", e)
+        raise HTTPException(status_code=500, detail=f"Speaker registration failed: {str(e)}")
+    finally:
+        os.remove(uploaded.path)
+
+    return ModelJSONResponse(SpeakerRegistrationResponse(
+        speaker_id=speaker_id,
+        created=created,
+        message="Speaker registered successfully" if created else "Speaker already registered"
+    ))
+
+
+def lesson_pack_lookup(lookup, request, *args):
+    packed = lookup(request, *args)
+    metrics.STORY_CACHE_LOOKUPS.labels(cache="lesson_pack", outcome="hit" if packed is not None else "miss").inc()
+    return packed
+
+
+def _artifact_name(url: str) -> str:
+    return url.rsplit("/", 1)[-1]
+
+
+async def stream_packed_narration(narration: Dict, inline_audio: bool):
+    """Replay a pre-rendered narration in the same chunk format as live narration"""
+    for index, sentence in enumerate(narration["sentences"]):
+        yield StoryNarrationChunk(type="text", index=index, text=sentence["text"]).model_dump_json(exclude_none=True) + "\n"
+        audio_base64 = None
+        if inline_audio:
+            artifact = artifact_store.get(_artifact_name(sentence["audio_url"]))
+            audio_base64 = await run_in_threadpool(_read_base64, artifact.path)
+        yield StoryNarrationChunk(
+            type="audio",
+            index=index,
+            audio_base64=audio_base64,
+            audio_url=sentence["audio_url"],
+            duration_seconds=sentence["duration_seconds"]
+        ).model_dump_json(exclude_none=True) + "\n"
+    yield StoryNarrationChunk(type="done").model_dump_json(exclude_none=True) + "\n"
+
+
+@app.post("/story-narration", openapi_extra=json_body_openapi(StoryNarrationRequest))
+async def generate_story_narration(
+    request: StoryNarrationRequest = json_body(StoryNarrationRequest),
+    lease: TenantLease = Depends(tenant_lease)
+) -> StreamingResponse:
+    """Stream a story and its narration as newline-delimited JSON chunks.
+
+    Text chunks are sent as soon as each sentence is decoded; audio chunks
+    (base64 WAV and its artifact URL, one per sentence) follow as speech
+    synthesis catches up.
+    """
+    if lesson_packs is not None:
+        packed = lesson_pack_lookup(
+            lesson_packs.narration_for, request, lease.tenant, request.speaker_id, request.speed, request.language
+        )
+        if packed is not None and all(artifact_store.get(_artifact_name(s["audio_url"])) for s in packed["sentences"]):
+            logger.info("📦 Serving lesson-pack narration", extra={"student": request.student_name})
+            return StreamingResponse(
+                stream_packed_narration(packed, request.inline_audio is not False), media_type="application/x-ndjson"
+            )
+
+    payload = build_story_payload(request)
+    # The narration is at most max_tokens long
+    lease.admit(
+        llm_tokens=estimate_payload_tokens(payload),
+        tts_seconds=estimate_tts_seconds(payload["max_tokens"] * CHARS_PER_TOKEN, request.speed)
+    )
+    target_se = await _resolve_speaker_embedding(request.speaker_id)
+    payload = build_story_payload(await with_student_memory(request))
+
+    async def stream_chunks():
+        async for chunk in story_narration_pipeline.run(
+            payload,
+            target_se,
+            speed=request.speed,
+            language=request.language,
+            inline_audio=request.inline_audio is not False
+        ):
+            yield chunk.model_dump_json(exclude_none=True) + "\n"
+
+    return StreamingResponse(stream_chunks(), media_type="application/x-ndjson")
+
+
+@app.post("/generate-progress-summary", response_model=ProgressSummaryResponse, openapi_extra=json_body_openapi(ProgressSummaryRequest))
+async def generate_progress_summary(
+    request: ProgressSummaryRequest = json_body(ProgressSummaryRequest),
+    lease: TenantLease = Depends(tenant_lease)
+) -> ModelJSONResponse:
+    lease.admit(llm_tokens=estimate_tokens(request.model_dump_json()) + PROGRESS_MAX_TOKENS)
+    try:
+        payload = apply_cache_hints({
             "model": "gemma-3-27b-it",
             "messages": [
-                {
-                    "role": "system",
-                    "content": "You are an expert educational progress analyst specializing in neurodivergent learners. Analyze the student's progress data and create a comprehensive progress summary for parents and educators."
-                },
+                {"role": "system", "content": PROGRESS_SYSTEM_PROMPT},
                 {
                     "role": "user",
-                    "content": json.dumps({
+                    "content": dumps({
                         "student_name": request.student_name,
                         "time_period": request.time_period,
                         "progress_data": request.progress_data or [],
@@ -281,24 +515,87 @@ async def generate_progress_summary(request: ProgressSummaryRequest) -> Progress
                 }
             ],
             "temperature": 0.2,
-            "max_tokens": 1024,
+            "max_tokens": PROGRESS_MAX_TOKENS,
             "stream": False
-        }
-
-        timeout = httpx.Timeout(300.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        }, PROGRESS_PROMPT_CACHE_KEY)
 
-        progress_summary_content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-        return ProgressSummaryResponse.parse_raw(progress_summary_content)
+        log_payload(logger, "progress_summary", "llm_request", payload)
+        data = await llm_client.chat_completion(payload, timeout=300.0, operation="progress_summary")
+        log_payload(logger, "progress_summary", "llm_response", data)
 
+        progress_summary_content = llm_client.message_content(data)
+        try:
+            summary = ProgressSummaryResponse.model_validate_json(progress_summary_content)
+        except ValueError:
+            metrics.PARSE_FAILURES.labels(kind="progress_summary").inc()
+            raise
+        return ModelJSONResponse(summary)
+
+    except LLMUpstreamError as e:
+        logger.error("🔥 Progress summary upstream error: %s", e)
+        raise upstream_http_error(e, "Progress summary generation failed")
     except Exception as e:
-        logging.error(f"🔥 Progress summary generation error:\n{e}")
+        logger.error("🔥 Progress summary generation error: %s", e)
         raise HTTPException(status_code=500, detail=f"Progress summary generation failed: {str(e)}")
 
 
+@app.api_route("/artifacts/{name}", methods=["GET", "HEAD"])
+async def get_artifact(name: str, request: Request) -> Response:
+    """A generated story (.txt) or audio file (.wav) by content hash, with ETag, long-lived caching and Range support"""
+    artifact = artifact_store.get(name)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Unknown artifact")
+    return artifact_response(artifact, request)
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Prometheus scrape endpoint"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+def _require_admin(token: Optional[str]):
+    # Report the profiling surface as missing unless a valid admin token is sent
+    if not is_admin_token(token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """List stored profiles, newest first"""
+    _require_admin(x_admin_token)
+    return {"profiles": profile_store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Fetch a stored profile as JSON or as collapsed stacks for flame graph tools"""
+    _require_admin(x_admin_token)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    if format == "collapsed":
+        return PlainTextResponse(profile["collapsed"])
+    return profile
+
+
+@app.post("/admin/profile")
+async def profile_process(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """Sample every thread in the process for a number of seconds"""
+    _require_admin(x_admin_token)
+    profile_id = await run_in_threadpool(profile_for, seconds)
+    profile = profile_store.get(profile_id)
+    return {key: value for key, value in profile.items() if key != "collapsed"}
+
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     return {"status": "healthy"}
@@ -5,8 +5,11 @@ from typing import List, Optional, Dict, Any
 # Request Model: Only required fields
 class StoryGenerationRequest(BaseModel):
     student_name: str
+    # Keys the student's memory index within the tenant; memories are neither stored nor retrieved without it
+    student_id: Optional[str] = None
     subject: str
     memory_context: Optional[str] = None
+    previous_context: Optional[str] = None
     characters: Optional[List[str]] = None
     topic_to_be_reached: Optional[str] = None
 
@@ -46,3 +49,11 @@ class VoiceCloneRequest(BaseModel):
     speed: Optional[float] = 1.0
     language: Optional[str] = "en"
     output_filename: Optional[str] = "output.wav"
+
+
+class StoryNarrationRequest(StoryGenerationRequest):
+    speaker_id: Optional[str] = None
+    speed: Optional[float] = 1.0
+    language: Optional[str] = "English"
+    # False sends only audio_url in audio chunks, for clients that fetch (and cache) the artifacts
+    inline_audio: Optional[bool] = True
@@ -20,6 +20,7 @@ class InteractionPoint(BaseModel):
 
 class StoryGenerationResponse(BaseModel):
     content: str
+    url: Optional[str] = None
     
 
 class IEPGoalProgress(BaseModel):
@@ -56,5 +57,19 @@ class VoiceCloneResponse(BaseModel):
     success: bool
     audio_base64: Optional[str] = None
     output_path: Optional[str] = None
+    audio_url: Optional[str] = None
     duration_seconds: Optional[float] = None
-    message: str
\ No newline at end of file
+    message: str
+class SpeakerRegistrationResponse(BaseModel):
+    speaker_id: str
+    created: bool
+    message: str
+
+class StoryNarrationChunk(BaseModel):
+    type: str  # "text", "audio", "done" or "error"
+    index: Optional[int] = None
+    text: Optional[str] = None
+    audio_base64: Optional[str] = None
+    audio_url: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    message: Optional[str] = None
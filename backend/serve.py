@@ -0,0 +1,58 @@
+"""
+Production entry point: N API worker processes in front of one voice model server.
+
+The OpenVoice weights are loaded once, in a dedicated model-server process; the
+uvicorn workers (VOICE_SERVICE=remote) forward voice calls to it over a unix
+socket, so adding workers adds CPU for the API and LLM paths without adding
+model copies.
+
+    python serve.py --workers 8 --port 8000
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+
+import uvicorn
+
+from services.voice_model_server import VOICE_MODEL_SOCKET, RemoteVoiceCloneService, run_model_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with a shared voice model server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--voice-backend", default=os.getenv("VOICE_MODEL_BACKEND", "openvoice"),
+                        choices=["openvoice", "stub"], help="voice service loaded by the model server")
+    parser.add_argument("--socket", default=VOICE_MODEL_SOCKET)
+    parser.add_argument("--model-load-timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    # Workers inherit these and connect to the model server instead of loading models
+    authkey = os.getenv("VOICE_MODEL_AUTHKEY") or secrets.token_hex(16)
+    os.environ.update({
+        "VOICE_SERVICE": "remote",
+        "VOICE_MODEL_SOCKET": args.socket,
+        "VOICE_MODEL_AUTHKEY": authkey,
+    })
+
+    model_server = multiprocessing.get_context("spawn").Process(
+        target=run_model_server, args=(args.voice_backend, args.socket, authkey), name="voice-model-server"
+    )
+    model_server.start()
+    try:
+        device = RemoteVoiceCloneService(args.socket, authkey).wait_until_ready(
+            args.model_load_timeout, process=model_server
+        )
+        print(f"🎙️ Voice model server ready on {device}; starting {args.workers} API workers")
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        model_server.terminate()
+        model_server.join()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import re
+import shutil
+import uuid
+from typing import Optional
+
+from fastapi import Request, Response
+
+from services.range_response import FileRangeResponse, RangeNotSatisfiable, parse_range
+
+
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "outputs", "artifacts"))
+# Content-addressed artifacts never change, so clients and CDNs may keep them as long as they like
+ARTIFACT_CACHE_SECONDS = int(os.getenv("ARTIFACT_CACHE_SECONDS", str(365 * 24 * 3600)))
+ARTIFACTS_URL_PREFIX = "/artifacts"
+
+MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "txt": "text/plain",
+}
+
+_ARTIFACT_NAME = re.compile(r"^([0-9a-f]{64})\.([a-z0-9]+)$")
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class Artifact:
+    """A stored story or audio file, named by the SHA-256 of its content"""
+
+    def __init__(self, digest: str, extension: str, path: str):
+        self.digest = digest
+        self.extension = extension
+        self.path = path
+
+    @property
+    def name(self) -> str:
+        return f"{self.digest}.{self.extension}"
+
+    @property
+    def url(self) -> str:
+        return f"{ARTIFACTS_URL_PREFIX}/{self.name}"
+
+    @property
+    def etag(self) -> str:
+        # Strong validator: the name changes whenever a single byte does
+        return f'"{self.digest}"'
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.extension]
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(_HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """Content-addressed files under root/<first two hex digits>/<sha256>.<extension>.
+
+    Storing the same content twice is free and returns the same artifact, so
+    repeated stories and narrations map to one URL that clients can cache.
+    Files are written to root/tmp and renamed into place, so a partially
+    written artifact is never served.
+    """
+
+    def __init__(self, root: str = ARTIFACTS_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def _path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.{extension}")
+
+    def staging_path(self, extension: str) -> str:
+        """A scratch path on the store's filesystem, for producers that write files themselves"""
+        return os.path.join(self.root, "tmp", f"{uuid.uuid4().hex}.{extension}")
+
+    def _commit(self, staged: str, digest: str, extension: str) -> Artifact:
+        path = self._path(digest, extension)
+        if os.path.exists(path):
+            os.remove(staged)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(staged, path)
+        return Artifact(digest, extension, path)
+
+    def put_bytes(self, data: bytes, extension: str) -> Artifact:
+        if extension not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported artifact type: {extension}")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest, extension)
+        if os.path.exists(path):
+            return Artifact(digest, extension, path)
+        staged = self.staging_path(extension)
+        with open(staged, "wb") as output_file:
+            output_file.write(data)
+        return self._commit(staged, digest, extension)
+
+    def put_text(self, text: str) -> Artifact:
+        return self.put_bytes(text.encode("utf-8"), "txt")
+
+    def put_file(self, source: str, extension: str, keep_source: bool = True) -> Artifact:
+        """Store a copy of source (a hard link when possible), or move it in if keep_source is False"""
+        if extension not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported artifact type: {extension}")
+        digest = _file_sha256(source)
+        path = self._path(digest, extension)
+        if os.path.exists(path):
+            if not keep_source:
+                os.remove(source)
+            return Artifact(digest, extension, path)
+        staged = self.staging_path(extension)
+        if not keep_source:
+            shutil.move(source, staged)
+        else:
+            try:
+                os.link(source, staged)
+            except OSError:
+                shutil.copyfile(source, staged)
+        return self._commit(staged, digest, extension)
+
+    def get(self, name: str) -> Optional[Artifact]:
+        match = _ARTIFACT_NAME.match(name)
+        if match is None or match.group(2) not in MEDIA_TYPES:
+            return None
+        digest, extension = match.groups()
+        path = self._path(digest, extension)
+        return Artifact(digest, extension, path) if os.path.isfile(path) else None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check, using the weak comparison RFC 9110 prescribes for it"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def artifact_response(artifact: Artifact, request: Request) -> Response:
+    """The artifact with validators and long-lived caching, or 304 when the client already has it.
+
+    A single "Range: bytes=..." request gets 206 with just that range, so
+    audio players can buffer progressively and seek; If-Range with a stale
+    ETag gets the whole file.
+    """
+    headers = {
+        "ETag": artifact.etag,
+        "Cache-Control": f"public, max-age={ARTIFACT_CACHE_SECONDS}, immutable",
+    }
+    if etag_matches(request.headers.get("if-none-match"), artifact.etag):
+        return Response(status_code=304, headers=headers)
+
+    stat_result = os.stat(artifact.path)
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == artifact.etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat_result.st_size}"})
+    return FileRangeResponse(
+        artifact.path, stat_result, byte_range, headers=headers, media_type=artifact.media_type, method=request.method
+    )
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import uuid
+from typing import Dict, Iterable, Tuple
+
+import aiofiles
+import soundfile as sf
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+
+MAX_REFERENCE_AUDIO_BYTES = int(os.getenv("MAX_REFERENCE_AUDIO_BYTES", str(20 * 1024 * 1024)))
+MAX_REFERENCE_AUDIO_SECONDS = float(os.getenv("MAX_REFERENCE_AUDIO_SECONDS", "120"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Allowance for multipart boundaries and the other form fields of an upload request
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class StoredUpload:
+    """An upload written to disk, with the SHA-256 of its content"""
+
+    def __init__(self, path: str, sha256: str, size_bytes: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size_bytes = size_bytes
+
+    @property
+    def speaker_id(self) -> str:
+        # The only speaker id derivation: re-uploads of a recording and registered speakers share embeddings
+        return self.sha256[:32]
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: str,
+    max_bytes: int = MAX_REFERENCE_AUDIO_BYTES,
+    max_seconds: float = MAX_REFERENCE_AUDIO_SECONDS
+) -> StoredUpload:
+    """Copy an upload to disk in chunks, hashing it on the way and enforcing size and duration limits.
+
+    The file is written next to the destination and renamed into place, so a
+    rejected or interrupted upload never replaces an existing file.
+    """
+    partial_path = f"{destination}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(partial_path, "wb") as output_file:
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Reference audio exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                await output_file.write(chunk)
+        if size == 0:
+            raise ValueError("Empty reference audio")
+        await check_audio_duration(partial_path, max_seconds)
+        os.replace(partial_path, destination)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return StoredUpload(destination, digest.hexdigest(), size)
+
+
+async def check_audio_duration(path: str, max_seconds: float = MAX_REFERENCE_AUDIO_SECONDS):
+    """Reject recordings longer than max_seconds, reading only the file header"""
+    try:
+        info = await run_in_threadpool(sf.info, path)
+    except RuntimeError as e:
+        # Formats libsndfile cannot probe are left to the voice models to decode
+        logger.debug("Could not probe duration of %s: %s", path, e)
+        return
+    if info.duration > max_seconds:
+        raise UploadTooLargeError(f"Reference audio is {info.duration:.1f}s long; the limit is {max_seconds:g}s")
+
+
+_file_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+async def file_sha256(path: str) -> str:
+    """SHA-256 of a file read in chunks, cached until the file changes"""
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "rb") as input_file:
+        while chunk := await input_file.read(UPLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+    _file_hashes[path] = (version, digest.hexdigest())
+    return digest.hexdigest()
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware rejecting oversized upload requests before the form is parsed.
+
+    Requests declaring a larger Content-Length are answered with 413 straight
+    away; chunked bodies are counted as they arrive and cut off at the limit.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_REFERENCE_AUDIO_BYTES):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body_bytes = max_bytes + _FORM_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope.get("headers", [])).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Raised while the form is parsed, so FastAPI answers with this status
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {self.max_body_bytes} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = f'{{"detail":"Upload exceeds {self.max_body_bytes} bytes"}}'.encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,127 @@
+import glob
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+from services.checkpoints import load_checkpoint
+
+
+BASE_SPEAKER_MAX_RESIDENT = int(os.getenv("BASE_SPEAKER_MAX_RESIDENT", "2"))
+# Comma-separated languages loaded at startup, e.g. "EN" or "EN,ZH"
+BASE_SPEAKER_PRELOAD = os.getenv("BASE_SPEAKER_PRELOAD", "EN")
+
+# Language names accepted by /clone, mapped to base speaker checkpoint directories
+LANGUAGE_ALIASES = {
+    "english": "EN",
+    "en": "EN",
+    "chinese": "ZH",
+    "mandarin": "ZH",
+    "zh": "ZH",
+}
+
+# The name BaseSpeakerTTS.tts expects for each checkpoint's text front-end
+TTS_LANGUAGE_NAMES = {
+    "EN": "English",
+    "ZH": "Chinese",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSpeaker:
+    """A loaded base speaker TTS model with its default source tone color embedding"""
+
+    def __init__(self, code: str, tts: Any, source_se: torch.Tensor):
+        self.code = code
+        self.tts = tts
+        self.source_se = source_se
+        self.tts_language = TTS_LANGUAGE_NAMES.get(code, code)
+
+
+class BaseSpeakerRegistry:
+    """Discovers base speaker checkpoints and keeps the most recently used ones loaded.
+
+    Every directory under `base_speakers/` holding a `config.json` and a
+    `checkpoint.pth` is one language. Models are loaded on first use and the
+    least recently used one is evicted when more than `max_resident` are loaded.
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        create_tts: Callable[[str, str], Any],
+        device: str,
+        max_resident: int = BASE_SPEAKER_MAX_RESIDENT
+    ):
+        self.base_dir = base_dir
+        self.create_tts = create_tts
+        self.device = device
+        self.max_resident = max(max_resident, 1)
+        self._directories = self._discover()
+        self._loaded: "OrderedDict[str, BaseSpeaker]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _discover(self) -> Dict[str, str]:
+        directories = {}
+        for config_path in glob.glob(os.path.join(self.base_dir, "*", "config.json")):
+            directory = os.path.dirname(config_path)
+            if os.path.exists(os.path.join(directory, "checkpoint.pth")):
+                directories[os.path.basename(directory).upper()] = directory
+        return directories
+
+    def languages(self) -> List[str]:
+        return sorted(self._directories)
+
+    def resolve(self, language: str) -> str:
+        """Map a request language ("English", "en", "ZH", ...) to a checkpoint directory code"""
+        code = LANGUAGE_ALIASES.get(language.strip().lower(), language.strip().upper())
+        if code not in self._directories:
+            raise ValueError(f"Unsupported language: {language}. Available: {', '.join(self.languages())}")
+        return code
+
+    def get(self, language: str) -> BaseSpeaker:
+        code = self.resolve(language)
+        with self._lock:
+            speaker = self._loaded.get(code)
+            if speaker is not None:
+                self._loaded.move_to_end(code)
+                return speaker
+            # Loading under the lock keeps concurrent first requests from loading twice
+            speaker = self._load(code)
+            self._loaded[code] = speaker
+            while len(self._loaded) > self.max_resident:
+                evicted, _ = self._loaded.popitem(last=False)
+                logger.info("Evicted base speaker model %s", evicted)
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            return speaker
+
+    def read_source_embedding(self, language: str) -> torch.Tensor:
+        """Read a language's default source embedding from disk without loading its model"""
+        return torch.load(self._source_se_path(self.resolve(language)), map_location=self.device)
+
+    def _source_se_path(self, code: str) -> str:
+        directory = self._directories[code]
+        default_path = os.path.join(directory, f"{code.lower()}_default_se.pth")
+        if os.path.exists(default_path):
+            return default_path
+        candidates = sorted(glob.glob(os.path.join(directory, "*_se.pth")))
+        if not candidates:
+            raise FileNotFoundError(f"No source speaker embedding in {directory}")
+        return candidates[0]
+
+    def _load(self, code: str) -> BaseSpeaker:
+        directory = self._directories[code]
+        logger.info("Loading base speaker model %s from %s", code, directory)
+        tts = self.create_tts(os.path.join(directory, "config.json"), self.device)
+        load_checkpoint(tts.model, os.path.join(directory, "checkpoint.pth"), self.device)
+        return BaseSpeaker(code, tts, self.read_source_embedding(code))
+
+    def preload(self, languages: Optional[str] = BASE_SPEAKER_PRELOAD):
+        for language in filter(None, (item.strip() for item in (languages or "").split(","))):
+            if language.upper() in self._directories or language.lower() in LANGUAGE_ALIASES:
+                self.get(language)
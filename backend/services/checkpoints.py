@@ -0,0 +1,86 @@
+import logging
+import os
+import pickle
+from typing import Dict, Optional
+
+import torch
+
+
+CHECKPOINT_MMAP = os.getenv("CHECKPOINT_MMAP", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+
+def safetensors_path(checkpoint_path: str) -> str:
+    return f"{os.path.splitext(checkpoint_path)[0]}.safetensors"
+
+
+def _load_weights(checkpoint_path: str, mmap: bool):
+    try:
+        return torch.load(checkpoint_path, map_location="cpu", mmap=mmap, weights_only=True)
+    except pickle.UnpicklingError as e:
+        # Unpickling arbitrary objects could run code, so there is no weights_only=False fallback at startup
+        logger.error(
+            "❌ %s holds objects that weights_only loading refuses; convert it with "
+            "`python convert_checkpoints.py --trust-pickle` (trusted checkpoints only)", checkpoint_path
+        )
+        raise RuntimeError(f"Cannot load {checkpoint_path} with weights_only=True: {e}") from e
+
+
+def read_state_dict(checkpoint_path: str, mmap: bool = CHECKPOINT_MMAP) -> Dict[str, torch.Tensor]:
+    """Read model weights on CPU, memory-mapped when possible.
+
+    Prefers a converted `.safetensors` file next to the checkpoint, then
+    `torch.load(mmap=True)`; pre-zipfile checkpoints that cannot be mapped are
+    read fully.
+    """
+    converted = safetensors_path(checkpoint_path)
+    if mmap and os.path.exists(converted):
+        try:
+            from safetensors.torch import load_file
+        except ImportError:
+            logger.warning("safetensors is not installed, ignoring %s", converted)
+        else:
+            return load_file(converted, device="cpu")
+
+    try:
+        checkpoint = _load_weights(checkpoint_path, mmap)
+    except RuntimeError as e:
+        if not mmap or isinstance(e.__cause__, pickle.UnpicklingError):
+            raise
+        logger.warning("Cannot memory-map %s (%s); run convert_checkpoints.py", checkpoint_path, e)
+        checkpoint = _load_weights(checkpoint_path, mmap=False)
+    # OpenVoice checkpoints wrap the weights as {"model": state_dict, ...}
+    return checkpoint.get("model", checkpoint)
+
+
+def load_checkpoint(model: torch.nn.Module, checkpoint_path: str, device: str, mmap: bool = CHECKPOINT_MMAP):
+    """Load weights into a model, replacing the OpenVoice load_ckpt.
+
+    On CPU the parameters are assigned the mapped tensors directly, so they
+    stay backed by the page cache and are shared by every process on the host
+    that maps the same file. On GPU the mapped weights are copied to the device.
+    """
+    state_dict = read_state_dict(checkpoint_path, mmap=mmap)
+    assign = mmap and torch.device(device).type == "cpu"
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=assign)
+    if missing or unexpected:
+        logger.info("Checkpoint %s: missing keys %s, unexpected keys %s", checkpoint_path, missing, unexpected)
+    model.eval()
+
+
+def convert_checkpoint(checkpoint_path: str, output_path: Optional[str] = None, trust_pickle: bool = False) -> str:
+    """Write the weights of an OpenVoice checkpoint as an mmap-friendly safetensors file.
+
+    trust_pickle loads checkpoints that weights_only rejects with full
+    unpickling; only use it on checkpoints from a trusted source.
+    """
+    from safetensors.torch import save_file
+
+    checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=not trust_pickle)
+    state_dict = checkpoint.get("model", checkpoint)
+    # safetensors rejects tensors sharing storage; each weight gets its own contiguous copy
+    tensors = {name: tensor.detach().clone().contiguous() for name, tensor in state_dict.items()}
+    output_path = output_path or safetensors_path(checkpoint_path)
+    save_file(tensors, output_path, metadata={"source": os.path.basename(checkpoint_path)})
+    return output_path
@@ -0,0 +1,59 @@
+from typing import Any, Dict, Type, TypeVar
+
+import orjson
+from fastapi import Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
+
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class ModelJSONResponse(ORJSONResponse):
+    """JSON response rendered without FastAPI's response_model round trip.
+
+    Returning a response instance skips revalidation of the model and its
+    conversion to plain Python objects; pydantic models are serialized to bytes
+    by pydantic-core directly, anything else with orjson. Large payloads such as
+    base64 audio are written in one pass without json.dumps escaping.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """orjson-encoded text, for JSON embedded in prompts and logs"""
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else None).decode("utf-8")
+
+
+def json_body(model: Type[ModelT]):
+    """Dependency validating a request body straight from its raw bytes.
+
+    FastAPI's own body handling decodes the JSON into Python objects first and
+    validates those; model_validate_json parses and validates in one pass.
+    Errors are reported exactly like FastAPI's own body validation.
+    """
+
+    async def parse(request: Request) -> ModelT:
+        try:
+            return model.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+
+    return Depends(parse)
+
+
+def json_body_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """openapi_extra documenting a json_body parameter, which FastAPI cannot see as a body"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
@@ -0,0 +1,378 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from models.requests import StoryGenerationRequest
+from services.artifact_store import ArtifactStore
+from services.story_narration_pipeline import SentenceSegmenter
+from services.story_pregeneration_service import request_key
+from services.tenant_quotas import ANONYMOUS_TENANT
+from services.text_cleaning import clean_narration_sentence, clean_story_text, replace_math_symbols
+
+
+# Comma-separated lesson pack directories served by the API
+LESSON_PACK_DIRS = [path.strip() for path in os.getenv("LESSON_PACK_DIRS", "").split(",") if path.strip()]
+# Packed stories older than this are generated live again (and rebuilt by the next build); 0 keeps them forever
+LESSON_PACK_MAX_AGE_DAYS = float(os.getenv("LESSON_PACK_MAX_AGE_DAYS", "120"))
+
+MANIFEST_NAME = "manifest.jsonl"
+STORY = "story"
+NARRATION = "narration"
+
+logger = logging.getLogger(__name__)
+
+
+class PackItem:
+    """One story to pre-render for a tenant, and the voice to narrate it with (None for text only)"""
+
+    def __init__(
+        self,
+        request: StoryGenerationRequest,
+        speaker_id: Optional[str],
+        speed: float = 1.0,
+        language: str = "English",
+        tenant: str = ANONYMOUS_TENANT
+    ):
+        self.request = request
+        self.speaker_id = speaker_id
+        self.speed = speed
+        self.language = language
+        self.tenant = tenant
+
+    @property
+    def story_id(self) -> str:
+        return story_id(self.request, self.tenant)
+
+    @property
+    def narration_id(self) -> Optional[str]:
+        if self.speaker_id is None:
+            return None
+        return narration_id(self.request, self.tenant, self.speaker_id, self.speed, self.language)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(orjson.dumps(parts)).hexdigest()[:32]
+
+
+def story_id(request: StoryGenerationRequest, tenant: str) -> str:
+    # Same matching rule as story pre-generation: tenant, student, subject, topic and characters
+    return _digest(*request_key(request, tenant))
+
+
+def narration_id(
+    request: StoryGenerationRequest,
+    tenant: str,
+    speaker_id: str,
+    speed: Optional[float],
+    language: Optional[str]
+) -> str:
+    return _digest(*request_key(request, tenant), speaker_id, round(speed or 1.0, 2), (language or "English").lower())
+
+
+def _expired(record: Dict[str, Any], max_age_days: float = LESSON_PACK_MAX_AGE_DAYS) -> bool:
+    # Records from before built_at was written count as expired
+    return max_age_days > 0 and time.time() - record.get("built_at", 0) > max_age_days * 86400
+
+
+def load_plan(path: str) -> List[PackItem]:
+    """Expand a JSONL lesson plan into pack items.
+
+    Each line is a story request; "subjects" and "speaker_ids" lists expand it
+    into one story per subject, narrated once per voice. "tenant" is the tenant
+    served the stories (the tenant header value), anonymous callers by default:
+
+        {"tenant": "school-a", "student_name": "Ali", "subjects": ["addition", "subtraction"], "speaker_ids": ["9f2c..."]}
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as plan_file:
+        for line_number, line in enumerate(plan_file, 1):
+            if not line.strip():
+                continue
+            entry = orjson.loads(line)
+            subjects = entry.pop("subjects", None) or [entry.pop("subject", None)]
+            speaker_ids = entry.pop("speaker_ids", None) or [entry.pop("speaker_id", None)]
+            speed = float(entry.pop("speed", 1.0))
+            language = entry.pop("language", "English")
+            tenant = str(entry.pop("tenant", None) or ANONYMOUS_TENANT)
+            for subject in subjects:
+                try:
+                    request = StoryGenerationRequest.model_validate({**entry, "subject": subject})
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_number}: {e}") from e
+                items.extend(PackItem(request, speaker_id, speed, language, tenant) for speaker_id in speaker_ids)
+    return items
+
+
+def split_sentences(story: str) -> List[str]:
+    """Narration sentences of a story, split and cleaned the way live narration does it"""
+    segmenter = SentenceSegmenter()
+    sentences = segmenter.feed(story + " ") + segmenter.flush()
+    return [cleaned for cleaned in map(clean_narration_sentence, sentences) if cleaned]
+
+
+class PackManifest:
+    """Append-only JSONL record of finished stories and narrations; the pack's checkpoint.
+
+    Every record is flushed and fsynced before the next item starts, so an
+    interrupted build resumes from the last finished story or narration. With
+    repair, a record cut short by a crash is truncated away so appends start
+    on a fresh line; its item is simply built again.
+    """
+
+    def __init__(self, pack_dir: str, repair: bool = False):
+        self.path = os.path.join(pack_dir, MANIFEST_NAME)
+        self.stories: Dict[str, Dict[str, Any]] = {}
+        self.narrations: Dict[str, Dict[str, Any]] = {}
+        if repair:
+            os.makedirs(pack_dir, exist_ok=True)
+        self._load(repair)
+
+    def _load(self, repair: bool):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as manifest_file:
+            data = manifest_file.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        if repair and len(complete) < len(data):
+            with open(self.path, "r+b") as manifest_file:
+                manifest_file.truncate(len(complete))
+        for line in complete.splitlines():
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue
+            records = self.stories if record.get("type") == STORY else self.narrations
+            records[record["id"]] = record
+
+    def append(self, record: Dict[str, Any]):
+        with open(self.path, "ab") as manifest_file:
+            manifest_file.write(orjson.dumps(record) + b"\n")
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        records = self.stories if record["type"] == STORY else self.narrations
+        records[record["id"]] = record
+
+
+# Voice models of a narration worker process, loaded once by its initializer
+_worker_voice = None
+_worker_speakers = None
+_worker_artifacts: Optional[ArtifactStore] = None
+
+
+def _init_narration_worker(voice_backend: str, artifacts_dir: str, torch_threads: int):
+    global _worker_voice, _worker_speakers, _worker_artifacts
+    import torch
+
+    from services.speaker_embedding_store import SpeakerEmbeddingStore
+    from services.voice_backends import create_voice_clone_service
+
+    # Workers share the CPU cores instead of each using all of them
+    torch.set_num_threads(torch_threads)
+    _worker_voice = create_voice_clone_service(voice_backend)
+    _worker_speakers = SpeakerEmbeddingStore()
+    _worker_artifacts = ArtifactStore(artifacts_dir)
+
+
+def _narrate_sentence(sentence: str, speaker_id: str, speed: float, language: str) -> Tuple[str, float]:
+    """Synthesize one sentence into the artifact store; returns its URL and duration"""
+    target_se = _worker_speakers.load(speaker_id, _worker_voice.device)
+    if target_se is None:
+        raise ValueError(f"Unknown speaker: {speaker_id}")
+    staged = _worker_artifacts.staging_path("wav")
+    try:
+        duration = _worker_voice.synthesize_with_embedding(
+            text=sentence,
+            target_se=target_se,
+            output_path=staged,
+            speed=speed,
+            language=language
+        )
+        return _worker_artifacts.put_file(staged, "wav", keep_source=False).url, duration
+    finally:
+        if os.path.exists(staged):
+            os.remove(staged)
+
+
+class LessonPackBuilder:
+    """Pre-renders a lesson plan: stories through `generate`, narration in a process pool.
+
+    `generate` returns the raw story text for a request; build_lesson_pack.py
+    uses the same prompt as live /storygeneration, so packed and live stories
+    read alike. At most `concurrency` stories are generated at once; narration
+    sentences go to `narration_workers` processes, each holding its own voice
+    models. Items already in the manifest, and not expired, are skipped, so
+    re-running a build resumes it.
+    """
+
+    def __init__(
+        self,
+        pack_dir: str,
+        generate: Callable[[StoryGenerationRequest], Awaitable[str]],
+        artifact_store: ArtifactStore,
+        concurrency: int = 4,
+        narration_workers: int = 1,
+        voice_backend: str = "openvoice"
+    ):
+        self.manifest = PackManifest(pack_dir, repair=True)
+        self.generate = generate
+        self.artifact_store = artifact_store
+        self.concurrency = max(concurrency, 1)
+        self.narration_workers = max(narration_workers, 1)
+        self.voice_backend = voice_backend
+        self._story_locks: Dict[str, asyncio.Lock] = {}
+
+    async def _story(self, item: PackItem, slots: asyncio.Semaphore) -> Dict[str, Any]:
+        # Several voices of one story share a single generation
+        async with self._story_locks.setdefault(item.story_id, asyncio.Lock()):
+            record = self.manifest.stories.get(item.story_id)
+            if record is not None and not _expired(record):
+                return record
+            async with slots:
+                content = ((await self.generate(item.request)) or "").strip()
+            if not content:
+                raise RuntimeError(f"Story generation failed for {item.request.student_name} / {item.request.subject}")
+            content = replace_math_symbols(clean_story_text(content))
+            artifact = await asyncio.to_thread(self.artifact_store.put_text, content)
+            record = {
+                "type": STORY,
+                "id": item.story_id,
+                "tenant": item.tenant,
+                "request": item.request.model_dump(exclude_none=True),
+                "content": content,
+                "url": artifact.url,
+                "built_at": time.time(),
+            }
+            self.manifest.append(record)
+            return record
+
+    async def _narration(self, item: PackItem, story: Dict[str, Any], pool: ProcessPoolExecutor):
+        loop = asyncio.get_running_loop()
+        sentences = split_sentences(story["content"])
+        audio = await asyncio.gather(*(
+            loop.run_in_executor(pool, _narrate_sentence, sentence, item.speaker_id, item.speed, item.language)
+            for sentence in sentences
+        ))
+        self.manifest.append({
+            "type": NARRATION,
+            "id": item.narration_id,
+            "story_id": story["id"],
+            "story_built_at": story.get("built_at", 0),
+            "speaker_id": item.speaker_id,
+            "speed": item.speed,
+            "language": item.language,
+            "sentences": [
+                {"text": sentence, "audio_url": url, "duration_seconds": duration}
+                for sentence, (url, duration) in zip(sentences, audio)
+            ],
+        })
+
+    async def _build_item(self, item: PackItem, slots: asyncio.Semaphore, pool: Optional[ProcessPoolExecutor]) -> bool:
+        try:
+            story = await self._story(item, slots)
+            if item.narration_id is not None and self._narration_missing(item, story):
+                await self._narration(item, story, pool)
+            return True
+        except Exception as e:
+            logger.error("❌ %s / %s (voice %s): %s", item.request.student_name, item.request.subject, item.speaker_id, e)
+            return False
+
+    def _narration_missing(self, item: PackItem, story: Optional[Dict[str, Any]]) -> bool:
+        """Whether the item's narration is not built yet, or was made for an earlier version of its story"""
+        narration = self.manifest.narrations.get(item.narration_id)
+        return narration is None or story is None or narration.get("story_built_at") != story.get("built_at", 0)
+
+    def _pending(self, item: PackItem) -> bool:
+        story = self.manifest.stories.get(item.story_id)
+        if story is None or _expired(story):
+            return True
+        return item.narration_id is not None and self._narration_missing(item, story)
+
+    async def build(self, items: Iterable[PackItem]) -> Dict[str, int]:
+        items = list(items)
+        pending = [item for item in items if self._pending(item)]
+        logger.info("📦 %d of %d plan items to build", len(pending), len(items))
+        slots = asyncio.Semaphore(self.concurrency)
+        pool = None
+        if any(item.speaker_id is not None for item in pending):
+            torch_threads = max((os.cpu_count() or 1) // self.narration_workers, 1)
+            pool = ProcessPoolExecutor(
+                max_workers=self.narration_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_narration_worker,
+                initargs=(self.voice_backend, self.artifact_store.root, torch_threads)
+            )
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(self._build_item(item, slots, pool) for item in pending))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        built = sum(results)
+        logger.info("📦 Built %d item(s), %d failed, in %.1fs", built, len(results) - built, time.perf_counter() - start)
+        return {"planned": len(items), "skipped": len(items) - len(pending), "built": built, "failed": len(results) - built}
+
+
+def _servable(record: Dict[str, Any], request: StoryGenerationRequest) -> bool:
+    """Packed stories are first stories: continuations, other memory notes and expired stories go to live generation"""
+    if request.previous_context or _expired(record):
+        return False
+    packed_memory = (record["request"].get("memory_context") or "").strip()
+    return packed_memory == (request.memory_context or "").strip()
+
+
+class LessonPackIndex:
+    """Stories and narrations of built lesson packs, looked up by request and tenant.
+
+    Manifests are re-read when they change, so a pack built (or extended)
+    while the API is running is served without a restart. Requests with a
+    previous_context, or a memory_context other than the plan's, never match,
+    and stories older than LESSON_PACK_MAX_AGE_DAYS are no longer served.
+    """
+
+    def __init__(self, pack_dirs: Iterable[str] = LESSON_PACK_DIRS):
+        self.paths = [os.path.join(pack_dir, MANIFEST_NAME) for pack_dir in pack_dirs]
+        self._mtimes: Dict[str, float] = {}
+        self._stories: Dict[str, Dict[str, Any]] = {}
+        self._narrations: Dict[str, Dict[str, Any]] = {}
+
+    def _refresh(self):
+        for path in self.paths:
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+            if self._mtimes.get(path) == mtime:
+                continue
+            manifest = PackManifest(os.path.dirname(path))
+            self._stories.update(manifest.stories)
+            self._narrations.update(manifest.narrations)
+            self._mtimes[path] = mtime
+
+    def story_for(self, request: StoryGenerationRequest, tenant: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        story = self._stories.get(story_id(request, tenant))
+        return story if story is not None and _servable(story, request) else None
+
+    def narration_for(
+        self,
+        request: StoryGenerationRequest,
+        tenant: str,
+        speaker_id: Optional[str],
+        speed: Optional[float],
+        language: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        if speaker_id is None:
+            return None
+        self._refresh()
+        narration = self._narrations.get(narration_id(request, tenant, speaker_id, speed, language))
+        story = self._stories.get(narration["story_id"]) if narration is not None else None
+        if story is None or narration.get("story_built_at") != story.get("built_at", 0):
+            return None
+        return narration if _servable(story, request) else None
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict
+
+from services import metrics
+from services.llm_backends import LLMUpstreamError
+from services.llm_client import LLMClient, estimate_payload_tokens, estimate_prompt_tokens
+from services.prompt_builder import CHARS_PER_TOKEN, estimate_tokens
+from services.tenant_quotas import LLM_TOKENS, fair_share, record_usage
+
+
+# GGUF model file, e.g. a 1-4B instruct model quantized to Q4_K_M
+LLAMA_CPP_MODEL_PATH = os.getenv("LLAMA_CPP_MODEL_PATH", "")
+LLAMA_CPP_CONTEXT_TOKENS = int(os.getenv("LLAMA_CPP_CONTEXT_TOKENS", "4096"))
+# CPU threads used by each generation
+LLAMA_CPP_THREADS = int(os.getenv("LLAMA_CPP_THREADS", str(max((os.cpu_count() or 2) // 2, 1))))
+# Concurrent generations; each worker thread holds its own context over the shared mmapped weights
+LLAMA_CPP_WORKERS = int(os.getenv("LLAMA_CPP_WORKERS", "1"))
+
+# Payload fields passed on to llama.cpp; the rest ("model", "stream", prompt cache hints) only matter to servers
+_GENERATION_FIELDS = ("messages", "temperature", "top_p", "max_tokens", "stop", "response_format", "seed")
+
+logger = logging.getLogger(__name__)
+
+
+class LlamaCppClient:
+    """In-process llama.cpp backend with the same interface as LLMClient.
+
+    Payloads are OpenAI-style chat completion requests and results are
+    OpenAI-style responses, so chains and endpoints work unchanged, without the
+    HTTP hop and JSON round trip. Generations run on a dedicated thread pool so
+    they never occupy the threadpool used for request handling; a generation
+    that runs past its timeout is stopped at the next token.
+    """
+
+    def __init__(
+        self,
+        model_path: str = LLAMA_CPP_MODEL_PATH,
+        context_tokens: int = LLAMA_CPP_CONTEXT_TOKENS,
+        threads: int = LLAMA_CPP_THREADS,
+        workers: int = LLAMA_CPP_WORKERS
+    ):
+        try:
+            import llama_cpp
+        except ImportError as e:
+            raise RuntimeError("LLM_BACKEND=llamacpp needs llama-cpp-python: pip install llama-cpp-python") from e
+        if not model_path or not os.path.exists(model_path):
+            raise RuntimeError(f"LLAMA_CPP_MODEL_PATH does not point to a GGUF model: {model_path!r}")
+        self._llama_cpp = llama_cpp
+        self.model_path = model_path
+        self.context_tokens = context_tokens
+        self.threads = threads
+        self.in_flight = 0
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="llama-cpp")
+        self._local = threading.local()
+
+    @property
+    def is_idle(self) -> bool:
+        return self.in_flight == 0
+
+    message_content = staticmethod(LLMClient.message_content)
+
+    def _model(self):
+        """The calling worker thread's model, loaded on first use (llama.cpp contexts are not thread-safe)"""
+        model = getattr(self._local, "model", None)
+        if model is None:
+            start = time.perf_counter()
+            model = self._local.model = self._llama_cpp.Llama(
+                model_path=self.model_path,
+                n_ctx=self.context_tokens,
+                n_threads=self.threads,
+                verbose=False
+            )
+            logger.info("🦙 Loaded %s in %.1fs", os.path.basename(self.model_path), time.perf_counter() - start)
+        return model
+
+    def _arguments(self, payload: Dict[str, Any], should_stop: Callable[[], bool]) -> Dict[str, Any]:
+        arguments = {field: payload[field] for field in _GENERATION_FIELDS if payload.get(field) is not None}
+        arguments["stopping_criteria"] = self._llama_cpp.StoppingCriteriaList([lambda tokens, logits: should_stop()])
+        return arguments
+
+    async def chat_completion(self, payload: Dict[str, Any], timeout: float = 60.0, operation: str = "chat") -> Dict[str, Any]:
+        """Generate a chat completion in-process and return it as an OpenAI-style response"""
+        self.in_flight += 1
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with fair_share(LLM_TOKENS, estimate_payload_tokens(payload)):
+                start = time.perf_counter()
+                deadline = time.monotonic() + timeout
+                arguments = self._arguments(payload, lambda: time.monotonic() > deadline)
+                try:
+                    data = await asyncio.get_running_loop().run_in_executor(
+                        self._executor, lambda: self._model().create_chat_completion(**arguments)
+                    )
+                except Exception as e:
+                    raise LLMUpstreamError(f"llama.cpp generation failed: {e!r}") from e
+                if time.monotonic() > deadline:
+                    raise LLMUpstreamError(f"llama.cpp generation exceeded {timeout}s", status_code=504)
+            outcome = "success"
+        finally:
+            self.in_flight -= 1
+            elapsed = time.perf_counter() - start
+            metrics.LLM_UPSTREAM_SECONDS.labels(operation=operation, outcome=outcome).observe(elapsed)
+            metrics.add_server_timing("llm", elapsed)
+
+        usage = data.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens") or estimate_prompt_tokens(payload)
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(self.message_content(data))
+        metrics.LLM_PROMPT_TOKENS.labels(operation=operation).observe(prompt_tokens)
+        metrics.LLM_COMPLETION_TOKENS.labels(operation=operation).observe(completion_tokens)
+        record_usage(LLM_TOKENS, prompt_tokens + completion_tokens)
+        return data
+
+    async def stream_chat_completion(self, payload: Dict[str, Any], timeout: float = 60.0, operation: str = "chat") -> AsyncIterator[str]:
+        """Generate a chat completion in-process and yield content deltas as tokens are sampled"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        self.in_flight += 1
+        start = time.perf_counter()
+        outcome = "error"
+        completion_chars = 0
+
+        def produce(arguments: Dict[str, Any]):
+            end = None
+            try:
+                for chunk in self._model().create_chat_completion(**arguments, stream=True):
+                    delta = chunk["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        loop.call_soon_threadsafe(queue.put_nowait, delta)
+            except Exception as e:
+                end = e
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, end)
+
+        try:
+            async with fair_share(LLM_TOKENS, estimate_payload_tokens(payload)):
+                start = time.perf_counter()
+                deadline = time.monotonic() + timeout
+                arguments = self._arguments(payload, lambda: stopped.is_set() or time.monotonic() > deadline)
+                generation = loop.run_in_executor(self._executor, produce, arguments)
+                try:
+                    while (item := await queue.get()) is not None:
+                        if isinstance(item, Exception):
+                            raise LLMUpstreamError(f"llama.cpp generation failed: {item!r}") from item
+                        if not completion_chars:
+                            metrics.LLM_TIME_TO_FIRST_TOKEN_SECONDS.labels(operation=operation).observe(
+                                time.perf_counter() - start
+                            )
+                        completion_chars += len(item)
+                        yield item
+                finally:
+                    # A client that went away stops the generation at the next token
+                    stopped.set()
+                    await asyncio.shield(generation)
+                if time.monotonic() > deadline:
+                    raise LLMUpstreamError(f"llama.cpp generation exceeded {timeout}s", status_code=504)
+            outcome = "success"
+        finally:
+            self.in_flight -= 1
+            metrics.LLM_UPSTREAM_SECONDS.labels(operation=operation, outcome=outcome).observe(time.perf_counter() - start)
+            prompt_tokens = estimate_prompt_tokens(payload)
+            completion_tokens = -(-completion_chars // CHARS_PER_TOKEN)
+            metrics.LLM_PROMPT_TOKENS.labels(operation=operation).observe(prompt_tokens)
+            metrics.LLM_COMPLETION_TOKENS.labels(operation=operation).observe(completion_tokens)
+            record_usage(LLM_TOKENS, prompt_tokens + completion_tokens)
@@ -0,0 +1,174 @@
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+from services import metrics
+
+
+# Consecutive calls considered when deciding whether a backend is unhealthy
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+# Fraction of failed (or too slow) calls in the window that opens the circuit
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+# Successful calls slower than this count as failures
+LLM_BREAKER_SLOW_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_SECONDS", "45"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+# Hedge delay used until an operation has enough latency samples
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+LLM_HEDGE_MIN_SAMPLES = 20
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "http").lower()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUpstreamError(Exception):
+    """An LLM call that failed on every backend tried, with the HTTP status the API should answer"""
+
+    def __init__(self, message: str, status_code: int = 502, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stops sending calls to a backend whose recent calls mostly failed or were too slow.
+
+    Closed: calls pass and outcomes are recorded over a sliding window. When the
+    failure rate reaches error_rate the circuit opens and calls are refused for
+    open_seconds. Then it is half-open: a single probe call is let through, and
+    its outcome closes the circuit again or re-opens it.
+
+    acquire() hands out a claim that the caller passes back to record() or
+    release(), so only the probe's own outcome moves a half-open circuit; calls
+    that started earlier and finish meanwhile are ignored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        error_rate: float = LLM_BREAKER_ERROR_RATE,
+        slow_seconds: float = LLM_BREAKER_SLOW_SECONDS,
+        open_seconds: float = LLM_BREAKER_OPEN_SECONDS
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._claims = itertools.count(1)
+        self._probe: Optional[int] = None
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def available(self) -> bool:
+        if self.state == OPEN:
+            return self.retry_after() == 0.0
+        return self.state == CLOSED or self._probe is None
+
+    def acquire(self) -> Optional[int]:
+        """Claim permission for one call, or None; in half-open state only one probe at a time"""
+        if not self.available():
+            return None
+        claim = next(self._claims)
+        if self.state != CLOSED:
+            self._set_state(HALF_OPEN)
+            self._probe = claim
+        return claim
+
+    def record(self, claim: int, success: bool, seconds: float = 0.0):
+        failed = not success or seconds > self.slow_seconds
+        if claim == self._probe:
+            self._probe = None
+            if failed:
+                self._open()
+            else:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+            return
+        if self.state != CLOSED:
+            # Started before the circuit opened; only the probe decides from here
+            return
+        self._outcomes.append(failed)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.error_rate:
+            self._open()
+
+    def release(self, claim: int):
+        """Give back a claim whose call was cancelled before it finished"""
+        if claim == self._probe:
+            self._probe = None
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning("LLM backend %s circuit %s -> %s", self.name, self.state, state)
+            self.state = state
+            metrics.LLM_CIRCUIT_OPEN.labels(backend=self.name).set(0 if state == CLOSED else 1)
+
+
+class LLMBackend:
+    def __init__(self, url: str):
+        self.url = url
+        # host:port keeps the metrics label short and free of paths
+        self.name = urlsplit(url).netloc or url
+        self.breaker = CircuitBreaker(self.name)
+
+
+class LatencyTracker:
+    """Recent successful call latencies per operation, for choosing the hedge delay"""
+
+    def __init__(self, max_samples: int = 200):
+        self.max_samples = max_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def observe(self, operation: str, seconds: float):
+        self._samples.setdefault(operation, deque(maxlen=self.max_samples)).append(seconds)
+
+    def hedge_delay(self, operation: str, quantile: float = LLM_HEDGE_QUANTILE) -> float:
+        samples = self._samples.get(operation)
+        if not samples or len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        ordered = sorted(samples)
+        return max(ordered[min(int(len(ordered) * quantile), len(ordered) - 1)], LLM_HEDGE_MIN_DELAY_SECONDS)
+
+
+def create_llm_client(backend: str = LLM_BACKEND):
+    """Select the text generation backend.
+
+    "http" calls OpenAI-compatible servers (LM Studio, llama.cpp server, vLLM)
+    and "llamacpp" runs a GGUF model in this process on CPU. Both take OpenAI
+    chat completion payloads through chat_completion / stream_chat_completion
+    and return OpenAI-style responses.
+    """
+    backend = backend.lower()
+    if backend == "llamacpp":
+        from services.llama_cpp_client import LlamaCppClient
+        return LlamaCppClient()
+    if backend != "http":
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    from services.llm_client import LLMClient
+    return LLMClient()
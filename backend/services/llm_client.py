@@ -0,0 +1,234 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+import orjson
+
+from services import metrics
+from services.llm_backends import LatencyTracker, LLMBackend, LLMUpstreamError
+from services.prompt_builder import CHARS_PER_TOKEN, estimate_tokens
+from services.tenant_quotas import LLM_TOKENS, fair_share, record_usage
+
+
+LLM_API_URL = os.getenv("LLM_API_URL", "http://localhost:1234/v1/chat/completions")
+# Comma-separated equivalent backends, in order of preference; LLM_API_URL when unset
+LLM_API_URLS = [url.strip() for url in os.getenv("LLM_API_URLS", LLM_API_URL).split(",") if url.strip()]
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+
+
+def estimate_prompt_tokens(payload: Dict[str, Any]) -> int:
+    return sum(estimate_tokens(message.get("content", "")) for message in payload.get("messages", []))
+
+
+def estimate_payload_tokens(payload: Dict[str, Any]) -> int:
+    """Upper estimate of the tokens a chat completion will use: the prompt plus max_tokens"""
+    return estimate_prompt_tokens(payload) + max(payload.get("max_tokens") or 0, 0)
+
+
+def _upstream_error(error: Optional[BaseException]) -> LLMUpstreamError:
+    if isinstance(error, LLMUpstreamError):
+        return error
+    if isinstance(error, httpx.TimeoutException):
+        return LLMUpstreamError(f"LLM backend timed out: {error!r}", status_code=504)
+    if isinstance(error, httpx.HTTPStatusError):
+        return LLMUpstreamError(f"LLM backend answered {error.response.status_code}", status_code=502)
+    return LLMUpstreamError(f"LLM backend unreachable: {error!r}", status_code=503)
+
+
+class LLMClient:
+    """Client for OpenAI-compatible chat completions endpoints (LM Studio by default).
+
+    Tracks the number of requests in flight so background work can wait until the
+    backend is idle, and records upstream latency and token counts per operation.
+
+    With several backends configured, a call that has not answered within the
+    operation's recent p95 latency is hedged: the same request goes to the next
+    healthy backend, the first answer wins and the other call is cancelled.
+    Every backend has a circuit breaker, so calls skip a backend that keeps
+    failing or stalling until a probe shows it has recovered.
+    """
+
+    def __init__(self, api_urls: Sequence[str] = LLM_API_URLS, hedge: bool = LLM_HEDGE_ENABLED):
+        self.backends = [LLMBackend(url) for url in api_urls]
+        self.hedge = hedge
+        self.headers = {"Content-Type": "application/json"}
+        self.in_flight = 0
+        self.latencies = LatencyTracker()
+
+    @property
+    def is_idle(self) -> bool:
+        return self.in_flight == 0
+
+    def _unavailable(self) -> LLMUpstreamError:
+        retry_after = min(backend.breaker.retry_after() for backend in self.backends)
+        return LLMUpstreamError("All LLM backends are unavailable", status_code=503, retry_after=retry_after)
+
+    async def _post(self, backend: LLMBackend, claim: int, content: bytes, timeout: float) -> bytes:
+        start = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(timeout)) as client:
+                response = await client.post(backend.url, headers=self.headers, content=content)
+                response.raise_for_status()
+        except asyncio.CancelledError:
+            backend.breaker.release(claim)
+            raise
+        except Exception:
+            backend.breaker.record(claim, False)
+            raise
+        backend.breaker.record(claim, True, time.perf_counter() - start)
+        return response.content
+
+    async def _hedged_post(self, payload: Dict[str, Any], timeout: float, operation: str) -> bytes:
+        """POST to the preferred healthy backend, hedging to the next one after the p95 delay.
+
+        A backend that fails before any other has answered is replaced by the
+        next one straight away.
+        """
+        content = orjson.dumps(payload)
+        candidates: List[LLMBackend] = [backend for backend in self.backends if backend.breaker.available()]
+        tasks: List[asyncio.Task] = []
+
+        def launch() -> Optional[asyncio.Task]:
+            while candidates:
+                backend = candidates.pop(0)
+                claim = backend.breaker.acquire()
+                if claim is not None:
+                    tasks.append(asyncio.create_task(self._post(backend, claim, content, timeout)))
+                    return tasks[-1]
+            return None
+
+        first = launch()
+        if first is None:
+            raise self._unavailable()
+        pending = {first}
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                delay = self.latencies.hedge_delay(operation) if self.hedge and not hedged and candidates else None
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than the operation's p95: send the same request to the next backend
+                    hedged = True
+                    hedge = launch()
+                    if hedge is not None:
+                        pending.add(hedge)
+                        metrics.LLM_HEDGED_REQUESTS.labels(operation=operation, outcome="sent").inc()
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        if hedged:
+                            outcome = "primary_won" if task is first else "hedge_won"
+                            metrics.LLM_HEDGED_REQUESTS.labels(operation=operation, outcome=outcome).inc()
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    # Every call so far failed: fail over to the next healthy backend
+                    retry = launch()
+                    if retry is not None:
+                        pending.add(retry)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        raise _upstream_error(last_error) from last_error
+
+    async def chat_completion(self, payload: Dict[str, Any], timeout: float = 60.0, operation: str = "chat") -> Dict[str, Any]:
+        """POST a chat completion payload and return the decoded JSON response.
+
+        Raises LLMUpstreamError when no backend produced an answer.
+        """
+        self.in_flight += 1
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with fair_share(LLM_TOKENS, estimate_payload_tokens(payload)):
+                # Upstream latency excludes the wait for a fair-share slot
+                start = time.perf_counter()
+                content = await self._hedged_post(payload, timeout, operation)
+                metrics.PAYLOAD_BYTES.labels(payload="llm_response").observe(len(content))
+                data = orjson.loads(content)
+            outcome = "success"
+        finally:
+            self.in_flight -= 1
+            elapsed = time.perf_counter() - start
+            metrics.LLM_UPSTREAM_SECONDS.labels(operation=operation, outcome=outcome).observe(elapsed)
+            metrics.add_server_timing("llm", elapsed)
+        self.latencies.observe(operation, elapsed)
+
+        # Prefer the server's own token counts when it reports them
+        usage = data.get("usage") or {}
+        prompt_tokens = usage.get("prompt_tokens") or estimate_prompt_tokens(payload)
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(self.message_content(data))
+        metrics.LLM_PROMPT_TOKENS.labels(operation=operation).observe(prompt_tokens)
+        metrics.LLM_COMPLETION_TOKENS.labels(operation=operation).observe(completion_tokens)
+        record_usage(LLM_TOKENS, prompt_tokens + completion_tokens)
+        return data
+
+    async def stream_chat_completion(self, payload: Dict[str, Any], timeout: float = 60.0, operation: str = "chat") -> AsyncIterator[str]:
+        """Stream a chat completion and yield content deltas as they arrive.
+
+        Streams are not hedged, but a backend that fails before sending any
+        content is skipped in favour of the next healthy one.
+        """
+        self.in_flight += 1
+        start = time.perf_counter()
+        outcome = "error"
+        completion_chars = 0
+        content = orjson.dumps({**payload, "stream": True})
+        try:
+            async with fair_share(LLM_TOKENS, estimate_payload_tokens(payload)):
+                start = time.perf_counter()
+                last_error: Optional[BaseException] = None
+                for backend in self.backends:
+                    claim = backend.breaker.acquire()
+                    if claim is None:
+                        continue
+                    backend_start = time.perf_counter()
+                    try:
+                        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout)) as client:
+                            async with client.stream("POST", backend.url, headers=self.headers, content=content) as response:
+                                response.raise_for_status()
+                                async for line in response.aiter_lines():
+                                    # Server-sent events: "data: {...}" lines terminated by "data: [DONE]"
+                                    if not line.startswith("data:"):
+                                        continue
+                                    data = line[len("data:"):].strip()
+                                    if data == "[DONE]":
+                                        break
+                                    chunk = orjson.loads(data)
+                                    delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+                                    if delta:
+                                        if not completion_chars:
+                                            metrics.LLM_TIME_TO_FIRST_TOKEN_SECONDS.labels(operation=operation).observe(
+                                                time.perf_counter() - start
+                                            )
+                                        completion_chars += len(delta)
+                                        yield delta
+                    except (asyncio.CancelledError, GeneratorExit):
+                        backend.breaker.release(claim)
+                        raise
+                    except Exception as e:
+                        backend.breaker.record(claim, False)
+                        if completion_chars:
+                            raise _upstream_error(e) from e
+                        last_error = e
+                        continue
+                    backend.breaker.record(claim, True, time.perf_counter() - backend_start)
+                    break
+                else:
+                    raise (_upstream_error(last_error) if last_error else self._unavailable())
+            outcome = "success"
+        finally:
+            self.in_flight -= 1
+            metrics.LLM_UPSTREAM_SECONDS.labels(operation=operation, outcome=outcome).observe(time.perf_counter() - start)
+            completion_tokens = -(-completion_chars // CHARS_PER_TOKEN)
+            metrics.LLM_PROMPT_TOKENS.labels(operation=operation).observe(estimate_prompt_tokens(payload))
+            metrics.LLM_COMPLETION_TOKENS.labels(operation=operation).observe(completion_tokens)
+            record_usage(LLM_TOKENS, estimate_prompt_tokens(payload) + completion_tokens)
+
+    @staticmethod
+    def message_content(data: Dict[str, Any]) -> str:
+        return data.get("choices", [{}])[0].get("message", {}).get("content", "")
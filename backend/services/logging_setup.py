@@ -0,0 +1,119 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+# Fraction of requests whose LLM payloads are logged, per endpoint, e.g. "story=0.05,progress_summary=1"
+LOG_PAYLOAD_SAMPLE_RATES = os.getenv("LOG_PAYLOAD_SAMPLE_RATES", "")
+
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "endpoint=rate,..." into a mapping; "*" sets the default rate"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        endpoint, rate = item.split("=", 1)
+        rates[endpoint.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+_sample_rates = parse_sample_rates(LOG_PAYLOAD_SAMPLE_RATES)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain log lines with `extra` fields appended as key=value pairs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in record.__dict__.items() if key not in _RESERVED_ATTRS
+        )
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    """Route all logging through a queue so request handlers never block on stream I/O.
+
+    Records are put on an in-memory queue by the calling thread and formatted
+    and written by a background listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def payload_sample_rate(endpoint: str) -> float:
+    return _sample_rates.get(endpoint, _sample_rates.get("*", 0.0))
+
+
+def truncate(text: str, max_chars: int = LOG_PAYLOAD_MAX_CHARS) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
+
+
+def log_payload(logger: logging.Logger, endpoint: str, name: str, payload: Any):
+    """Log a sampled, truncated, compact copy of a payload.
+
+    The sampling decision and level check happen before any serialization, so
+    unsampled requests pay for one random() call.
+    """
+    rate = payload_sample_rate(endpoint)
+    if rate <= 0.0 or not logger.isEnabledFor(logging.INFO) or random.random() >= rate:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, separators=(",", ":"), default=str)
+    logger.info("%s payload", name, extra={"endpoint": endpoint, "payload": truncate(text)})
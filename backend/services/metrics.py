@@ -0,0 +1,148 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+_BYTES_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "neurolearn_http_request_seconds", "End-to-end API request latency",
+    ["endpoint", "method", "status"], buckets=_LATENCY_BUCKETS
+)
+LLM_UPSTREAM_SECONDS = Histogram(
+    "neurolearn_llm_upstream_seconds", "Latency of chat completion calls to the LLM backend",
+    ["operation", "outcome"], buckets=_LATENCY_BUCKETS
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "neurolearn_llm_time_to_first_token_seconds", "Time to the first streamed token from the LLM backend",
+    ["operation"], buckets=_LATENCY_BUCKETS
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "neurolearn_llm_prompt_tokens", "Prompt tokens sent per LLM call",
+    ["operation"], buckets=_TOKEN_BUCKETS
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "neurolearn_llm_completion_tokens", "Completion tokens received per LLM call",
+    ["operation"], buckets=_TOKEN_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "neurolearn_queue_wait_seconds", "Time spent waiting for a shared resource or work queue",
+    ["queue"], buckets=_LATENCY_BUCKETS
+)
+VOICE_STAGE_SECONDS = Histogram(
+    "neurolearn_voice_stage_seconds", "Duration of each voice cloning stage",
+    ["stage"], buckets=_LATENCY_BUCKETS
+)
+CODEC_SECONDS = Histogram(
+    "neurolearn_codec_seconds", "Time spent encoding or decoding payloads",
+    ["operation"], buckets=_LATENCY_BUCKETS
+)
+PAYLOAD_BYTES = Histogram(
+    "neurolearn_payload_bytes", "Size of request and response payloads",
+    ["payload"], buckets=_BYTES_BUCKETS
+)
+FALLBACKS = Counter(
+    "neurolearn_fallbacks_total", "Requests answered by a fallback path", ["kind"]
+)
+PARSE_FAILURES = Counter(
+    "neurolearn_parse_failures_total", "LLM outputs that could not be parsed", ["kind"]
+)
+RATE_LIMITED = Counter(
+    "neurolearn_rate_limited_total", "Requests rejected by a tenant quota", ["resource"]
+)
+STORY_CACHE_LOOKUPS = Counter(
+    "neurolearn_story_cache_lookups_total", "Near-duplicate story cache lookups", ["cache", "outcome"]
+)
+TEMPLATE_STORIES = Counter(
+    "neurolearn_template_stories_total", "Stories rendered by the local template engine", ["reason"]
+)
+LLM_HEDGED_REQUESTS = Counter(
+    "neurolearn_llm_hedged_requests_total", "Hedged LLM calls sent and which call answered first", ["operation", "outcome"]
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "neurolearn_llm_circuit_open", "1 while an LLM backend's circuit breaker is open or half-open", ["backend"]
+)
+
+# Per-request stage durations for the Server-Timing header
+_server_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timings", default=None)
+
+
+def add_server_timing(name: str, seconds: float):
+    """Add a stage duration to the current request's Server-Timing header"""
+    timings = _server_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def timed(histogram: Histogram, server_timing: Optional[str] = None, **labels: str) -> Iterator[None]:
+    """Observe the duration of a block, optionally also reporting it in Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        (histogram.labels(**labels) if labels else histogram).observe(elapsed)
+        if server_timing:
+            add_server_timing(server_timing, elapsed)
+
+
+def render_metrics():
+    """Prometheus text exposition of all registered metrics"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _format_server_timing(timings: Dict[str, float], total: float) -> bytes:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and emitting a Server-Timing header.
+
+    Only stages that finish before the response headers are sent appear in the
+    header; streaming responses report what is known at that point.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _server_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _format_server_timing(timings, time.perf_counter() - start)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _server_timings.reset(token)
+            endpoint = scope.get("endpoint")
+            HTTP_REQUEST_SECONDS.labels(
+                endpoint=getattr(endpoint, "__name__", "unmatched"),
+                method=scope.get("method", ""),
+                status=str(status)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,216 @@
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+
+# Profiling is disabled unless an admin token is configured
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.005"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+_MAX_STACK_DEPTH = 96
+
+# Leaf frames of threads parked waiting for work; sampling them only adds noise
+_IDLE_LEAVES = {
+    ("select", "selectors.py"),
+    ("wait", "threading.py"),
+    ("get", "queue.py"),
+    ("dequeue", "handlers.py"),
+    ("_wait_for_tstate_lock", "threading.py"),
+}
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    # Compared as bytes: compare_digest rejects str with non-ASCII characters
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(
+        token.encode("utf-8"), PROFILE_ADMIN_TOKEN.encode("utf-8")
+    )
+
+
+def _is_idle(frame) -> bool:
+    return (frame.f_code.co_name, os.path.basename(frame.f_code.co_filename)) in _IDLE_LEAVES
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler for every thread in the process.
+
+    A daemon thread snapshots sys._current_frames() at a fixed interval and
+    counts identical stacks, so the event loop and the threadpool running
+    VoiceCloneService are both covered. Coroutines only appear while they are
+    running on the loop, so time spent awaiting the LLM does not show up;
+    threads parked waiting for work are skipped.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or _is_idle(frame):
+                    continue
+                stack: List[str] = []
+                while frame is not None and len(stack) < _MAX_STACK_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Functions by inclusive and self wall time summed over threads"""
+        inclusive: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            for frame in set(frames):
+                inclusive[frame] += count
+            if frames:
+                own[frames[-1]] += count
+        return [
+            {
+                "function": frame,
+                "inclusive_ms": round(count * self.interval * 1000, 1),
+                "self_ms": round(own[frame] * self.interval * 1000, 1),
+            }
+            for frame, count in inclusive.most_common(limit)
+        ]
+
+
+def new_profile_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class ProfileStore:
+    """Most recent profiles kept in memory by ID"""
+
+    def __init__(self, max_stored: int = PROFILE_MAX_STORED):
+        self.max_stored = max_stored
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profiler: SamplingProfiler, label: str, profile_id: Optional[str] = None) -> str:
+        profile_id = profile_id or new_profile_id()
+        profile = {
+            "id": profile_id,
+            "label": label,
+            # Every thread is sampled, so concurrent requests show up in a request's profile too
+            "scope": "process",
+            "started_at": profiler.started_at,
+            "duration_seconds": profiler.duration,
+            "interval_seconds": profiler.interval,
+            "samples": profiler.samples,
+            "top_functions": profiler.top_functions(),
+            "collapsed": profiler.collapsed(),
+        }
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.max_stored:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {key: profile[key] for key in ("id", "label", "scope", "started_at", "duration_seconds", "samples")}
+                for profile in reversed(self._profiles.values())
+            ]
+
+
+profile_store = ProfileStore()
+
+
+def profile_for(seconds: float, interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS) -> str:
+    """Sample the whole process for a number of seconds (blocking) and store the profile"""
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    time.sleep(min(seconds, PROFILE_MAX_SECONDS))
+    profiler.stop()
+    return profile_store.add(profiler, f"process {seconds:g}s")
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling single requests on demand.
+
+    A request is profiled when it carries `X-Profile: 1` (or `?profile=1`)
+    together with a valid `X-Admin-Token`. The response gets an
+    `X-Profile-Id` header naming the stored profile; streaming responses are
+    profiled until their last chunk is sent. The sampler covers the whole
+    process while the request runs, so profiles taken under load include
+    other requests' work as well.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_ADMIN_TOKEN or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler()
+        profile_id = new_profile_id()
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            profile_store.add(profiler, f"{scope.get('method', '')} {scope.get('path', '')}", profile_id)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        flag = headers.get(b"x-profile", b"").decode("latin-1")
+        if flag != "1":
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            flag = query.get("profile", [""])[0]
+        if flag != "1":
+            return False
+        return is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1") or None)
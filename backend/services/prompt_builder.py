@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import string
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Rough average for English text with BPE tokenizers (gemma, llama, gpt)
+CHARS_PER_TOKEN = 4
+
+# Shared token budget for optional context fields (memory, previous context, ...)
+DEFAULT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "256"))
+
+# Prefix-cache hints for the inference server: "cache_prompt" is understood by
+# llama.cpp's server, "prompt_cache_key" by OpenAI-compatible APIs that route on it
+LLM_CACHE_PROMPT = os.getenv("LLM_CACHE_PROMPT", "false").lower() == "true"
+LLM_PROMPT_CACHE_KEY = os.getenv("LLM_PROMPT_CACHE_KEY", "false").lower() == "true"
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the number of tokens in text without loading a tokenizer"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_to_token_budget(text: Optional[str], max_tokens: int) -> str:
+    """Trim text to roughly max_tokens, cutting at a sentence or word boundary"""
+    if not text or max_tokens <= 0:
+        return ""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    trimmed = text[:max_chars]
+    sentence_end = max(trimmed.rfind(". "), trimmed.rfind("! "), trimmed.rfind("? "), trimmed.rfind("\n"))
+    if sentence_end > max_chars // 2:
+        return trimmed[:sentence_end + 1].rstrip()
+    word_end = trimmed.rfind(" ")
+    if word_end > 0:
+        trimmed = trimmed[:word_end]
+    return trimmed.rstrip() + "..."
+
+
+def _normalize_for_comparison(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _dedupe_lines(text: str) -> str:
+    """Drop lines that repeat an earlier line of the same text"""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        key = _normalize_for_comparison(line)
+        if key and key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class PromptTemplate:
+    """A str.format-style template that is parsed once and rendered by concatenation.
+
+    Literal braces are written as {{ and }} exactly as with str.format, so JSON
+    schema examples can be embedded in the template.
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        self._segments: List[Tuple[str, Optional[str]]] = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            if field_name is not None and (format_spec or conversion or not field_name.isidentifier()):
+                raise ValueError(f"Unsupported placeholder in prompt template: {{{field_name}}}")
+            self._segments.append((literal, field_name))
+        self.fields = frozenset(name for _, name in self._segments if name)
+        self.static_text = "".join(literal for literal, _ in self._segments)
+        self.static_tokens = estimate_tokens(self.static_text)
+
+    def render(self, **values: str) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Missing prompt fields: {', '.join(sorted(missing))}")
+        parts = []
+        for literal, field_name in self._segments:
+            parts.append(literal)
+            if field_name:
+                parts.append(str(values[field_name]))
+        return "".join(parts)
+
+
+class PromptBuilder:
+    """Render a compiled template while keeping optional context within a token budget.
+
+    Optional fields are deduplicated against each other and trimmed in the order
+    given, so earlier fields take priority when the budget runs out.
+    """
+
+    def __init__(
+        self,
+        template: PromptTemplate,
+        optional_fields: Iterable[str] = (),
+        context_token_budget: int = DEFAULT_CONTEXT_TOKEN_BUDGET,
+        empty_value: str = "None",
+    ):
+        self.template = template
+        self.optional_fields = tuple(optional_fields)
+        unknown = set(self.optional_fields) - template.fields
+        if unknown:
+            raise ValueError(f"Optional fields not in template: {', '.join(sorted(unknown))}")
+        self.context_token_budget = context_token_budget
+        self.empty_value = empty_value
+
+    def fit_context(self, values: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """Return values with optional fields deduplicated and trimmed to the budget"""
+        fitted = dict(values)
+        remaining = self.context_token_budget
+        seen: List[str] = []
+
+        for field in self.optional_fields:
+            text = (fitted.get(field) or "").strip()
+            if text:
+                text = _dedupe_lines(text)
+                normalized = _normalize_for_comparison(text)
+                # Skip context already covered by a higher-priority field
+                if any(normalized in earlier for earlier in seen):
+                    text = ""
+                else:
+                    text = trim_to_token_budget(text, remaining)
+                    remaining -= estimate_tokens(text)
+                    seen.append(normalized)
+            fitted[field] = text or self.empty_value
+
+        return fitted
+
+    def build(self, values: Dict[str, Optional[str]]) -> str:
+        return self.template.render(**self.fit_context(values))
+
+    def estimate_tokens(self, values: Dict[str, Optional[str]]) -> int:
+        return estimate_tokens(self.build(values))
+
+
+def prompt_cache_key(name: str, static_prefix: str) -> str:
+    """Stable key identifying a static prompt prefix across processes and restarts"""
+    digest = hashlib.sha256(static_prefix.encode("utf-8")).hexdigest()[:16]
+    return f"neurolearn-{name}-{digest}"
+
+
+def apply_cache_hints(payload: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+    """Add the configured prefix-cache hints to a chat completion payload"""
+    if LLM_CACHE_PROMPT:
+        payload["cache_prompt"] = True
+    if LLM_PROMPT_CACHE_KEY:
+        payload["prompt_cache_key"] = cache_key
+    return payload
+
+
+class SharedPrefixPrompt:
+    """Chat prompt laid out so inference servers can reuse the prefix KV-cache.
+
+    The system message is plain text (not a template) holding only static
+    instructions and output schema, so it is byte-identical for every request;
+    all per-student data goes into the final user message rendered by the builder.
+    """
+
+    def __init__(self, name: str, system_prompt: str, user_builder: PromptBuilder):
+        self.name = name
+        self.system_prompt = system_prompt
+        self.user_builder = user_builder
+        self.cache_key = prompt_cache_key(name, system_prompt)
+
+    def messages(self, values: Dict[str, Optional[str]]) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self.user_builder.build(values)},
+        ]
+
+    def apply_cache_hints(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return apply_cache_hints(payload, self.cache_key)
@@ -0,0 +1,80 @@
+import os
+from typing import Tuple
+
+import librosa
+import numpy as np
+
+
+# The OpenVoice tone color converter works at 22.05 kHz
+REFERENCE_SAMPLE_RATE = int(os.getenv("REFERENCE_SAMPLE_RATE", "22050"))
+REFERENCE_MAX_SECONDS = float(os.getenv("REFERENCE_MAX_SECONDS", "30"))
+# Frames quieter than this many dB below the loudest frame count as silence
+REFERENCE_VAD_THRESHOLD_DB = float(os.getenv("REFERENCE_VAD_THRESHOLD_DB", "40"))
+
+_FRAME_SECONDS = 0.03
+# Silence kept around each voiced region so word onsets and endings survive
+_PAD_SECONDS = 0.1
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int, threshold_db: float = REFERENCE_VAD_THRESHOLD_DB) -> np.ndarray:
+    """Drop leading, trailing and internal silences using frame RMS energy"""
+    frame = max(int(_FRAME_SECONDS * sample_rate), 1)
+    frame_count = len(audio) // frame
+    if frame_count == 0:
+        return audio
+    frames = audio[:frame_count * frame].reshape(frame_count, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    if rms.max() <= 0:
+        return audio
+    voiced = rms > rms.max() * 10 ** (-threshold_db / 20)
+
+    # Widen voiced regions by the padding on both sides
+    pad = int(np.ceil(_PAD_SECONDS / _FRAME_SECONDS))
+    keep = np.convolve(voiced, np.ones(2 * pad + 1, dtype=bool), mode="same") > 0
+    mask = np.repeat(keep, frame)
+    trimmed = audio[:frame_count * frame][mask]
+    return trimmed if len(trimmed) else audio
+
+
+def preprocess_reference_audio(
+    path: str,
+    sample_rate: int = REFERENCE_SAMPLE_RATE,
+    max_seconds: float = REFERENCE_MAX_SECONDS
+) -> np.ndarray:
+    """Decode a reference recording to mono at sample_rate, trim silence and cap its length"""
+    audio, _ = librosa.load(path, sr=sample_rate, mono=True)
+    audio = trim_silence(audio, sample_rate)
+    return audio[:int(max_seconds * sample_rate)].astype(np.float32)
+
+
+def save_reference_array(path: str, audio: np.ndarray, sample_rate: int):
+    """Write preprocessed reference audio as an npz, atomically"""
+    partial_path = f"{path}.{os.getpid()}.part.npz"
+    np.savez(partial_path, audio=audio.astype(np.float32), sample_rate=np.int32(sample_rate))
+    os.replace(partial_path, path)
+
+
+def load_reference_array(path: str) -> Tuple[np.ndarray, int]:
+    with np.load(path) as data:
+        return data["audio"], int(data["sample_rate"])
+
+
+def preprocess_to_file(
+    audio_path: str,
+    output_path: str,
+    sample_rate: int = REFERENCE_SAMPLE_RATE,
+    max_seconds: float = REFERENCE_MAX_SECONDS
+) -> str:
+    """Preprocess a recording once at ingestion and store it for embedding extraction"""
+    save_reference_array(output_path, preprocess_reference_audio(audio_path, sample_rate, max_seconds), sample_rate)
+    return output_path
+
+
+def load_reference_audio(path: str, sample_rate: int = REFERENCE_SAMPLE_RATE) -> np.ndarray:
+    """Reference audio at sample_rate, from a preprocessed npz or by preprocessing a recording"""
+    if not path.endswith(".npz"):
+        return preprocess_reference_audio(path, sample_rate)
+    audio, stored_rate = load_reference_array(path)
+    if stored_rate != sample_rate:
+        audio = librosa.resample(audio, orig_sr=stored_rate, target_sr=sample_rate)
+    return audio
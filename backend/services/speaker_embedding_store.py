@@ -0,0 +1,78 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import torch
+
+
+SPEAKER_EMBEDDINGS_DIR = os.getenv(
+    "SPEAKER_EMBEDDINGS_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'uploads', 'speakers')
+)
+
+_SPEAKER_ID_PATTERN = re.compile(r"^[0-9a-f]{16,64}$")
+
+
+class SpeakerEmbeddingStore:
+    """Registered tone color embeddings on disk with a small in-memory cache.
+
+    Registering a voice extracts its embedding once; narration requests then
+    refer to it by speaker id instead of re-uploading the reference audio.
+    """
+
+    def __init__(self, directory: str = SPEAKER_EMBEDDINGS_DIR, max_cached: int = 64):
+        self.directory = directory
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[str, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, speaker_id: str) -> str:
+        if not _SPEAKER_ID_PATTERN.match(speaker_id):
+            raise ValueError(f"Invalid speaker id: {speaker_id}")
+        return os.path.join(self.directory, f"{speaker_id}.pth")
+
+    def audio_path(self, speaker_id: str) -> str:
+        """Where the preprocessed reference audio of a speaker is kept, next to its embedding"""
+        return f"{os.path.splitext(self._path(speaker_id))[0]}.npz"
+
+    def exists(self, speaker_id: str) -> bool:
+        return speaker_id in self._cache or os.path.exists(self._path(speaker_id))
+
+    def register(self, speaker_id: str, extract: Callable[[], torch.Tensor]) -> bool:
+        """Store the embedding produced by extract unless it is already registered.
+
+        Returns True when a new embedding was extracted.
+        """
+        if self.exists(speaker_id):
+            return False
+        embedding = extract().detach().cpu()
+        path = self._path(speaker_id)
+        # Unique per process and thread: several API workers may register the same speaker
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        torch.save(embedding, tmp_path)
+        os.replace(tmp_path, path)
+        self._remember(speaker_id, embedding)
+        return True
+
+    def load(self, speaker_id: str, device: str = "cpu") -> Optional[torch.Tensor]:
+        with self._lock:
+            embedding = self._cache.get(speaker_id)
+            if embedding is not None:
+                self._cache.move_to_end(speaker_id)
+                return embedding.to(device)
+        path = self._path(speaker_id)
+        if not os.path.exists(path):
+            return None
+        embedding = torch.load(path, map_location="cpu")
+        self._remember(speaker_id, embedding)
+        return embedding.to(device)
+
+    def _remember(self, speaker_id: str, embedding: torch.Tensor):
+        with self._lock:
+            self._cache[speaker_id] = embedding
+            self._cache.move_to_end(speaker_id)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
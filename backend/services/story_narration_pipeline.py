@@ -0,0 +1,162 @@
+import asyncio
+import base64
+import os
+import re
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from models.responses import StoryNarrationChunk
+from services.artifact_store import Artifact, ArtifactStore
+from services.tenant_quotas import TTS_SECONDS, estimate_tts_seconds, fair_share, record_usage
+
+
+# End of sentence: terminal punctuation, optional closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+
+
+class SentenceSegmenter:
+    """Split streamed LLM text into sentences as soon as each one is complete.
+
+    Sentences shorter than min_chars are merged with the next one so the TTS
+    model is not called for fragments like "Wow!".
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._pending = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        while True:
+            match = _SENTENCE_END.search(self._buffer)
+            if match is None:
+                break
+            sentence = self._buffer[:match.end()].strip()
+            self._buffer = self._buffer[match.end():]
+            self._pending = f"{self._pending} {sentence}".strip()
+            if len(self._pending) >= self.min_chars:
+                sentences.append(self._pending)
+                self._pending = ""
+        return sentences
+
+    def flush(self) -> List[str]:
+        remainder = f"{self._pending} {self._buffer}".strip()
+        self._pending = ""
+        self._buffer = ""
+        return [remainder] if remainder else []
+
+
+class StoryNarrationPipeline:
+    """Overlap LLM decoding with per-sentence speech synthesis.
+
+    Tokens streamed from the LLM are segmented into sentences; each sentence is
+    emitted as a text chunk right away and queued for synthesis in a worker
+    thread, whose audio chunks are interleaved into the same output stream.
+    Audio chunks keep sentence order. Each sentence's audio is kept in the
+    artifact store so clients can fetch it again by URL.
+    """
+
+    def __init__(self, llm_client, voice_clone_service, clean_sentence: Callable[[str], str], artifact_store: ArtifactStore):
+        self.llm_client = llm_client
+        self.voice_clone_service = voice_clone_service
+        self.clean_sentence = clean_sentence
+        self.artifact_store = artifact_store
+
+    def _synthesize(self, sentence: str, target_se, speed: float, language: str) -> Tuple[Artifact, float]:
+        output_path = self.artifact_store.staging_path("wav")
+        try:
+            duration = self.voice_clone_service.synthesize_with_embedding(
+                text=sentence,
+                target_se=target_se,
+                output_path=output_path,
+                speed=speed,
+                language=language
+            )
+            return self.artifact_store.put_file(output_path, "wav", keep_source=False), duration
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    @staticmethod
+    def _read_base64(artifact: Artifact) -> str:
+        with open(artifact.path, "rb") as audio_file:
+            return base64.b64encode(audio_file.read()).decode("utf-8")
+
+    async def run(
+        self,
+        payload: Dict[str, Any],
+        target_se,
+        speed: float = 1.0,
+        language: str = "English",
+        timeout: float = 60.0,
+        inline_audio: bool = True
+    ) -> AsyncIterator[StoryNarrationChunk]:
+        events: "asyncio.Queue[Optional[StoryNarrationChunk]]" = asyncio.Queue()
+        sentences: "asyncio.Queue[Optional[Tuple[int, str]]]" = asyncio.Queue()
+
+        async def produce_text():
+            segmenter = SentenceSegmenter()
+            index = 0
+
+            async def emit(sentence: str):
+                nonlocal index
+                cleaned = self.clean_sentence(sentence)
+                if not cleaned:
+                    return
+                await events.put(StoryNarrationChunk(type="text", index=index, text=cleaned))
+                await sentences.put((index, cleaned))
+                index += 1
+
+            try:
+                async for delta in self.llm_client.stream_chat_completion(payload, timeout=timeout, operation="story_narration"):
+                    for sentence in segmenter.feed(delta):
+                        await emit(sentence)
+                for sentence in segmenter.flush():
+                    await emit(sentence)
+            finally:
+                await sentences.put(None)
+
+        async def narrate():
+            while True:
+                item = await sentences.get()
+                if item is None:
+                    return
+                index, sentence = item
+                async with fair_share(TTS_SECONDS, estimate_tts_seconds(len(sentence), speed)):
+                    artifact, duration = await run_in_threadpool(
+                        self._synthesize, sentence, target_se, speed, language
+                    )
+                record_usage(TTS_SECONDS, duration)
+                audio_base64 = await run_in_threadpool(self._read_base64, artifact) if inline_audio else None
+                await events.put(StoryNarrationChunk(
+                    type="audio", index=index, audio_base64=audio_base64, audio_url=artifact.url, duration_seconds=duration
+                ))
+
+        text_task = asyncio.create_task(produce_text())
+        audio_task = asyncio.create_task(narrate())
+
+        async def supervise():
+            try:
+                await asyncio.gather(text_task, audio_task)
+                await events.put(StoryNarrationChunk(type="done"))
+            except Exception as e:
+                text_task.cancel()
+                audio_task.cancel()
+                await events.put(StoryNarrationChunk(type="error", message=f"Story narration failed: {str(e)}"))
+            finally:
+                await events.put(None)
+
+        supervisor = asyncio.create_task(supervise())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # The client may disconnect mid-stream; stop generating for nobody
+            for task in (text_task, audio_task, supervisor):
+                task.cancel()
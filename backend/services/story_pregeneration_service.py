@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from models.requests import StoryGenerationRequest
+from services.metrics import QUEUE_WAIT_SECONDS
+
+
+PREGENERATION_ENABLED = os.getenv("PREGENERATION_ENABLED", "false").lower() == "true"
+PREGENERATION_TTL_SECONDS = float(os.getenv("PREGENERATION_TTL_SECONDS", "600"))
+PREGENERATION_MAX_QUEUE = int(os.getenv("PREGENERATION_MAX_QUEUE", "32"))
+PREGENERATION_MAX_CACHED = int(os.getenv("PREGENERATION_MAX_CACHED", "256"))
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(request: StoryGenerationRequest, tenant: Optional[str] = None) -> Tuple[str, ...]:
+    """Identify a story request by tenant, student, subject, topic and characters.
+
+    The student is the student_id plus the name, within the tenant, so two
+    children with the same name never share stories. Memory and previous
+    context are left out: they change from story to story and a follow-up story
+    does not need to match them exactly.
+    """
+    characters = ",".join(sorted(c.strip().lower() for c in request.characters or []))
+    return (
+        tenant or "",
+        (request.student_id or "").strip(),
+        request.student_name.strip().lower(),
+        request.subject.strip().lower(),
+        (request.topic_to_be_reached or "").strip().lower(),
+        characters,
+    )
+
+
+def _cache_key(request: StoryGenerationRequest, tenant: Optional[str]) -> Tuple[str, ...]:
+    # A story written for other memory notes does not fit this student's request
+    return request_key(request, tenant) + ((request.memory_context or "").strip(),)
+
+
+def predict_follow_ups(request: StoryGenerationRequest) -> List[StoryGenerationRequest]:
+    """Guess the next story requests a student is likely to make after this one"""
+    # Pre-generated stories only answer fresh requests, never continuations
+    request = request.model_copy(update={"previous_context": None})
+    # Another story on the same concept with the same characters
+    follow_ups = [request]
+    # The student moving on to the topic they are being led towards
+    if request.topic_to_be_reached and request.topic_to_be_reached.strip().lower() != request.subject.strip().lower():
+        follow_ups.append(request.model_copy(update={
+            "subject": request.topic_to_be_reached,
+            "topic_to_be_reached": None,
+        }))
+    return follow_ups
+
+
+class StoryPregenerationService:
+    """Pre-generates likely follow-up stories while the LLM backend is idle.
+
+    Observed requests queue predicted follow-ups; a single background worker only
+    dispatches them when no other LLM request is in flight, so live traffic always
+    takes priority. Stories are kept per tenant. Results sit in a short-TTL cache that the story endpoint
+    checks before calling the LLM. Each cached story is served at most once.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[StoryGenerationRequest], Awaitable[str]],
+        is_idle: Callable[[], bool],
+        ttl_seconds: float = PREGENERATION_TTL_SECONDS,
+        max_queue: int = PREGENERATION_MAX_QUEUE,
+        max_cached: int = PREGENERATION_MAX_CACHED,
+        idle_poll_interval: float = 0.5,
+    ):
+        self.generate = generate
+        self.is_idle = is_idle
+        self.ttl_seconds = ttl_seconds
+        self.max_cached = max_cached
+        self.idle_poll_interval = idle_poll_interval
+        self._queue: "asyncio.Queue[Tuple[float, StoryGenerationRequest, Optional[str]]]" = asyncio.Queue(maxsize=max_queue)
+        self._pending = set()
+        self._cache: "OrderedDict[Tuple[str, ...], Tuple[float, str]]" = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def take(self, request: StoryGenerationRequest, tenant: Optional[str]) -> Optional[str]:
+        """Return and remove a fresh pre-generated story for this request, if any.
+
+        Requests continuing a previous story never match: a pre-generated story
+        does not know how the last one ended.
+        """
+        if request.previous_context:
+            self.misses += 1
+            return None
+        key = _cache_key(request, tenant)
+        entry = self._cache.pop(key, None)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def observe(self, request: StoryGenerationRequest, tenant: Optional[str]):
+        """Queue the likely follow-ups of a request the tenant was just served"""
+        for follow_up in predict_follow_ups(request):
+            key = _cache_key(follow_up, tenant)
+            if key in self._pending or self._is_cached(key):
+                continue
+            try:
+                self._queue.put_nowait((time.monotonic(), follow_up, tenant))
+            except asyncio.QueueFull:
+                logger.debug("Pre-generation queue full, dropping follow-up for %s", follow_up.student_name)
+                return
+            self._pending.add(key)
+
+    def _is_cached(self, key: Tuple[str, ...]) -> bool:
+        entry = self._cache.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def _store(self, key: Tuple[str, ...], story: str):
+        self._cache[key] = (time.monotonic() + self.ttl_seconds, story)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    async def _run(self):
+        while True:
+            queued_at, request, tenant = await self._queue.get()
+            key = _cache_key(request, tenant)
+            try:
+                # A prediction older than the TTL is no longer worth the compute
+                if time.monotonic() - queued_at > self.ttl_seconds or self._is_cached(key):
+                    continue
+                while not self.is_idle():
+                    await asyncio.sleep(self.idle_poll_interval)
+                QUEUE_WAIT_SECONDS.labels(queue="pregeneration").observe(time.monotonic() - queued_at)
+                story = await self.generate(request)
+                if story:
+                    self._store(key, story)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Story pre-generation failed: {e}")
+            finally:
+                self._pending.discard(key)
+                self._queue.task_done()
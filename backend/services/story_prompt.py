@@ -0,0 +1,54 @@
+from typing import Any, Dict
+
+from models.requests import StoryGenerationRequest
+from services.prompt_builder import PromptBuilder, PromptTemplate, SharedPrefixPrompt
+
+
+# Static instructions form a byte-identical prefix so the LLM server can reuse its
+# KV-cache; per-student data goes last and optional context is trimmed to
+# PROMPT_CONTEXT_TOKEN_BUDGET
+STORY_SYSTEM_PROMPT = """You are a teacher helping a young neurodivergent student understand a basic math or science concept through a very short story.
+
+### Instructions:
+- Use the student profile in the user message to create a **simple story** that includes both a fun situation **and** teaches the core concept (e.g., addition, subtraction, fractions).
+- Be very clear and supportive. Say the steps out loud in the story.
+- Show how to solve the problem inside the story (e.g., "3 + 1 = 4").
+- Avoid using complex words, JSON formatting, or markdown.
+- End the story with a question to involve the student, based on what was just taught.
+
+Keep it short and friendly (about 2–4 lines). Example:
+"Ali the astronaut had 2 stars. Then he found 2 more. He counted: 2 + 2 = 4 stars. How many stars does Ali have now?\""""
+
+STORY_USER_TEMPLATE = """### Student Profile:
+- Name: {student_name}
+- Age: 3-6
+- Subject and Concept: {subject}
+- Memory Context: {memory_context}
+- Previous Context: {previous_context}
+- Characters: {characters}
+
+Generate the story now as plain text only."""
+
+STORY_PROMPT = SharedPrefixPrompt("classroom-story", STORY_SYSTEM_PROMPT, PromptBuilder(
+    PromptTemplate(STORY_USER_TEMPLATE),
+    optional_fields=("memory_context", "previous_context")
+))
+
+
+def build_story_payload(request: StoryGenerationRequest) -> Dict[str, Any]:
+    """Chat completion payload of the short classroom story served by /storygeneration and lesson packs"""
+    messages = STORY_PROMPT.messages({
+        "student_name": request.student_name,
+        "subject": request.subject,
+        "memory_context": request.memory_context,
+        "previous_context": request.previous_context,
+        "characters": ', '.join(request.characters) if request.characters else 'None',
+    })
+
+    return STORY_PROMPT.apply_cache_hints({
+        "model": "gemma-3-27b-it",
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 256,
+        "stream": False
+    })
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, List, Optional, Set, Tuple, TypeVar
+
+import inflect
+import numpy as np
+
+from models.requests import StoryGenerationRequest
+from services import metrics
+
+
+STORY_CACHE_ENABLED = os.getenv("STORY_CACHE_ENABLED", "true").lower() == "true"
+# Estimated Jaccard similarity of the normalized subject and topic words needed for a hit
+STORY_CACHE_SIMILARITY = float(os.getenv("STORY_CACHE_SIMILARITY", "0.6"))
+STORY_CACHE_MAX_ENTRIES = int(os.getenv("STORY_CACHE_MAX_ENTRIES", "512"))
+STORY_CACHE_TTL_SECONDS = float(os.getenv("STORY_CACHE_TTL_SECONDS", "86400"))
+
+MINHASH_PERMUTATIONS = 128
+_MERSENNE_PRIME = (1 << 31) - 1
+
+# Words that carry no meaning for which story fits a request
+_STOPWORDS = {
+    "a", "an", "and", "the", "of", "to", "up", "in", "on", "for", "with", "from", "by", "about",
+    "learn", "learning", "basic", "simple", "intro", "introduction", "number", "numbers", "math", "concept",
+}
+
+# Teachers' different names for the same operation
+_SYNONYMS = {
+    "addition": "add", "adding": "add", "plus": "add", "sum": "add", "sums": "add",
+    "subtraction": "subtract", "subtracting": "subtract", "minus": "subtract", "difference": "subtract",
+    "multiplication": "multiply", "multiplying": "multiply", "times": "multiply", "product": "multiply",
+    "division": "divide", "dividing": "divide", "sharing": "divide", "share": "divide",
+    "counting": "count", "fractions": "fraction", "halves": "half", "shapes": "shape",
+}
+
+_WORD = re.compile(r"[a-z]+|\d+")
+
+_inflect = inflect.engine()
+_random = np.random.RandomState(42)
+_PERMUTATION_A = _random.randint(1, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+V = TypeVar("V")
+
+
+def request_terms(request: StoryGenerationRequest) -> Set[str]:
+    """Normalized content words of a request's subject and topic"""
+    text = f"{request.subject} {request.topic_to_be_reached or ''}".lower()
+    terms = set()
+    for word in _WORD.findall(text):
+        if word.isdigit():
+            terms.update(_WORD.findall(_inflect.number_to_words(word, andword="")))
+            continue
+        word = _SYNONYMS.get(word, word)
+        if word not in _STOPWORDS:
+            terms.add(word)
+    return terms - _STOPWORDS
+
+
+def minhash(terms: Set[str]) -> np.ndarray:
+    """MinHash signature of a set of terms under MINHASH_PERMUTATIONS universal hash functions"""
+    if not terms:
+        return np.full(MINHASH_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint64)
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little") % _MERSENNE_PRIME
+         for term in terms],
+        dtype=np.uint64
+    )
+    # All operands are below 2^31, so a * hash + b cannot overflow 64 bits
+    permuted = (np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % np.uint64(_MERSENNE_PRIME)
+    return permuted.min(axis=0)
+
+
+def _replace_word(text: str, old: str, new: str) -> str:
+    if not old or not new or old.strip().lower() == new.strip().lower():
+        return text
+    return re.sub(rf"\b{re.escape(old.strip())}\b", new.strip(), text, flags=re.IGNORECASE)
+
+
+def personalize(text: str, cached_request: StoryGenerationRequest, request: StoryGenerationRequest) -> str:
+    """Swap the cached request's student name and characters for the new request's"""
+    # Placeholders first, so a new name equal to an old character is not replaced twice
+    replacements = [(cached_request.student_name, request.student_name)]
+    replacements += list(zip(cached_request.characters or [], request.characters or []))
+    for i, (old, _) in enumerate(replacements):
+        text = _replace_word(text, old, f"\x00{i}\x00")
+    for i, (old, new) in enumerate(replacements):
+        word = new.strip() if new else old.strip()
+        # "an astronaut" becomes "a dragon"
+        text = re.sub(
+            rf"\b([Aa]n?)(\s+)\x00{i}\x00",
+            lambda match: _article(word, match.group(1)) + match.group(2) + word,
+            text
+        )
+        text = text.replace(f"\x00{i}\x00", word)
+    return text
+
+
+def _article(word: str, original: str) -> str:
+    article = _inflect.a(word).split(" ", 1)[0]
+    return article.capitalize() if original[0].isupper() else article
+
+
+def personalize_characters(
+    characters: List[str],
+    cached_request: StoryGenerationRequest,
+    request: StoryGenerationRequest
+) -> List[str]:
+    return [personalize(character, cached_request, request) for character in characters]
+
+
+class _Entry(Generic[V]):
+    def __init__(self, tenant: str, request: StoryGenerationRequest, value: V, expires_at: float):
+        self.tenant = tenant
+        self.request = request
+        self.value = value
+        self.expires_at = expires_at
+        self.served_to: Set[str] = set()
+
+
+class StorySimilarityCache(Generic[V]):
+    """Approximate story cache matching requests whose subject and topic mean the same thing.
+
+    Requests are reduced to normalized content words (numbers spelled out, common
+    synonyms merged, filler words dropped) and compared by MinHash signature, so
+    "addition 1-10" finds a story made for "adding numbers up to ten". Only
+    stories whose prompt carried no student memory or previous context are
+    stored, since those could be served to another student after the name and
+    characters are swapped; no student is served the same story twice. Stories
+    are only shared within the tenant they were generated for, and only between
+    requests naming the same number of characters, since the swap is pairwise.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: float = STORY_CACHE_SIMILARITY,
+        max_entries: int = STORY_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = STORY_CACHE_TTL_SECONDS
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, _Entry[V]]" = OrderedDict()
+        self._signatures = np.zeros((0, MINHASH_PERMUTATIONS), dtype=np.uint64)
+        self._ids: List[int] = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _student(request: StoryGenerationRequest, tenant: str) -> str:
+        return f"{tenant}/{(request.student_id or request.student_name).strip().lower()}"
+
+    def lookup(
+        self,
+        request: StoryGenerationRequest,
+        tenant: Optional[str]
+    ) -> Optional[Tuple[StoryGenerationRequest, V]]:
+        """The most similar cached story of the tenant not yet served to this student, with the request it was made for.
+
+        Requests carrying memory or previous context never hit, mirroring store():
+        a generic story cannot continue the last one or reflect the student's notes.
+        Without a tenant (background work) nothing is looked up.
+        """
+        terms = request_terms(request)
+        if tenant is None or not terms or request.memory_context or request.previous_context:
+            return None
+        signature = minhash(terms)
+        student = self._student(request, tenant)
+        characters = len(request.characters or [])
+        now = time.monotonic()
+        with self._lock:
+            if self._ids:
+                similarity = (self._signatures == signature).mean(axis=1)
+                for index in np.argsort(-similarity):
+                    if similarity[index] < self.threshold:
+                        break
+                    entry = self._entries[self._ids[index]]
+                    if (
+                        entry.tenant != tenant
+                        or entry.expires_at < now
+                        or student in entry.served_to
+                        # Extra characters would keep their old names, missing ones would be left out
+                        or len(entry.request.characters or []) != characters
+                    ):
+                        continue
+                    entry.served_to.add(student)
+                    metrics.STORY_CACHE_LOOKUPS.labels(cache=self.name, outcome="hit").inc()
+                    return entry.request, entry.value
+        metrics.STORY_CACHE_LOOKUPS.labels(cache=self.name, outcome="miss").inc()
+        return None
+
+    def store(self, request: StoryGenerationRequest, value: V, tenant: Optional[str]):
+        """Cache a story generated for request within its tenant, unless its prompt was specific to the student"""
+        terms = request_terms(request)
+        if tenant is None or not terms or request.memory_context or request.previous_context:
+            return
+        signature = minhash(terms)
+        with self._lock:
+            entry = _Entry(tenant, request, value, time.monotonic() + self.ttl_seconds)
+            entry.served_to.add(self._student(request, tenant))
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._ids = list(self._entries)
+            self._signatures = np.vstack([self._signatures, signature])[-len(self._ids):]
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import random
+import re
+from typing import Dict, List, Optional, Tuple
+
+import inflect
+
+from models.requests import StoryGenerationRequest
+
+
+# "concepts": simple concepts always use templates; "fallback": only when the LLM is saturated or failing; "off"
+STORY_TEMPLATES_MODE = os.getenv("STORY_TEMPLATES_MODE", "fallback").lower()
+# LLM calls in flight (running or queued) at which the LLM counts as saturated
+STORY_TEMPLATES_SATURATION_IN_FLIGHT = int(os.getenv("STORY_TEMPLATES_SATURATION_IN_FLIGHT", "8"))
+# Largest number used when the subject does not name one ("addition up to 10")
+STORY_TEMPLATES_DEFAULT_MAX = 5
+STORY_TEMPLATES_LIMIT = 20
+
+ADDITION = "addition"
+SUBTRACTION = "subtraction"
+COUNTING = "counting"
+
+_CONCEPT_WORDS = {
+    ADDITION: {"add", "adding", "addition", "plus", "sum", "sums"},
+    SUBTRACTION: {"subtract", "subtracting", "subtraction", "minus", "takeaway"},
+    COUNTING: {"count", "counting", "counts"},
+}
+# Besides concept words and numbers, a subject may only hold these; anything else
+# ("two-digit", "angles", "syllables", "by tens") is more than a template can teach
+_ALLOWED_WORDS = {
+    "up", "to", "within", "from", "through", "and", "numbers", "number", "small", "simple", "basic", "easy",
+    "single", "digit", "digits", "objects", "things",
+}
+_CONCEPT_VOCABULARY = set().union(*_CONCEPT_WORDS.values())
+_NUMBER_WORDS = {
+    word: value for value, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+        "sixteen seventeen eighteen nineteen twenty".split()
+    )
+}
+_WORD = re.compile(r"[a-z]+|\d+")
+_TAKE_AWAY = re.compile(r"\btake[\s-]+away\b")
+
+CHARACTERS = ["astronaut", "pirate", "explorer", "chef", "gardener", "firefighter", "train driver", "scientist"]
+# Characters children ask for that are roles, not names, even when written "Robot" or "Teddy Bear"
+COMMON_CHARACTERS = set(CHARACTERS) | {
+    "robot", "dragon", "dinosaur", "unicorn", "dog", "puppy", "cat", "kitten", "bunny", "rabbit", "bear",
+    "teddy bear", "lion", "tiger", "monkey", "elephant", "giraffe", "panda", "penguin", "fox", "owl", "frog",
+    "turtle", "fish", "shark", "whale", "dolphin", "horse", "pony", "mouse", "bird", "butterfly", "bee",
+    "mermaid", "fairy", "wizard", "witch", "knight", "prince", "princess", "king", "queen", "superhero",
+    "monster", "alien", "ghost", "pilot", "doctor", "teacher", "farmer", "builder", "detective", "ninja",
+}
+_ARTICLE = re.compile(r"^(?:a|an|the|my)\s+", re.IGNORECASE)
+# (object, place where the story happens, preposition for being there)
+OBJECTS = [
+    ("star", "night sky", "in"), ("apple", "orchard", "in"), ("shell", "beach", "on"), ("balloon", "party", "at"),
+    ("block", "playroom", "in"), ("carrot", "garden", "in"), ("cookie", "kitchen", "in"), ("boat", "pond", "on"),
+    ("ladybug", "park", "in"), ("book", "library", "in"),
+]
+
+# One sentence per entry, so each can be capitalized after the slots are filled
+TEMPLATES: Dict[str, List[List[str]]] = {
+    ADDITION: [
+        ["{hero} had {a} {things_a}.", "Then {name} found {b} more.",
+         "{name} counted: {a} + {b} = {total} {things_total}.", "How many {things} does {name} have now?"],
+        ["{hero} was {at_place} with {a} {things_a}.", "{friend} brought {b} more.",
+         "{name} put them together: {a} + {b} = {total}.", "Can you count all {total} {things_total} with {name}?"],
+        ["{at_place}, {hero} picked up {a} {things_a}.", "Then {name} picked up {b} more.",
+         "{a} and {b} make {total}, so {a} + {b} = {total}.", "How many {things} did {name} pick up in all?"],
+    ],
+    SUBTRACTION: [
+        ["{hero} had {a} {things_a}.", "{b} of them rolled away.",
+         "{name} counted what was left: {a} - {b} = {rest}.", "How many {things} does {name} have now?"],
+        ["{hero} was {at_place} with {a} {things_a}.", "{name} gave {b} to {friend_lower}.",
+         "{a} take away {b} is {rest}, so {a} - {b} = {rest}.", "How many {things} are left for {name}?"],
+        ["{at_place}, {hero} saw {a} {things_a}.", "Then {b} went away.",
+         "{name} counted: {a} - {b} = {rest} {things_rest}.", "Can you find how many {things} stayed?"],
+    ],
+    COUNTING: [
+        ["{hero} went to the {place} and saw some {things}.", "{name} counted them one by one: {sequence}.",
+         "There were {n} {things_n}!", "Can you count to {n} with {name}?"],
+        ["{hero} lined up the {things} {at_place}.", "{name} touched each one and said: {sequence}.",
+         "That makes {n} {things_n}.", "How many {things} did {name} count?"],
+    ],
+}
+
+_inflect = inflect.engine()
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return _WORD.findall(_TAKE_AWAY.sub("takeaway", (text or "").lower()))
+
+
+def _number(word: str) -> Optional[int]:
+    if word.isdigit():
+        return int(word)
+    return _NUMBER_WORDS.get(word)
+
+
+def _simple_words(words: List[str]) -> bool:
+    return all(word in _CONCEPT_VOCABULARY or word in _ALLOWED_WORDS or _number(word) is not None for word in words)
+
+
+def recognize_concept(request: StoryGenerationRequest) -> Optional[Tuple[str, int]]:
+    """The simple concept a request asks for and the largest number to use, or None if it is not simple.
+
+    The subject (and topic, if any) must consist of concept words, numbers and a
+    few connecting words only: "adding numbers up to 10" is simple, "sum of
+    angles in a triangle" is not.
+    """
+    words = _words(request.subject)
+    if not words or not _simple_words(words):
+        return None
+    if request.topic_to_be_reached and not _simple_words(_words(request.topic_to_be_reached)):
+        return None
+    concepts = [concept for concept, concept_words in _CONCEPT_WORDS.items() if concept_words.intersection(words)]
+    if len(concepts) != 1:
+        return None
+
+    numbers = []
+    for i, word in enumerate(words):
+        value = _number(word)
+        if value is None:
+            continue
+        if i + 1 < len(words) and words[i + 1] in ("digit", "digits"):
+            # "two-digit numbers" counts digits: up to 99
+            value = 10 ** value - 1
+        numbers.append(value)
+    if "single" in words:
+        numbers.append(9)
+    largest = max(numbers) if numbers else STORY_TEMPLATES_DEFAULT_MAX
+    if largest > STORY_TEMPLATES_LIMIT:
+        return None
+    return concepts[0], max(largest, 3)
+
+
+def _rng(request: StoryGenerationRequest) -> random.Random:
+    # Same request, same story; a new previous_context moves the student on to a new one
+    key = "|".join([
+        request.student_name.strip().lower(),
+        request.subject.strip().lower(),
+        ",".join(request.characters or []),
+        request.previous_context or "",
+    ])
+    return random.Random(int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big"))
+
+
+def _count(noun: str, number: int) -> str:
+    return _inflect.plural_noun(noun, number)
+
+
+def _capitalize(sentence: str) -> str:
+    return sentence[:1].upper() + sentence[1:]
+
+
+def _is_role(character: str) -> bool:
+    """A common noun ("robot", "Robot", "a dragon") rather than a name ("Maya")"""
+    return character.lower() in COMMON_CHARACTERS or not character[:1].isupper()
+
+
+def render_story(request: StoryGenerationRequest) -> Optional[str]:
+    """A 3-4 sentence story teaching a recognized simple concept, in the style the LLM prompt asks for"""
+    recognized = recognize_concept(request)
+    if recognized is None:
+        return None
+    concept, largest = recognized
+    rng = _rng(request)
+
+    characters = [_ARTICLE.sub("", character.strip()) for character in request.characters or [] if character.strip()]
+    name = request.student_name.strip()
+    if name.islower():
+        name = name.title()
+    # Common nouns become the student's role ("Ali the robot"); names become the friend in the story
+    roles = [character.lower() for character in characters if _is_role(character)]
+    names = [character for character in characters if not _is_role(character) and character.lower() != name.lower()]
+    thing, place, preposition = rng.choice(OBJECTS)
+    friend = names[0] if names else "a friend"
+
+    slots = {
+        "name": name,
+        "hero": f"{name} the {roles[0] if roles else rng.choice(CHARACTERS)}",
+        "friend": friend,
+        "friend_lower": friend if names else friend.lower(),
+        "place": place,
+        "at_place": f"{preposition} the {place}",
+        "things": _count(thing, 2),
+    }
+    if concept == ADDITION:
+        a = rng.randint(1, largest - 1)
+        b = rng.randint(1, largest - a)
+        slots.update(a=a, b=b, total=a + b, things_a=_count(thing, a), things_total=_count(thing, a + b))
+    elif concept == SUBTRACTION:
+        a = rng.randint(2, largest)
+        b = rng.randint(1, a - 1)
+        slots.update(a=a, b=b, rest=a - b, things_a=_count(thing, a), things_rest=_count(thing, a - b))
+    else:
+        n = rng.randint(3, largest)
+        slots.update(n=n, things_n=_count(thing, n), sequence=", ".join(str(i) for i in range(1, n + 1)))
+
+    template = rng.choice(TEMPLATES[concept])
+    return " ".join(_capitalize(sentence.format(**slots)) for sentence in template)
+
+
+def template_story(
+    request: StoryGenerationRequest,
+    llm_in_flight: int,
+    mode: str = STORY_TEMPLATES_MODE
+) -> Optional[Tuple[str, str]]:
+    """The templated story to serve instead of calling the LLM, and why ("concept" or "saturated"), if the mode allows it"""
+    # A continuation only gets a template when the LLM cannot keep up, as templates ignore previous_context
+    if mode == "concepts" and not request.previous_context:
+        reason = "concept"
+    elif mode in ("concepts", "fallback") and llm_in_flight >= STORY_TEMPLATES_SATURATION_IN_FLIGHT:
+        reason = "saturated"
+    else:
+        return None
+    story = render_story(request)
+    return (story, reason) if story is not None else None
@@ -0,0 +1,81 @@
+import base64
+import io
+import os
+import time
+import wave
+from typing import Optional, Tuple
+
+
+STUB_VOICE_LATENCY_SECONDS = float(os.getenv("STUB_VOICE_LATENCY_SECONDS", "0.5"))
+STUB_VOICE_SAMPLE_RATE = 22050
+
+# Roughly the pace of the OpenVoice base speaker at speed 1.0
+CHARS_PER_SECOND = 15.0
+
+
+def silent_wav_bytes(duration_seconds: float, sample_rate: int = STUB_VOICE_SAMPLE_RATE) -> bytes:
+    """Build a mono 16-bit PCM WAV file containing silence"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(b"\x00\x00" * int(duration_seconds * sample_rate))
+    return buffer.getvalue()
+
+
+class StubVoiceCloneService:
+    """Stand-in for VoiceCloneService that sleeps for a configurable latency and returns silence.
+
+    Used for load testing the API without loading the OpenVoice models
+    (VOICE_SERVICE=stub).
+    """
+
+    def __init__(self, latency_seconds: float = STUB_VOICE_LATENCY_SECONDS):
+        self.device = "cpu"
+        self.latency_seconds = latency_seconds
+        self.output_dir = os.path.join(os.path.dirname(__file__), '..', 'outputs')
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _speak(self, text: str, speed: float, output_path: str) -> float:
+        time.sleep(self.latency_seconds)
+        duration = max(0.5, len(text) / (CHARS_PER_SECOND * (speed or 1.0)))
+        with open(output_path, "wb") as audio_file:
+            audio_file.write(silent_wav_bytes(duration))
+        return duration
+
+    def extract_speaker_embedding(self, reference_audio_path: str):
+        import torch
+
+        time.sleep(self.latency_seconds)
+        # Same shape as the OpenVoice tone color embedding
+        return torch.zeros(1, 256, 1)
+
+    def synthesize_with_embedding(
+        self,
+        text: str,
+        target_se,
+        output_path: str,
+        speed: float = 1.0,
+        language: str = "English"
+    ) -> float:
+        return self._speak(text, speed, output_path)
+
+    def clone_voice(
+        self,
+        text: str,
+        reference_audio_base64: str,
+        speed: float = 1.0,
+        language: str = "English",
+        output_filename: Optional[str] = None
+    ) -> Tuple[str, str, float]:
+        if output_filename is None:
+            output_filename = f"cloned_voice_{int(time.time())}.wav"
+        if not output_filename.endswith('.wav'):
+            output_filename += '.wav'
+        final_output_path = os.path.join(self.output_dir, output_filename)
+
+        duration = self._speak(text, speed, final_output_path)
+        with open(final_output_path, "rb") as audio_file:
+            audio_base64 = base64.b64encode(audio_file.read()).decode("utf-8")
+        return final_output_path, audio_base64, duration
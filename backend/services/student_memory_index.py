@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.requests import StoryGenerationRequest
+from services.prompt_builder import estimate_tokens, trim_to_token_budget
+
+
+STUDENT_MEMORY_ENABLED = os.getenv("STUDENT_MEMORY_ENABLED", "false").lower() == "true"
+STUDENT_MEMORY_DB = os.getenv(
+    "STUDENT_MEMORY_DB",
+    os.path.join(os.path.dirname(__file__), '..', 'uploads', 'student_memory.sqlite3')
+)
+STUDENT_MEMORY_TOP_K = int(os.getenv("STUDENT_MEMORY_TOP_K", "5"))
+# Tokens of retrieved snippets put into the prompt, within PROMPT_CONTEXT_TOKEN_BUDGET
+STUDENT_MEMORY_TOKEN_BUDGET = int(os.getenv("STUDENT_MEMORY_TOKEN_BUDGET", "160"))
+# Optional sentence-transformers model for hybrid retrieval, e.g. "all-MiniLM-L6-v2"; BM25 only when unset
+STUDENT_MEMORY_EMBEDDING_MODEL = os.getenv("STUDENT_MEMORY_EMBEDDING_MODEL", "")
+
+SNIPPET_MAX_CHARS = 400
+# Reciprocal rank fusion constant for combining BM25 and embedding rankings
+_RRF_K = 60
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+logger = logging.getLogger(__name__)
+
+
+def student_key(request: StoryGenerationRequest, tenant: Optional[str]) -> Optional[str]:
+    """Index key of a student within a tenant; None (not indexed) without an explicit student_id.
+
+    Names are not identities: two children called Ali, in one school or two,
+    must never see each other's memories.
+    """
+    student_id = (request.student_id or "").strip()
+    if not student_id or not tenant:
+        return None
+    return f"{tenant}/{student_id}"
+
+
+def split_snippets(text: Optional[str], max_chars: int = SNIPPET_MAX_CHARS) -> List[str]:
+    """Split free text into line and sentence based snippets of at most about max_chars"""
+    snippets = []
+    for line in (text or "").splitlines():
+        current = ""
+        for sentence in _SENTENCE_END.split(line.strip()):
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                snippets.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}".strip()
+        if current:
+            snippets.append(current)
+    return snippets
+
+
+def _match_query(text: str) -> str:
+    """FTS5 query matching any word of text; quoting keeps words from being read as operators"""
+    words = dict.fromkeys(_WORD.findall(text.lower()))
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+class StudentMemoryIndex:
+    """Per-student retrieval index over memories and earlier stories.
+
+    Snippets live in SQLite with an FTS5 table ranked by BM25. When an embedding
+    model is configured, snippet vectors are stored alongside and the BM25 and
+    cosine rankings are fused. Only the top snippets that fit the token budget
+    go into a prompt, so context stays small as a student's history grows.
+    """
+
+    def __init__(self, path: str = STUDENT_MEMORY_DB, embedding_model: str = STUDENT_MEMORY_EMBEDDING_MODEL):
+        self.path = path
+        self.embedding_model = embedding_model
+        self._encoder = None
+        self._encoder_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS snippets (
+                    id INTEGER PRIMARY KEY,
+                    student TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    embedding BLOB,
+                    UNIQUE (student, digest)
+                );
+                CREATE INDEX IF NOT EXISTS snippets_recent ON snippets (student, created_at);
+                CREATE VIRTUAL TABLE IF NOT EXISTS snippets_fts USING fts5(
+                    text, student UNINDEXED, content='snippets', content_rowid='id'
+                );
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets several API workers read while one writes
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _encode(self, texts: Sequence[str]) -> Optional[np.ndarray]:
+        if not self.embedding_model or not texts:
+            return None
+        with self._encoder_lock:
+            if self._encoder is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    logger.warning("sentence-transformers is not installed; student memory uses BM25 only")
+                    self.embedding_model = ""
+                    return None
+                self._encoder = SentenceTransformer(self.embedding_model, device="cpu")
+            return np.asarray(self._encoder.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+    def add(self, student: str, text: Optional[str], kind: str = "memory") -> int:
+        """Index the snippets of text for a student, skipping ones already stored. Returns how many were new."""
+        snippets = split_snippets(text)
+        if not snippets:
+            return 0
+        digests = [hashlib.sha1(s.lower().encode("utf-8")).hexdigest() for s in snippets]
+        db = self._connection()
+        known = {row[0] for row in db.execute(
+            f"SELECT digest FROM snippets WHERE student = ? AND digest IN ({','.join('?' * len(digests))})",
+            (student, *digests)
+        )}
+        new = [(s, d) for s, d in dict(zip(snippets, digests)).items() if d not in known]
+        if not new:
+            return 0
+        embeddings = self._encode([s for s, _ in new])
+        now = time.time()
+        with db:
+            for i, (snippet, digest) in enumerate(new):
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO snippets (student, kind, digest, text, created_at, embedding) VALUES (?, ?, ?, ?, ?, ?)",
+                    (student, kind, digest, snippet, now, None if embeddings is None else embeddings[i].tobytes())
+                )
+                if cursor.rowcount:
+                    db.execute(
+                        "INSERT INTO snippets_fts (rowid, text, student) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, snippet, student)
+                    )
+        return len(new)
+
+    def search(self, student: str, query: str, top_k: int = STUDENT_MEMORY_TOP_K) -> List[str]:
+        """Most relevant snippets of a student for query, topped up with the most recent ones"""
+        db = self._connection()
+        rankings: List[List[Tuple[int, str]]] = []
+        match = _match_query(query)
+        if match:
+            rankings.append(db.execute(
+                "SELECT rowid, text FROM snippets_fts WHERE snippets_fts MATCH ? AND student = ? "
+                "ORDER BY bm25(snippets_fts) LIMIT ?",
+                (match, student, top_k * 4)
+            ).fetchall())
+
+        query_embedding = self._encode([query]) if query else None
+        if query_embedding is not None:
+            rows = db.execute(
+                "SELECT id, text, embedding FROM snippets WHERE student = ? AND embedding IS NOT NULL", (student,)
+            ).fetchall()
+            if rows:
+                vectors = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+                order = np.argsort(-(vectors @ query_embedding[0]))[:top_k * 4]
+                rankings.append([(rows[i][0], rows[i][1]) for i in order])
+
+        scores = {}
+        texts = {}
+        for ranking in rankings:
+            for rank, (snippet_id, text) in enumerate(ranking):
+                scores[snippet_id] = scores.get(snippet_id, 0.0) + 1.0 / (_RRF_K + rank)
+                texts[snippet_id] = text
+        results = [texts[i] for i in sorted(scores, key=scores.get, reverse=True)[:top_k]]
+
+        if len(results) < top_k:
+            for _, text in db.execute(
+                "SELECT id, text FROM snippets WHERE student = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (student, top_k)
+            ):
+                if text not in results:
+                    results.append(text)
+                if len(results) == top_k:
+                    break
+        return results
+
+    def context_for(
+        self,
+        student: str,
+        request: StoryGenerationRequest,
+        top_k: int = STUDENT_MEMORY_TOP_K,
+        token_budget: int = STUDENT_MEMORY_TOKEN_BUDGET
+    ) -> str:
+        """Index the request's memory context and return the student's relevant history within token_budget"""
+        self.add(student, request.memory_context, kind="memory")
+        query = " ".join(filter(None, [
+            request.subject,
+            request.topic_to_be_reached,
+            " ".join(request.characters or []),
+            request.previous_context,
+        ]))
+
+        lines = []
+        remaining = token_budget
+        for snippet in self.search(student, query, top_k):
+            if estimate_tokens(snippet) > remaining:
+                # Lower-ranked snippets may still fit; the best one is trimmed rather than dropped
+                if lines:
+                    continue
+                snippet = trim_to_token_budget(snippet, remaining)
+            lines.append(snippet)
+            remaining -= estimate_tokens(snippet)
+        return "\n".join(lines)
+
+    def add_story(self, student: str, story: str) -> int:
+        return self.add(student, story, kind="story")
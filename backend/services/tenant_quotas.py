@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from services import metrics
+
+
+# Off by default: every caller without a tenant header would otherwise share one "anonymous" budget
+TENANT_QUOTAS_ENABLED = os.getenv("TENANT_QUOTAS_ENABLED", "false").lower() == "true"
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant-Id")
+API_KEY_HEADER = os.getenv("API_KEY_HEADER", "X-API-Key")
+TENANT_LLM_TOKENS_PER_MINUTE = float(os.getenv("TENANT_LLM_TOKENS_PER_MINUTE", "20000"))
+TENANT_LLM_BURST_TOKENS = float(os.getenv("TENANT_LLM_BURST_TOKENS", "40000"))
+TENANT_TTS_SECONDS_PER_MINUTE = float(os.getenv("TENANT_TTS_SECONDS_PER_MINUTE", "300"))
+TENANT_TTS_BURST_SECONDS = float(os.getenv("TENANT_TTS_BURST_SECONDS", "600"))
+# "tenant=weight,..."; "*" sets the default. Weights scale both the budgets and the fair share.
+TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")
+TENANT_LLM_CONCURRENCY = int(os.getenv("TENANT_LLM_CONCURRENCY", "4"))
+TENANT_VOICE_CONCURRENCY = int(os.getenv("TENANT_VOICE_CONCURRENCY", "1"))
+
+# Narration speed of the base speakers, used to estimate TTS seconds from text
+TTS_CHARS_PER_SECOND = 15.0
+
+LLM_TOKENS = "llm_tokens"
+TTS_SECONDS = "tts_seconds"
+
+ANONYMOUS_TENANT = "anonymous"
+# Work not started by a request, such as story pre-generation
+BACKGROUND_TENANT = "background"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """Parse "tenant=weight,..." into a mapping; "*" sets the default weight"""
+    weights = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        tenant, weight = item.rsplit("=", 1)
+        weights[tenant.strip()] = max(float(weight), 0.01)
+    return weights
+
+
+def tenant_id(request: Request) -> str:
+    """Identify the caller by API key (hashed, so keys never reach logs or metrics) or tenant header"""
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key:
+        return "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    tenant = (request.headers.get(TENANT_HEADER) or "").strip()
+    return tenant[:64] or ANONYMOUS_TENANT
+
+
+def estimate_tts_seconds(text_chars: int, speed: float = 1.0) -> float:
+    return text_chars / TTS_CHARS_PER_SECOND / (speed or 1.0)
+
+
+class TokenBucket:
+    """Budget refilled continuously at rate per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available; 0 if it is now. Requests above capacity count as capacity."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing, 0.0) / self.rate if self.rate > 0 else math.inf
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Charge (or refund, if negative) a correction; the balance may go into debt"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class FairQueue:
+    """Weighted fair queuing in front of a resource with a fixed number of slots.
+
+    Start-time fair queuing: each request is tagged with a virtual start time of
+    max(virtual clock, the tenant's previous finish tag), and its finish tag adds
+    cost / weight. Free slots go to the waiting request with the smallest start
+    tag, so a tenant with a long backlog only gets its weighted share while
+    others are waiting, however many requests it queues.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(capacity, 1)
+        self.active = 0
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[str, float] = {}
+        self._waiting: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, weight: float, cost: float) -> AsyncIterator[None]:
+        start_tag = max(self._virtual_time, self._finish_tags.get(tenant, 0.0))
+        self._finish_tags[tenant] = start_tag + max(cost, 1.0) / weight
+
+        if self.active < self.capacity and not self._waiting:
+            self.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (start_tag, next(self._sequence), future))
+            queued_at = time.monotonic()
+            try:
+                await future
+            except asyncio.CancelledError:
+                # The slot may have been handed over just before the cancellation
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+            metrics.QUEUE_WAIT_SECONDS.labels(queue=f"fair_{self.name}").observe(time.monotonic() - queued_at)
+
+        self._virtual_time = max(self._virtual_time, start_tag)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                # The slot passes straight to the next request
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class TenantQuotas:
+    """Per-tenant token buckets for LLM tokens and TTS seconds, plus fair queues for both backends"""
+
+    def __init__(
+        self,
+        llm_tokens_per_minute: float = TENANT_LLM_TOKENS_PER_MINUTE,
+        llm_burst_tokens: float = TENANT_LLM_BURST_TOKENS,
+        tts_seconds_per_minute: float = TENANT_TTS_SECONDS_PER_MINUTE,
+        tts_burst_seconds: float = TENANT_TTS_BURST_SECONDS,
+        weights: str = TENANT_WEIGHTS,
+        llm_concurrency: int = TENANT_LLM_CONCURRENCY,
+        voice_concurrency: int = TENANT_VOICE_CONCURRENCY
+    ):
+        self.limits = {
+            LLM_TOKENS: (llm_tokens_per_minute / 60.0, llm_burst_tokens),
+            TTS_SECONDS: (tts_seconds_per_minute / 60.0, tts_burst_seconds),
+        }
+        self.weights = parse_weights(weights)
+        self.queues = {
+            LLM_TOKENS: FairQueue("llm", llm_concurrency),
+            TTS_SECONDS: FairQueue("voice", voice_concurrency),
+        }
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, self.weights.get("*", 1.0))
+
+    def bucket(self, tenant: str, resource: str) -> TokenBucket:
+        bucket = self._buckets.get((tenant, resource))
+        if bucket is None:
+            rate, capacity = self.limits[resource]
+            weight = self.weight(tenant)
+            bucket = self._buckets[(tenant, resource)] = TokenBucket(rate * weight, capacity * weight)
+        return bucket
+
+    def admit(self, tenant: str, costs: Dict[str, float]):
+        """Take the estimated costs from the tenant's budgets, or raise 429 without taking any"""
+        waits = {resource: self.bucket(tenant, resource).wait_time(cost) for resource, cost in costs.items() if cost > 0}
+        exhausted = [resource for resource, wait in waits.items() if wait > 0]
+        if exhausted:
+            retry_after = max(waits[resource] for resource in exhausted)
+            for resource in exhausted:
+                metrics.RATE_LIMITED.labels(resource=resource).inc()
+            logger.info("Tenant %s over its %s budget", tenant, ", ".join(exhausted))
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded for {', '.join(exhausted)}; retry in {math.ceil(retry_after)}s",
+                headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
+            )
+        for resource, cost in costs.items():
+            if cost > 0:
+                self.bucket(tenant, resource).take(cost)
+
+
+class TenantLease:
+    """A request's claim on its tenant's budgets, settled against actual usage when it ends"""
+
+    def __init__(self, quotas: Optional[TenantQuotas], tenant: str):
+        self.quotas = quotas
+        self.tenant = tenant
+        self.charged: Dict[str, float] = {}
+        self.used: Dict[str, float] = {}
+
+    def admit(self, llm_tokens: float = 0.0, tts_seconds: float = 0.0):
+        """Charge estimated costs up front; raises HTTPException(429) with Retry-After when over budget"""
+        if self.quotas is None:
+            return
+        costs = {LLM_TOKENS: llm_tokens, TTS_SECONDS: tts_seconds}
+        self.quotas.admit(self.tenant, costs)
+        for resource, cost in costs.items():
+            self.charged[resource] = self.charged.get(resource, 0.0) + cost
+
+    def record(self, resource: str, amount: float):
+        self.used[resource] = self.used.get(resource, 0.0) + amount
+
+    def settle(self):
+        """Refund overestimates and charge underestimates (capped estimates, cache hits, failures)"""
+        if self.quotas is None:
+            return
+        for resource, charged in self.charged.items():
+            correction = self.used.get(resource, 0.0) - charged
+            if correction:
+                self.quotas.bucket(self.tenant, resource).adjust(correction)
+
+
+tenant_quotas = TenantQuotas() if TENANT_QUOTAS_ENABLED else None
+
+_current_lease: ContextVar[Optional[TenantLease]] = ContextVar("tenant_lease", default=None)
+
+
+async def tenant_lease(request: Request) -> AsyncIterator[TenantLease]:
+    """FastAPI dependency giving the endpoint its tenant's lease for the duration of the request"""
+    lease = TenantLease(tenant_quotas, tenant_id(request))
+    token = _current_lease.set(lease)
+    try:
+        yield lease
+    finally:
+        lease.settle()
+        _current_lease.reset(token)
+
+
+def current_tenant() -> Optional[str]:
+    """Tenant of the request being served; None for background work such as pre-generation"""
+    lease = _current_lease.get()
+    return lease.tenant if lease is not None else None
+
+
+def record_usage(resource: str, amount: float):
+    """Attribute actual usage to the current request's lease, if any"""
+    lease = _current_lease.get()
+    if lease is not None:
+        lease.record(resource, amount)
+
+
+@asynccontextmanager
+async def fair_share(resource: str, cost: float) -> AsyncIterator[None]:
+    """Hold a slot of the LLM or voice backend, granted in weighted fair order across tenants"""
+    if tenant_quotas is None:
+        yield
+        return
+    lease = _current_lease.get()
+    tenant = lease.tenant if lease is not None else BACKGROUND_TENANT
+    async with tenant_quotas.queues[resource].slot(tenant, tenant_quotas.weight(tenant), cost):
+        yield
@@ -0,0 +1,63 @@
+import re
+
+
+# Spoken form of the math symbols that appear in lesson stories
+MATH_SYMBOL_WORDS = {
+    "×": "multiplied by",
+    "÷": "divided by",
+    "=": "equals",
+    "+": "plus",
+    "-": "minus",
+    "*": "times",
+    "/": "divided by",
+}
+
+
+def clean_story_text(text: str) -> str:
+    """Clean and normalize story text from encoding issues"""
+    if not text:
+        return ""
+    
+    # Fix common UTF-8 encoding issues
+    cleaned_text = text
+    
+    # Handle smart quotes and apostrophes
+    cleaned_text = cleaned_text.replace('"', '"')  # Left double quote
+    cleaned_text = cleaned_text.replace('"', '"')  # Right double quote
+    cleaned_text = cleaned_text.replace(''', "'")  # Left single quote
+    cleaned_text = cleaned_text.replace(''', "'")  # Right single quote
+    cleaned_text = cleaned_text.replace('´', "'")  # Acute accent
+    cleaned_text = cleaned_text.replace('`', "'")  # Grave accent
+    
+    # Handle em dashes and en dashes
+    cleaned_text = cleaned_text.replace('—', '-')  # Em dash
+    cleaned_text = cleaned_text.replace('–', '-')  # En dash
+    
+    # Handle ellipsis
+    cleaned_text = cleaned_text.replace('…', '...')
+    
+    # Handle common encoding artifacts
+    cleaned_text = cleaned_text.replace('â€™', "'")  # Common apostrophe encoding
+    cleaned_text = cleaned_text.replace('â€œ', '"')  # Common left quote encoding
+    cleaned_text = cleaned_text.replace('â€', '"')   # Common right quote encoding
+    cleaned_text = cleaned_text.replace('â€"', '-')  # Common dash encoding
+    cleaned_text = cleaned_text.replace('Ã¢â‚¬â„¢', "'")  # Another apostrophe variant
+    cleaned_text = cleaned_text.replace('â', "'")    # Generic â replacement
+    
+    # Remove any remaining non-printable characters except newlines and tabs
+    cleaned_text = re.sub(r'[^\x20-\x7E\n\t]', '', cleaned_text)
+    
+    # Normalize whitespace
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+    cleaned_text = cleaned_text.strip()
+    
+    return cleaned_text
+
+
+def replace_math_symbols(text: str) -> str:
+    """Spell out math symbols so they are read aloud by text-to-speech"""
+    return text.replace("×", " multiplied by").replace("÷", " divided by ").replace("=", " equals").replace("+", " plus ").replace("-", " minus ")
+
+
+def clean_narration_sentence(sentence: str) -> str:
+    return replace_math_symbols(clean_story_text(sentence)).strip()
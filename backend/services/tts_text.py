@@ -0,0 +1,104 @@
+import os
+import re
+from typing import List
+
+import inflect
+import numpy as np
+
+from services.text_cleaning import MATH_SYMBOL_WORDS, clean_story_text
+
+
+TTS_CHUNK_MAX_CHARS = int(os.getenv("TTS_CHUNK_MAX_CHARS", "200"))
+TTS_CROSSFADE_SECONDS = float(os.getenv("TTS_CROSSFADE_SECONDS", "0.02"))
+# Pause between chunks at speed 1.0, as OpenVoice inserts between sentences
+TTS_PAUSE_SECONDS = float(os.getenv("TTS_PAUSE_SECONDS", "0.05"))
+
+_inflect = inflect.engine()
+
+# Operators only between operands, so hyphenated words and slashes in prose are left alone
+_MATH_EXPRESSION = re.compile(r"(?<=[\w)])\s*([×÷=+\-*/])\s*(?=[\w(])")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?(?:st|nd|rd|th)?")
+# Full-width CJK punctuation ends a sentence or clause without a following space
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])\s*")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+|(?<=[，；：、])\s*")
+
+
+def _spell_operator(match: re.Match) -> str:
+    operator = match.group(1)
+    before = match.string[match.start() - 1].isdigit()
+    after = match.string[match.end()].isdigit()
+    # "and/or" and "well-known" stay as they are; "-" is only "minus" between two numbers
+    if not (before and after if operator == "-" else before or after):
+        return match.group(0)
+    return f" {MATH_SYMBOL_WORDS[operator]} "
+
+
+def normalize_tts_text(text: str, language: str = "EN") -> str:
+    """Spell out math, numbers and percentages and apply the story cleaning rules.
+
+    Both are English-only (the cleaning drops non-ASCII characters), so other
+    base speaker languages only get whitespace collapsed and leave numbers to
+    their own TTS front-end.
+    """
+    if language != "EN":
+        return re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"(?<=\d),(?=\d{3})", "", text)
+    text = re.sub(r"(\d)\s*%", r"\1 percent", text)
+    text = _MATH_EXPRESSION.sub(_spell_operator, text)
+    text = clean_story_text(text)
+    text = _NUMBER.sub(lambda match: _inflect.number_to_words(match.group(0), andword=""), text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Split at clause boundaries, then between words, so no chunk exceeds max_chars"""
+    chunks: List[str] = []
+    for clause in _CLAUSE_END.split(text):
+        current = ""
+        words = clause.split(" ")
+        # Unspaced scripts (Chinese) have no word boundaries to split at
+        words = [word[i:i + max_chars] for word in words for i in range(0, max(len(word), 1), max_chars)]
+        for word in words:
+            if current and len(current) + 1 + len(word) > max_chars:
+                chunks.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def split_tts_chunks(text: str, max_chars: int = TTS_CHUNK_MAX_CHARS) -> List[str]:
+    """Split text into sentence-sized chunks for synthesis"""
+    chunks: List[str] = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if not sentence:
+            continue
+        chunks.extend([sentence] if len(sentence) <= max_chars else _split_long(sentence, max_chars))
+    return chunks
+
+
+def crossfade_concat(
+    chunks: List[np.ndarray],
+    sample_rate: int,
+    speed: float = 1.0,
+    crossfade_seconds: float = TTS_CROSSFADE_SECONDS,
+    pause_seconds: float = TTS_PAUSE_SECONDS
+) -> np.ndarray:
+    """Join chunk audio with a short pause, fading across each boundary to avoid clicks"""
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    fade = int(crossfade_seconds * sample_rate)
+    pause = np.zeros(int(pause_seconds * sample_rate / (speed or 1.0)), dtype=np.float32)
+    output = np.asarray(chunks[0], dtype=np.float32).copy()
+    for chunk in chunks[1:]:
+        chunk = np.asarray(chunk, dtype=np.float32)
+        n = min(fade, len(output), len(chunk))
+        if n:
+            output[-n:] *= np.linspace(1.0, 0.0, n, dtype=np.float32)
+        output = np.concatenate([output, pause])
+        n = min(fade, len(output), len(chunk))
+        output[-n:] += chunk[:n] * np.linspace(0.0, 1.0, n, dtype=np.float32) if n else 0
+        output = np.concatenate([output, chunk[n:]])
+    return output
@@ -0,0 +1,23 @@
+import os
+
+
+VOICE_SERVICE = os.getenv("VOICE_SERVICE", "openvoice").lower()
+
+
+def create_voice_clone_service(backend: str = VOICE_SERVICE):
+    """Select the voice backend.
+
+    "openvoice" loads the models in this process, "stub" returns silence for
+    load testing, and "remote" forwards to a shared voice model server process.
+    """
+    backend = backend.lower()
+    if backend == "stub":
+        from services.stub_voice_clone_service import StubVoiceCloneService
+        return StubVoiceCloneService()
+    if backend == "remote":
+        from services.voice_model_server import RemoteVoiceCloneService
+        return RemoteVoiceCloneService()
+    if backend != "openvoice":
+        raise ValueError(f"Unknown VOICE_SERVICE: {backend}")
+    from services.voice_clone_service import VoiceCloneService
+    return VoiceCloneService()
@@ -1,4 +1,8 @@
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 import torch
 import base64
 import tempfile
@@ -12,39 +16,157 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'OpenVoice'))
 
 from OpenVoice.openvoice.api import BaseSpeakerTTS, ToneColorConverter
+from OpenVoice.openvoice.mel_processing import spectrogram_torch
+
+from services.base_speaker_registry import BaseSpeakerRegistry
+from services.checkpoints import load_checkpoint
+from services.metrics import CODEC_SECONDS, QUEUE_WAIT_SECONDS, VOICE_STAGE_SECONDS, timed
+from services.reference_audio import load_reference_audio
+from services.tts_text import crossfade_concat, normalize_tts_text, split_tts_chunks
+
+logger = logging.getLogger(__name__)
 
 
 class VoiceCloneService:
-    def __init__(self):
-        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    def __init__(self, device: Optional[str] = None):
+        self.device = device or ("cuda:0" if torch.cuda.is_available() else "cpu")
         self.base_path = os.path.join(os.path.dirname(__file__), '..', 'OpenVoice')
         self.output_dir = os.path.join(os.path.dirname(__file__), '..', 'outputs')
         
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
+
+        # The models are not safe to run from several threads at once
+        self._model_lock = threading.Lock()
         
         # Initialize models
         self._initialize_models()
     
     def _initialize_models(self):
         """Initialize the OpenVoice models"""
-        ckpt_base = os.path.join(self.base_path, 'checkpoints', 'base_speakers', 'EN')
         ckpt_converter = os.path.join(self.base_path, 'checkpoints', 'converter')
-        
-        # Initialize base speaker TTS
-        self.base_speaker_tts = BaseSpeakerTTS(
-            os.path.join(ckpt_base, 'config.json'), 
+
+        # Base speaker TTS models are loaded per language on first use
+        self.base_speakers = BaseSpeakerRegistry(
+            os.path.join(self.base_path, 'checkpoints', 'base_speakers'),
+            create_tts=lambda config_path, device: BaseSpeakerTTS(config_path, device=device),
             device=self.device
         )
-        self.base_speaker_tts.load_ckpt(os.path.join(ckpt_base, 'checkpoint.pth'))
-        
+        self.base_speakers.preload()
+
         # Initialize tone color converter
         self.tone_color_converter = ToneColorConverter(
             os.path.join(ckpt_converter, 'config.json'), 
             device=self.device
         )
-        self.tone_color_converter.load_ckpt(os.path.join(ckpt_converter, 'checkpoint.pth'))
+        load_checkpoint(self.tone_color_converter.model, os.path.join(ckpt_converter, 'checkpoint.pth'), self.device)
     
+    @contextmanager
+    def _models(self, stage: str):
+        """Hold the model lock for a stage, recording lock wait and stage time separately"""
+        start = time.perf_counter()
+        with self._model_lock:
+            QUEUE_WAIT_SECONDS.labels(queue="voice_model").observe(time.perf_counter() - start)
+            with timed(VOICE_STAGE_SECONDS, server_timing=stage, stage=stage):
+                yield
+
+    def supported_languages(self):
+        return self.base_speakers.languages()
+
+    def read_source_embedding(self, language: str = "English") -> torch.Tensor:
+        """Read a language's default base speaker embedding from its checkpoint"""
+        return self.base_speakers.read_source_embedding(language)
+
+    def load_source_embedding(self, language: str = "English") -> torch.Tensor:
+        """Default base speaker embedding of a language, kept with its loaded model"""
+        with timed(VOICE_STAGE_SECONDS, server_timing="load_source_se", stage="load_source_se"):
+            return self.base_speakers.get(language).source_se
+
+    def generate_base_audio(self, text: str, output_path: str, speed: float = 1.0, language: str = "English"):
+        """Speak text with the default base speaker of the language.
+
+        The text is normalized and split into sentence-sized chunks; each distinct
+        chunk is synthesized once and the pieces are joined with short crossfades.
+        """
+        with timed(VOICE_STAGE_SECONDS, server_timing="load_base_speaker", stage="load_base_speaker"):
+            base_speaker = self.base_speakers.get(language)
+        chunks = split_tts_chunks(normalize_tts_text(text, base_speaker.code))
+        if not chunks:
+            raise ValueError("No speakable text")
+
+        chunk_audio = {}
+        for chunk in dict.fromkeys(chunks):
+            with self._models("base_tts"):
+                chunk_audio[chunk] = base_speaker.tts.tts(
+                    chunk,
+                    None,
+                    speaker='default',
+                    language=base_speaker.tts_language,
+                    speed=speed
+                )
+        if len(chunk_audio) < len(chunks):
+            logger.debug("Synthesized %d unique of %d TTS chunks", len(chunk_audio), len(chunks))
+
+        sample_rate = base_speaker.tts.hps.data.sampling_rate
+        audio = crossfade_concat([chunk_audio[chunk] for chunk in chunks], sample_rate, speed)
+        sf.write(output_path, audio, sample_rate)
+
+    def extract_speaker_embedding(self, reference_audio_path: str) -> torch.Tensor:
+        """Extract the tone color embedding of a reference recording or preprocessed .npz"""
+        hps = self.tone_color_converter.hps
+        with timed(VOICE_STAGE_SECONDS, server_timing="load_reference", stage="load_reference"):
+            audio = load_reference_audio(reference_audio_path, hps.data.sampling_rate)
+        return self.extract_speaker_embedding_from_array(audio)
+
+    def extract_speaker_embedding_from_array(self, audio: np.ndarray) -> torch.Tensor:
+        """Tone color embedding of mono audio at the converter's sampling rate.
+
+        Same computation as ToneColorConverter.extract_se without decoding a file.
+        """
+        hps = self.tone_color_converter.hps
+        with self._models("extract_se"), torch.no_grad():
+            y = torch.FloatTensor(audio).to(self.device).unsqueeze(0)
+            spec = spectrogram_torch(
+                y,
+                hps.data.filter_length,
+                hps.data.sampling_rate,
+                hps.data.hop_length,
+                hps.data.win_length,
+                center=False
+            ).to(self.device)
+            embedding = self.tone_color_converter.model.ref_enc(spec.transpose(1, 2)).unsqueeze(-1)
+            return embedding.detach()
+
+    def convert_tone(self, base_audio_path: str, source_se: torch.Tensor, target_se: torch.Tensor, output_path: str):
+        """Re-voice base speaker audio with the target tone color"""
+        with self._models("tone_conversion"):
+            self.tone_color_converter.convert(
+                audio_src_path=base_audio_path,
+                src_se=source_se,
+                tgt_se=target_se,
+                output_path=output_path,
+                message="NeuroLearn AI Clone"
+            )
+
+    def synthesize_with_embedding(
+        self,
+        text: str,
+        target_se: torch.Tensor,
+        output_path: str,
+        speed: float = 1.0,
+        language: str = "English"
+    ) -> float:
+        """Speak text in the voice of a precomputed embedding and return the duration"""
+        source_se = self.load_source_embedding(language)
+        base_audio_path = f"{os.path.splitext(output_path)[0]}_base.wav"
+        try:
+            self.generate_base_audio(text, base_audio_path, speed=speed, language=language)
+            self.convert_tone(base_audio_path, source_se, target_se, output_path)
+            return sf.info(output_path).duration
+        finally:
+            if os.path.exists(base_audio_path):
+                os.remove(base_audio_path)
+
     def decode_audio_from_base64(self, audio_base64: str) -> str:
         """Decode base64 audio and save to temporary file"""
         try:
@@ -53,7 +175,8 @@ class VoiceCloneService:
                 audio_base64 = audio_base64.split(',')[1]
             
             # Decode base64
-            audio_data = base64.b64decode(audio_base64)
+            with timed(CODEC_SECONDS, operation="decode_reference_base64"):
+                audio_data = base64.b64decode(audio_base64)
             
             # Create temporary file
             temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
@@ -69,6 +192,7 @@ class VoiceCloneService:
         try:
             with open(audio_path, 'rb') as audio_file:
                 audio_data = audio_file.read()
+            with timed(CODEC_SECONDS, server_timing="encode_base64", operation="encode_audio_base64"):
                 return base64.b64encode(audio_data).decode('utf-8')
         except Exception as e:
             raise ValueError(f"Failed to encode audio: {str(e)}")
@@ -76,10 +200,11 @@ class VoiceCloneService:
     def get_audio_duration(self, audio_path: str) -> float:
         """Get audio duration in seconds"""
         try:
-            audio, sr = librosa.load(audio_path)
+            with timed(VOICE_STAGE_SECONDS, server_timing="audio_duration", stage="audio_duration"):
+                audio, sr = librosa.load(audio_path)
             return len(audio) / sr
         except Exception as e:
-            print(f"Warning: Could not get audio duration: {str(e)}")
+            logger.warning("Could not get audio duration: %s", e)
             return 0.0
     
     def clone_voice(
@@ -101,7 +226,7 @@ class VoiceCloneService:
         try:
             # Decode reference audio
             temp_ref_audio = self.decode_audio_from_base64(reference_audio_base64)
-            print(f"✅ Reference audio decoded to: {temp_ref_audio}")
+            logger.debug("✅ Reference audio decoded to: %s", temp_ref_audio)
             
             # Generate base audio with default speaker
             if output_filename is None:
@@ -115,46 +240,22 @@ class VoiceCloneService:
             
             base_audio_path = os.path.join(self.output_dir, f"base_{output_filename}")
             final_output_path = os.path.join(self.output_dir, output_filename)
-            print(f"🎯 Target paths - Base: {base_audio_path}, Final: {final_output_path}")
+            logger.debug("🎯 Target paths - Base: %s, Final: %s", base_audio_path, final_output_path)
             
             # Step 1: Generate base audio using default speaker
-            print("🔄 Step 1: Generating base audio...")
-            self.base_speaker_tts.tts(
-                text=text,
-                output_path=base_audio_path,
-                speaker='default',
-                language=language,
-                speed=speed
-            )
-            print(f"✅ Base audio generated: {os.path.exists(base_audio_path)}")
+            self.generate_base_audio(text, base_audio_path, speed=speed, language=language)
+            logger.debug("✅ Base audio generated")
             
             # Step 2: Extract speaker embedding from reference audio
-            print("🔄 Step 2: Extracting speaker embedding...")
-            reference_se = self.tone_color_converter.extract_se(
-                ref_wav_list=[temp_ref_audio],
-                se_save_path=None
-            )
-            print("✅ Speaker embedding extracted")
+            reference_se = self.extract_speaker_embedding(temp_ref_audio)
+            logger.debug("✅ Speaker embedding extracted")
             
             # Step 3: Load default source speaker embedding
-            print("🔄 Step 3: Loading source speaker embedding...")
-            ckpt_base = os.path.join(self.base_path, 'checkpoints', 'base_speakers', 'EN')
-            source_se = torch.load(
-                os.path.join(ckpt_base, 'en_default_se.pth'), 
-                map_location=self.device
-            )
-            print("✅ Source speaker embedding loaded")
+            source_se = self.load_source_embedding(language)
             
             # Step 4: Convert tone color
-            print("🔄 Step 4: Converting tone color...")
-            self.tone_color_converter.convert(
-                audio_src_path=base_audio_path,
-                src_se=source_se,
-                tgt_se=reference_se,
-                output_path=final_output_path,
-                message="NeuroLearn AI Clone"
-            )
-            print(f"✅ Tone conversion completed: {os.path.exists(final_output_path)}")
+            self.convert_tone(base_audio_path, source_se, reference_se, final_output_path)
+            logger.debug("✅ Tone conversion completed")
             
             # Encode final audio to base64
             audio_base64 = self.encode_audio_to_base64(final_output_path)
@@ -0,0 +1,207 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Any, Optional, Tuple
+
+
+# The socket lives in a directory only this user can enter, not in the shared temp directory itself
+VOICE_MODEL_SOCKET = os.getenv(
+    "VOICE_MODEL_SOCKET", os.path.join(tempfile.gettempdir(), f"neurolearn-voice-{os.getuid()}", "voice.sock")
+)
+# Shared secret for the socket; there is no default, since messages are unpickled. serve.py generates one.
+VOICE_MODEL_AUTHKEY = os.getenv("VOICE_MODEL_AUTHKEY", "")
+# Longest a worker waits for one voice call before giving up on a hung model server
+VOICE_MODEL_CALL_TIMEOUT_SECONDS = float(os.getenv("VOICE_MODEL_CALL_TIMEOUT_SECONDS", "300"))
+
+# Only these VoiceCloneService methods can be called over the socket
+REMOTE_METHODS = ("clone_voice", "extract_speaker_embedding", "synthesize_with_embedding")
+
+logger = logging.getLogger(__name__)
+
+
+def _authkey(authkey: str) -> bytes:
+    if not authkey:
+        raise ValueError("VOICE_MODEL_AUTHKEY must be set to use the voice model server (serve.py generates one)")
+    return authkey.encode("utf-8")
+
+
+def _private_socket_dir(address: str):
+    """Create the socket's directory with mode 0700, refusing one another user could reach"""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"Voice model socket directory {directory} belongs to another user")
+    if info.st_mode & 0o077:
+        os.chmod(directory, 0o700)
+
+
+def _move_tensors(values, device: str):
+    """Move tensor arguments or results between the caller's CPU and the model device"""
+    def move(value):
+        return value.to(device) if hasattr(value, "to") and hasattr(value, "device") else value
+    if isinstance(values, dict):
+        return {key: move(value) for key, value in values.items()}
+    if isinstance(values, (list, tuple)):
+        return type(values)(move(value) for value in values)
+    return move(values)
+
+
+class VoiceModelServer:
+    """Serves one voice service instance to API workers over a local socket.
+
+    The model weights are loaded once in this process; each worker connection
+    gets a thread, and the service's own model lock serializes inference.
+    """
+
+    def __init__(self, service, address: str = VOICE_MODEL_SOCKET, authkey: str = VOICE_MODEL_AUTHKEY):
+        self.service = service
+        self.address = address
+        self.authkey = _authkey(authkey)
+
+    def serve_forever(self):
+        _private_socket_dir(self.address)
+        if os.path.exists(self.address):
+            os.remove(self.address)
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            logger.info("🎙️ Voice model server listening on %s", self.address)
+            while True:
+                try:
+                    connection = listener.accept()
+                except (OSError, EOFError) as e:
+                    # A client that failed authentication must not stop the server
+                    logger.warning("Rejected voice model connection: %s", e)
+                    continue
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, args, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                connection.send(self._dispatch(method, args, kwargs))
+
+    def _dispatch(self, method: str, args: Tuple, kwargs: dict) -> Tuple[str, Any]:
+        if method == "ping":
+            return "ok", self.service.device
+        if method not in REMOTE_METHODS:
+            return "error", f"Method not available remotely: {method}"
+        try:
+            result = getattr(self.service, method)(
+                *_move_tensors(args, self.service.device), **_move_tensors(kwargs, self.service.device)
+            )
+            return "ok", _move_tensors(result, "cpu")
+        except Exception as e:
+            return "error", str(e)
+
+
+class RemoteVoiceCloneService:
+    """Drop-in VoiceCloneService that forwards calls to a VoiceModelServer.
+
+    Each calling thread keeps its own connection, so threadpool workers can
+    have requests in flight at the same time. Embeddings are exchanged on CPU.
+    """
+
+    device = "cpu"
+
+    def __init__(
+        self,
+        address: str = VOICE_MODEL_SOCKET,
+        authkey: str = VOICE_MODEL_AUTHKEY,
+        call_timeout: float = VOICE_MODEL_CALL_TIMEOUT_SECONDS
+    ):
+        self.address = address
+        self.authkey = _authkey(authkey)
+        self.call_timeout = call_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self._local.connection = connection
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def _request(self, method: str, args: Tuple, kwargs: dict, timeout: float):
+        try:
+            connection = self._connection()
+            connection.send((method, args, kwargs))
+            answered = connection.poll(timeout)
+            if answered:
+                status, result = connection.recv()
+        except (OSError, EOFError) as e:
+            # Reconnect on the next call, e.g. after a model server restart
+            self._drop_connection()
+            raise ConnectionError(f"Voice model server unavailable: {e}") from e
+        if not answered:
+            # A late reply would be read as the answer to the next call, so the connection goes
+            self._drop_connection()
+            raise TimeoutError(f"Voice model server did not answer {method} within {timeout:g}s")
+        if status != "ok":
+            raise Exception(result)
+        return result
+
+    def _call(self, method: str, *args, **kwargs):
+        return self._request(method, args, kwargs, self.call_timeout)
+
+    def wait_until_ready(self, timeout: float = 600.0, poll_interval: float = 0.5, process=None) -> str:
+        """Block until the model server answers, returning its device.
+
+        With the server's process given, fails as soon as it exits (e.g. on
+        missing checkpoints) instead of polling until the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if process is not None and not process.is_alive():
+                raise RuntimeError(f"Voice model server exited during startup (exit code {process.exitcode})")
+            try:
+                return self._request("ping", (), {}, poll_interval * 10)
+            except (ConnectionError, TimeoutError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(poll_interval)
+
+    def clone_voice(
+        self,
+        text: str,
+        reference_audio_base64: str,
+        speed: float = 1.0,
+        language: str = "English",
+        output_filename: Optional[str] = None
+    ) -> Tuple[str, str, float]:
+        return self._call(
+            "clone_voice",
+            text=text,
+            reference_audio_base64=reference_audio_base64,
+            speed=speed,
+            language=language,
+            output_filename=output_filename
+        )
+
+    def extract_speaker_embedding(self, reference_audio_path: str):
+        return self._call("extract_speaker_embedding", reference_audio_path)
+
+    def synthesize_with_embedding(self, text: str, target_se, output_path: str, speed: float = 1.0, language: str = "English") -> float:
+        return self._call(
+            "synthesize_with_embedding", text, target_se, output_path, speed=speed, language=language
+        )
+
+
+def run_model_server(backend: str, address: str = VOICE_MODEL_SOCKET, authkey: str = VOICE_MODEL_AUTHKEY):
+    """Process entry point: load the voice models once and serve them"""
+    from services.logging_setup import configure_logging
+    from services.voice_backends import create_voice_clone_service
+
+    configure_logging()
+    VoiceModelServer(create_voice_clone_service(backend), address, authkey).serve_forever()
@@ -0,0 +1,39 @@
+import pytest
+import torch
+
+from services.checkpoints import convert_checkpoint, load_checkpoint, read_state_dict
+
+
+class Opaque:
+    pass
+
+
+def test_reads_openvoice_checkpoints_memory_mapped(tmp_path):
+    path = str(tmp_path / "checkpoint.pth")
+    torch.save({"model": {"weight": torch.arange(4.0)}, "iteration": 7}, path)
+    state_dict = read_state_dict(path, mmap=True)
+    assert torch.equal(state_dict["weight"], torch.arange(4.0))
+
+    model = torch.nn.Linear(2, 2)
+    torch.save({"model": {"weight": torch.ones(2, 2), "bias": torch.zeros(2)}}, path)
+    load_checkpoint(model, path, "cpu")
+    assert torch.equal(model.weight, torch.ones(2, 2))
+    assert not model.training
+
+
+def test_pickled_objects_stop_startup_with_a_clear_error(tmp_path):
+    path = str(tmp_path / "checkpoint.pth")
+    torch.save({"model": {"weight": torch.ones(2)}, "extra": Opaque()}, path)
+    with pytest.raises(RuntimeError, match="weights_only"):
+        read_state_dict(path, mmap=True)
+    with pytest.raises(RuntimeError, match="weights_only"):
+        read_state_dict(path, mmap=False)
+
+
+def test_trusted_conversion_is_preferred_afterwards(tmp_path):
+    pytest.importorskip("safetensors")
+    path = str(tmp_path / "checkpoint.pth")
+    torch.save({"model": {"weight": torch.ones(2)}, "extra": Opaque()}, path)
+    converted = convert_checkpoint(path, trust_pickle=True)
+    assert converted.endswith("checkpoint.safetensors")
+    assert torch.equal(read_state_dict(path)["weight"], torch.ones(2))
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import orjson
+
+from models.requests import StoryGenerationRequest
+from services.artifact_store import ArtifactStore
+from services.lesson_pack import NARRATION, LessonPackBuilder, LessonPackIndex, PackManifest, load_plan, narration_id
+
+
+def write_plan(tmp_path, *entries) -> str:
+    path = tmp_path / "plan.jsonl"
+    path.write_bytes(b"\n".join(orjson.dumps(entry) for entry in entries) + b"\n")
+    return str(path)
+
+
+def build(tmp_path, plan, generate=None):
+    calls = []
+
+    async def default_generate(request):
+        calls.append(request)
+        return f"{request.student_name} learns {request.subject}."
+
+    builder = LessonPackBuilder(str(tmp_path / "pack"), generate or default_generate, ArtifactStore(str(tmp_path / "artifacts")))
+    summary = asyncio.run(builder.build(load_plan(plan)))
+    return summary, calls
+
+
+def test_plan_expands_subjects_and_voices_per_tenant(tmp_path):
+    items = load_plan(write_plan(
+        tmp_path,
+        {"tenant": "school-a", "student_name": "Ali", "subjects": ["addition", "subtraction"], "speaker_ids": ["v1", "v2"]},
+        {"student_name": "Maya", "subject": "counting"},
+    ))
+    assert [(item.tenant, item.request.subject, item.speaker_id) for item in items] == [
+        ("school-a", "addition", "v1"), ("school-a", "addition", "v2"),
+        ("school-a", "subtraction", "v1"), ("school-a", "subtraction", "v2"),
+        ("anonymous", "counting", None),
+    ]
+    # Voices of one story share its id
+    assert items[0].story_id == items[1].story_id != items[2].story_id
+
+
+def test_built_stories_are_served_to_their_tenant_only(tmp_path):
+    plan = write_plan(tmp_path, {"tenant": "school-a", "student_name": "Ali", "subjects": ["addition"]})
+    summary, calls = build(tmp_path, plan)
+    assert summary == {"planned": 1, "skipped": 0, "built": 1, "failed": 0}
+
+    index = LessonPackIndex([str(tmp_path / "pack")])
+    request = StoryGenerationRequest(student_name="Ali", subject="addition")
+    assert index.story_for(request, "school-a")["content"] == "Ali learns addition."
+    assert index.story_for(request, "school-b") is None
+    assert index.story_for(request, "anonymous") is None
+    assert index.story_for(request.model_copy(update={"previous_context": "Yesterday..."}), "school-a") is None
+
+    # Re-running the build resumes rather than regenerating
+    summary, calls = build(tmp_path, plan)
+    assert summary["skipped"] == 1 and not calls
+
+
+def test_failed_generation_is_not_recorded(tmp_path):
+    async def fail(request):
+        return "  "
+
+    plan = write_plan(tmp_path, {"student_name": "Ali", "subjects": ["addition"]})
+    summary, _ = build(tmp_path, plan, generate=fail)
+    assert summary["failed"] == 1
+    summary, calls = build(tmp_path, plan)
+    assert summary["built"] == 1 and len(calls) == 1
+
+
+def test_expired_stories_are_not_served_and_are_rebuilt(tmp_path, monkeypatch):
+    plan = write_plan(tmp_path, {"student_name": "Ali", "subjects": ["addition"]})
+    build(tmp_path, plan)
+    index = LessonPackIndex([str(tmp_path / "pack")])
+    request = StoryGenerationRequest(student_name="Ali", subject="addition")
+    assert index.story_for(request, "anonymous") is not None
+
+    later = time.time() + 121 * 86400
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert index.story_for(request, "anonymous") is None
+    summary, calls = build(tmp_path, plan)
+    assert summary["built"] == 1 and len(calls) == 1
+    assert LessonPackIndex([str(tmp_path / "pack")]).story_for(request, "anonymous") is not None
+
+
+def test_narration_of_an_earlier_story_version_is_not_served(tmp_path):
+    plan = write_plan(tmp_path, {"student_name": "Ali", "subjects": ["addition"]})
+    build(tmp_path, plan)
+    manifest = PackManifest(str(tmp_path / "pack"))
+    story = next(iter(manifest.stories.values()))
+    request = StoryGenerationRequest(student_name="Ali", subject="addition")
+    narration = {
+        "type": NARRATION,
+        "id": narration_id(request, "anonymous", "v1", 1.0, "English"),
+        "story_id": story["id"],
+        "story_built_at": story["built_at"],
+        "sentences": [],
+    }
+    manifest.append(narration)
+    index = LessonPackIndex([str(tmp_path / "pack")])
+    assert index.narration_for(request, "anonymous", "v1", 1.0, "English") is not None
+    assert index.narration_for(request, "school-a", "v1", 1.0, "English") is None
+
+    manifest.append({**narration, "story_built_at": story["built_at"] - 1})
+    assert LessonPackIndex([str(tmp_path / "pack")]).narration_for(request, "anonymous", "v1", 1.0, "English") is None
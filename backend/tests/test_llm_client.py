@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import orjson
+import pytest
+
+from services.llm_backends import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LatencyTracker, LLMUpstreamError
+from services.llm_client import LLMClient
+
+
+def make_breaker(**options) -> CircuitBreaker:
+    return CircuitBreaker("test", **{"window": 4, "min_calls": 4, "error_rate": 0.5, "open_seconds": 60, **options})
+
+
+def test_breaker_opens_on_failure_rate_and_probes_once():
+    breaker = make_breaker()
+    for success in (True, False, True, False):
+        breaker.record(breaker.acquire(), success)
+    assert breaker.state == OPEN
+    assert breaker.acquire() is None
+    assert breaker.retry_after() > 0
+
+    breaker._opened_at -= 60
+    probe = breaker.acquire()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert breaker.acquire() is None
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = make_breaker(slow_seconds=1.0)
+    for _ in range(4):
+        breaker.record(breaker.acquire(), True, seconds=2.0)
+    assert breaker.state == OPEN
+
+
+def test_only_the_probe_moves_a_half_open_circuit():
+    breaker = make_breaker()
+    stale = breaker.acquire()
+    for _ in range(4):
+        breaker.record(breaker.acquire(), False)
+    breaker._opened_at -= 60
+    probe = breaker.acquire()
+
+    # A call that started before the circuit opened finishes during the probe
+    breaker.record(stale, True)
+    assert breaker.state == HALF_OPEN
+    breaker.release(probe)
+    # A cancelled probe frees the slot for the next one
+    probe = breaker.acquire()
+    assert probe is not None
+    breaker.record(probe, False)
+    assert breaker.state == OPEN
+
+
+def test_hedge_delay_uses_the_quantile_once_there_are_enough_samples():
+    tracker = LatencyTracker()
+    assert tracker.hedge_delay("story") == 10.0
+    for seconds in range(1, 101):
+        tracker.observe("story", seconds / 10)
+    assert tracker.hedge_delay("story", quantile=0.95) == pytest.approx(9.6)
+
+
+class FakeBackendsClient(LLMClient):
+    """LLMClient whose backends answer after a fixed delay, or fail"""
+
+    def __init__(self, behaviours, hedge_delay=0.05):
+        super().__init__([url for url, _, _ in behaviours], hedge=True)
+        self.behaviours = {url: (delay, ok) for url, delay, ok in behaviours}
+        self.calls = []
+        self.cancelled = []
+        self.latencies.hedge_delay = lambda operation: hedge_delay
+
+    async def _post(self, backend, claim, content, timeout):
+        self.calls.append(backend.url)
+        delay, ok = self.behaviours[backend.url]
+        start = time.perf_counter()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(backend.url)
+            backend.breaker.release(claim)
+            raise
+        backend.breaker.record(claim, ok, time.perf_counter() - start)
+        if not ok:
+            raise ConnectionError(f"{backend.url} is down")
+        answer = {"choices": [{"message": {"content": backend.url}}]}
+        return orjson.dumps(answer)
+
+
+def complete(client: LLMClient) -> str:
+    payload = {"messages": [{"role": "user", "content": "Hi"}], "max_tokens": 8}
+    data = asyncio.run(client.chat_completion(payload, operation="test"))
+    return client.message_content(data)
+
+
+def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    client = FakeBackendsClient([("http://a", 1.0, True), ("http://b", 0.01, True)])
+    assert complete(client) == "http://b"
+    assert client.calls == ["http://a", "http://b"]
+    assert client.cancelled == ["http://a"]
+
+
+def test_fast_primary_is_not_hedged():
+    client = FakeBackendsClient([("http://a", 0.0, True), ("http://b", 0.0, True)])
+    assert complete(client) == "http://a"
+    assert client.calls == ["http://a"]
+
+
+def test_failed_primary_fails_over_straight_away():
+    client = FakeBackendsClient([("http://a", 0.0, False), ("http://b", 0.0, True)], hedge_delay=10.0)
+    assert complete(client) == "http://b"
+
+
+def test_all_backends_failing_raises_upstream_error():
+    client = FakeBackendsClient([("http://a", 0.0, False), ("http://b", 0.0, False)])
+    with pytest.raises(LLMUpstreamError) as error:
+        complete(client)
+    assert error.value.status_code == 503
+
+
+def test_open_circuits_are_skipped():
+    client = FakeBackendsClient([("http://a", 0.0, True), ("http://b", 0.0, True)])
+    client.backends[0].breaker._open()
+    assert complete(client) == "http://b"
+    client.backends[1].breaker._open()
+    with pytest.raises(LLMUpstreamError) as error:
+        complete(client)
+    assert error.value.retry_after > 0
@@ -0,0 +1,36 @@
+import time
+
+from services import profiling
+from services.profiling import ProfileStore, SamplingProfiler, is_admin_token
+
+
+def test_admin_token_comparison(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "s3cret")
+    assert is_admin_token("s3cret")
+    assert not is_admin_token("wrong")
+    assert not is_admin_token(None)
+    # Non-ASCII headers are a mismatch, not a TypeError
+    assert not is_admin_token("s3crét")
+
+
+def test_profiling_is_off_without_a_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_ADMIN_TOKEN", "")
+    assert not is_admin_token("")
+
+
+def test_sampler_records_busy_stacks_as_a_process_profile():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    deadline = time.monotonic() + 0.1
+    while time.monotonic() < deadline:
+        pass
+    profiler.stop()
+    assert profiler.samples > 0
+    assert "test_sampler_records_busy_stacks_as_a_process_profile" in profiler.collapsed()
+
+    store = ProfileStore(max_stored=1)
+    first = store.add(profiler, "first")
+    second = store.add(profiler, "second")
+    assert store.get(first) is None
+    assert store.get(second)["scope"] == "process"
+    assert [profile["label"] for profile in store.list()] == ["second"]
@@ -0,0 +1,58 @@
+import pytest
+
+from services.prompt_builder import (
+    PromptBuilder,
+    PromptTemplate,
+    SharedPrefixPrompt,
+    trim_to_token_budget,
+)
+
+
+def test_template_renders_like_str_format():
+    template = PromptTemplate('Hi {name}, schema: {{"a": 1}} {subject}')
+    assert template.fields == {"name", "subject"}
+    assert template.render(name="Ali", subject="addition") == 'Hi Ali, schema: {"a": 1} addition'
+
+
+def test_template_rejects_format_specs_and_missing_fields():
+    with pytest.raises(ValueError):
+        PromptTemplate("{name!r}")
+    with pytest.raises(KeyError):
+        PromptTemplate("{name} {subject}").render(name="Ali")
+
+
+def test_trim_prefers_sentence_boundaries():
+    text = "First sentence here. Second sentence that is much longer than the budget allows."
+    assert trim_to_token_budget(text, 8) == "First sentence here."
+    assert trim_to_token_budget(text, 0) == ""
+    assert trim_to_token_budget("short", 10) == "short"
+
+
+def test_optional_context_is_deduplicated_and_budgeted():
+    builder = PromptBuilder(
+        PromptTemplate("{memory}|{previous}"),
+        optional_fields=("memory", "previous"),
+        context_token_budget=10,
+        empty_value="none"
+    )
+    fitted = builder.fit_context({"memory": "Likes dogs.\nLikes dogs.", "previous": "likes dogs."})
+    assert fitted == {"memory": "Likes dogs.", "previous": "none"}
+
+    fitted = builder.fit_context({"memory": "x" * 100, "previous": "Went to the park."})
+    # The first field uses up the budget, so the next one is left out
+    assert fitted["memory"] == "x" * 40 + "..."
+    assert fitted["previous"] == "none"
+
+
+def test_unknown_optional_field_is_rejected():
+    with pytest.raises(ValueError):
+        PromptBuilder(PromptTemplate("{a}"), optional_fields=("b",))
+
+
+def test_shared_prefix_keeps_system_message_static():
+    prompt = SharedPrefixPrompt("story", "Static instructions", PromptBuilder(PromptTemplate("Name: {name}")))
+    first = prompt.messages({"name": "Ali"})
+    second = prompt.messages({"name": "Maya"})
+    assert first[0] == second[0] == {"role": "system", "content": "Static instructions"}
+    assert second[1]["content"] == "Name: Maya"
+    assert prompt.cache_key == SharedPrefixPrompt("story", "Static instructions", prompt.user_builder).cache_key
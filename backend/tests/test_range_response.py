@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+
+from services.range_response import RANGE_CHUNK_BYTES, ZEROCOPY_EXTENSION, FileRangeResponse, RangeNotSatisfiable, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" Bytes=5-9 ", (5, 9)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-9", "bytes=0-9,20-29", "bytes=abc-", "bytes=9-5", "bytes=-", "bytes=5"])
+def test_ignored_ranges_send_the_whole_file(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [("bytes=1000-", 1000), ("bytes=-0", 1000), ("bytes=-10", 0)])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, size)
+
+
+def respond(path, byte_range, extensions=None, method="GET"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    response = FileRangeResponse(path, os.stat(path), byte_range, media_type="audio/wav", method=method)
+    scope = {"type": "http", "extensions": extensions or {}}
+    asyncio.run(response(scope, None, send))
+    return response, messages
+
+
+def test_range_is_streamed_in_chunks(tmp_path):
+    path = tmp_path / "audio.wav"
+    data = os.urandom(RANGE_CHUNK_BYTES * 2 + 10)
+    path.write_bytes(data)
+
+    response, messages = respond(str(path), (5, RANGE_CHUNK_BYTES + 20))
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 5-{RANGE_CHUNK_BYTES + 20}/{len(data)}"
+    bodies = [message["body"] for message in messages[1:]]
+    assert len(bodies) == 2
+    assert b"".join(bodies) == data[5:RANGE_CHUNK_BYTES + 21]
+    assert messages[-1]["more_body"] is False
+
+
+def test_whole_file_and_head(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(b"0123456789")
+    response, messages = respond(str(path), None)
+    assert response.status_code == 200
+    assert response.headers["content-length"] == "10"
+    assert messages[1]["body"] == b"0123456789"
+
+    _, messages = respond(str(path), None, method="HEAD")
+    assert messages[1]["body"] == b""
+
+
+def test_zero_copy_send_is_used_when_offered(tmp_path):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(b"0123456789")
+    _, messages = respond(str(path), (2, 5), extensions={ZEROCOPY_EXTENSION: {}})
+    assert messages[1]["type"] == ZEROCOPY_EXTENSION
+    assert (messages[1]["offset"], messages[1]["count"]) == (2, 4)
@@ -0,0 +1,68 @@
+import asyncio
+
+import orjson
+
+from chains.story_generation_chain import StoryGenerationChain
+from models.requests import StoryGenerationRequest
+from services.student_memory_index import StudentMemoryIndex
+from services.tenant_quotas import TenantLease, _current_lease
+
+
+class FakeLLM:
+    def __init__(self):
+        self.payloads = []
+
+    async def chat_completion(self, payload, timeout=60.0, operation="story"):
+        self.payloads.append(payload)
+        story = {"title": "Stars", "content": f"Story {len(self.payloads)} about stars.", "characters": ["Ali"]}
+        return {"choices": [{"message": {"content": orjson.dumps(story).decode()}}]}
+
+
+def run_as(tenant, coroutine):
+    async def main():
+        token = _current_lease.set(TenantLease(None, tenant)) if tenant else None
+        try:
+            return await coroutine
+        finally:
+            if token is not None:
+                _current_lease.reset(token)
+
+    return asyncio.run(main())
+
+
+def user_message(payload) -> str:
+    return payload["messages"][-1]["content"]
+
+
+def test_chain_retrieves_and_stores_memories_per_tenant_and_student(tmp_path):
+    llm = FakeLLM()
+    index = StudentMemoryIndex(str(tmp_path / "memory.sqlite3"), embedding_model="")
+    chain = StoryGenerationChain(llm_client=llm, memory_index=index)
+
+    first = StoryGenerationRequest(
+        student_name="Ali", student_id="s1", subject="addition", memory_context="Ali is afraid of dogs."
+    )
+    story = run_as("school-a", chain.run(first))
+    assert story.content == "Story 1 about stars."
+    assert "afraid of dogs" in user_message(llm.payloads[0])
+
+    # The same student later gets the memory and the earlier story back
+    run_as("school-a", chain.run(StoryGenerationRequest(student_name="Ali", student_id="s1", subject="addition")))
+    assert "afraid of dogs" in user_message(llm.payloads[1])
+    assert "Story 1 about stars." in user_message(llm.payloads[1])
+
+    # Another tenant's student with the same name and id sees nothing
+    run_as("school-b", chain.run(StoryGenerationRequest(student_name="Ali", student_id="s1", subject="addition")))
+    assert "afraid of dogs" not in user_message(llm.payloads[2])
+
+
+def test_chain_without_student_id_or_tenant_skips_the_index(tmp_path):
+    llm = FakeLLM()
+    index = StudentMemoryIndex(str(tmp_path / "memory.sqlite3"), embedding_model="")
+    chain = StoryGenerationChain(llm_client=llm, memory_index=index)
+
+    run_as("school-a", chain.run(StoryGenerationRequest(student_name="Ali", subject="addition", memory_context="Likes cats.")))
+    run_as(None, chain.run(StoryGenerationRequest(student_name="Ali", student_id="s1", subject="addition")))
+    # The request's own memory is still used as-is, but nothing was indexed
+    assert "Likes cats." in user_message(llm.payloads[0])
+    assert index.search("school-a/s1", "addition") == []
@@ -0,0 +1,58 @@
+import asyncio
+
+from models.requests import StoryGenerationRequest
+from services.story_pregeneration_service import StoryPregenerationService, predict_follow_ups
+
+
+def request(**fields) -> StoryGenerationRequest:
+    return StoryGenerationRequest(**{"student_name": "Ali", "subject": "addition", **fields})
+
+
+async def pregenerate(service: StoryPregenerationService, observed: StoryGenerationRequest, tenant: str):
+    await service.start()
+    service.observe(observed, tenant)
+    await service._queue.join()
+
+
+def run_service(check):
+    async def main():
+        generated = []
+
+        async def generate(story_request):
+            generated.append(story_request)
+            return f"story for {story_request.subject}"
+
+        service = StoryPregenerationService(generate, is_idle=lambda: True, idle_poll_interval=0.01)
+        try:
+            await check(service, generated)
+        finally:
+            await service.stop()
+
+    asyncio.run(main())
+
+
+def test_follow_ups_drop_previous_context_and_move_to_the_next_topic():
+    follow_ups = predict_follow_ups(request(previous_context="Yesterday...", topic_to_be_reached="subtraction"))
+    assert [f.subject for f in follow_ups] == ["addition", "subtraction"]
+    assert all(f.previous_context is None for f in follow_ups)
+
+
+def test_pregenerated_story_is_served_once_to_the_same_tenant():
+    async def check(service, generated):
+        await pregenerate(service, request(), "school-a")
+        assert service.take(request(), "school-b") is None
+        assert service.take(request(), "school-a") == "story for addition"
+        assert service.take(request(), "school-a") is None
+
+    run_service(check)
+
+
+def test_continuations_students_and_memory_must_match():
+    async def check(service, generated):
+        await pregenerate(service, request(student_id="s1"), "school-a")
+        assert service.take(request(student_id="s2"), "school-a") is None
+        assert service.take(request(student_id="s1", previous_context="Then..."), "school-a") is None
+        assert service.take(request(student_id="s1", memory_context="Likes dogs."), "school-a") is None
+        assert service.take(request(student_id="s1"), "school-a") is not None
+
+    run_service(check)
@@ -0,0 +1,54 @@
+from models.requests import StoryGenerationRequest
+from services.story_similarity_cache import StorySimilarityCache, personalize, request_terms
+
+
+def make_request(**fields) -> StoryGenerationRequest:
+    return StoryGenerationRequest(**{"student_name": "Ali", "subject": "addition", **fields})
+
+
+def test_request_terms_normalize_synonyms_numbers_and_filler():
+    assert request_terms(make_request(subject="Adding numbers", topic_to_be_reached="up to 10")) == {"add", "ten"}
+    assert request_terms(make_request(subject="addition", topic_to_be_reached="1-10")) == {"add", "one", "ten"}
+
+
+def test_similar_request_hits_once_per_student():
+    cache = StorySimilarityCache("test", threshold=0.5)
+    cache.store(make_request(topic_to_be_reached="1-10"), "Ali adds apples.", "school-a")
+
+    # The student the story was made for does not get it again
+    assert cache.lookup(make_request(subject="adding", topic_to_be_reached="up to ten"), "school-a") is None
+    request = make_request(student_name="Maya", subject="adding", topic_to_be_reached="up to ten")
+    cached_request, story = cache.lookup(request, "school-a")
+    assert personalize(story, cached_request, request) == "Maya adds apples."
+    assert cache.lookup(request, "school-a") is None
+
+
+def test_stories_stay_within_their_tenant():
+    cache = StorySimilarityCache("test")
+    cache.store(make_request(), "Ali adds apples.", "school-a")
+    assert cache.lookup(make_request(student_name="Maya"), "school-b") is None
+    assert cache.lookup(make_request(student_name="Maya"), None) is None
+    assert cache.lookup(make_request(student_name="Maya"), "school-a") is not None
+
+    # Background work has no tenant and is not cached
+    cache.store(make_request(subject="fractions"), "Ali cuts a pie.", None)
+    assert cache.lookup(make_request(student_name="Maya", subject="fractions"), "school-a") is None
+
+
+def test_character_count_mismatch_is_a_miss():
+    cache = StorySimilarityCache("test")
+    cache.store(make_request(characters=["astronaut", "Maya"]), "Ali, an astronaut and Maya add stars.", "school-a")
+    assert cache.lookup(make_request(student_name="Sam", characters=["elephant"]), "school-a") is None
+    assert cache.lookup(make_request(student_name="Sam"), "school-a") is None
+
+    request = make_request(student_name="Sam", characters=["elephant", "Leo"])
+    cached_request, story = cache.lookup(request, "school-a")
+    assert personalize(story, cached_request, request) == "Sam, an elephant and Leo add stars."
+
+
+def test_personal_context_is_never_cached_or_served():
+    cache = StorySimilarityCache("test")
+    cache.store(make_request(memory_context="Likes dogs."), "Ali and the dog add bones.", "school-a")
+    assert cache.lookup(make_request(student_name="Maya"), "school-a") is None
+    cache.store(make_request(), "Ali adds apples.", "school-a")
+    assert cache.lookup(make_request(student_name="Maya", previous_context="Yesterday..."), "school-a") is None
@@ -0,0 +1,70 @@
+import pytest
+
+from models.requests import StoryGenerationRequest
+from services.story_templates import (
+    ADDITION,
+    COUNTING,
+    STORY_TEMPLATES_SATURATION_IN_FLIGHT,
+    SUBTRACTION,
+    recognize_concept,
+    render_story,
+    template_story,
+)
+
+
+def make_request(subject: str, **fields) -> StoryGenerationRequest:
+    return StoryGenerationRequest(**{"student_name": "Ali", "subject": subject, **fields})
+
+
+@pytest.mark.parametrize("subject, expected", [
+    ("addition up to 10", (ADDITION, 10)),
+    ("Adding numbers", (ADDITION, 5)),
+    ("take away within ten", (SUBTRACTION, 10)),
+    ("counting to 3", (COUNTING, 3)),
+    ("single digit addition", (ADDITION, 9)),
+    ("addition to 2", (ADDITION, 3)),
+])
+def test_recognized_concepts(subject, expected):
+    assert recognize_concept(make_request(subject)) == expected
+
+
+@pytest.mark.parametrize("subject", [
+    "adding two-digit numbers",
+    "sum of angles in a triangle",
+    "count by tens",
+    "addition and subtraction",
+    "addition up to 100",
+    "fractions",
+])
+def test_anything_beyond_a_simple_concept_goes_to_the_llm(subject):
+    assert recognize_concept(make_request(subject)) is None
+
+
+def test_topic_must_be_simple_too():
+    assert recognize_concept(make_request("addition", topic_to_be_reached="carrying")) is None
+
+
+def test_same_request_same_story_and_new_context_new_story():
+    request = make_request("addition up to 10", characters=["Robot", "Maya"])
+    story = render_story(request)
+    assert story == render_story(request)
+    assert "Ali the robot" in story
+    assert render_story(make_request("fractions")) is None
+    stories = {render_story(request.model_copy(update={"previous_context": str(i)})) for i in range(10)}
+    assert len(stories) > 1
+    # Names become the friend in templates that have one
+    assert any("Maya" in story for story in stories)
+
+
+def test_template_story_reports_why_it_was_used():
+    request = make_request("addition up to 10")
+    continuation = make_request("addition up to 10", previous_context="Yesterday...")
+    saturated = STORY_TEMPLATES_SATURATION_IN_FLIGHT
+
+    assert template_story(request, 0, mode="concepts")[1] == "concept"
+    assert template_story(continuation, 0, mode="concepts") is None
+    assert template_story(continuation, saturated, mode="concepts")[1] == "saturated"
+    assert template_story(request, 0, mode="fallback") is None
+    assert template_story(request, saturated, mode="fallback")[1] == "saturated"
+    assert template_story(request, saturated, mode="off") is None
+    assert template_story(make_request("fractions"), saturated, mode="fallback") is None
@@ -0,0 +1,45 @@
+from models.requests import StoryGenerationRequest
+from services.student_memory_index import StudentMemoryIndex, split_snippets, student_key
+
+
+def make_index(tmp_path) -> StudentMemoryIndex:
+    return StudentMemoryIndex(str(tmp_path / "memory.sqlite3"), embedding_model="")
+
+
+def test_student_key_needs_an_id_and_a_tenant():
+    request = StoryGenerationRequest(student_name="Ali", student_id=" s1 ", subject="addition")
+    assert student_key(request, "school-a") == "school-a/s1"
+    assert student_key(request, None) is None
+    assert student_key(StoryGenerationRequest(student_name="Ali", subject="addition"), "school-a") is None
+
+
+def test_split_snippets_keeps_sentences_under_the_limit():
+    text = "One. Two. Three.\nFour."
+    assert split_snippets(text, max_chars=9) == ["One. Two.", "Three.", "Four."]
+    assert split_snippets(None) == []
+
+
+def test_add_skips_snippets_already_stored(tmp_path):
+    index = make_index(tmp_path)
+    assert index.add("a/s1", "Likes dogs. Fears the dark.") == 1
+    assert index.add("a/s1", "likes dogs. fears the dark.") == 0
+    assert index.add("a/s2", "Likes dogs. Fears the dark.") == 1
+
+
+def test_search_ranks_matches_and_keeps_students_apart(tmp_path):
+    index = make_index(tmp_path)
+    index.add("a/s1", "Loves dinosaurs.\nHas a cat named Tom.\nStruggles with carrying in addition.")
+    index.add("b/s1", "Loves trains.")
+    assert index.search("a/s1", "addition", top_k=1) == ["Struggles with carrying in addition."]
+    assert "Loves trains." not in index.search("a/s1", "trains", top_k=5)
+
+
+def test_context_for_indexes_the_request_and_respects_the_budget(tmp_path):
+    index = make_index(tmp_path)
+    request = StoryGenerationRequest(
+        student_name="Ali", student_id="s1", subject="addition", memory_context="Counts on fingers when adding."
+    )
+    assert "Counts on fingers" in index.context_for("a/s1", request)
+    index.add_story("a/s1", "Ali and the robot added apples. " * 20)
+    context = index.context_for("a/s1", request, token_budget=10)
+    assert len(context) <= 10 * 4 + 3
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services.tenant_quotas import (
+    LLM_TOKENS,
+    FairQueue,
+    TenantLease,
+    TenantQuotas,
+    TokenBucket,
+    parse_weights,
+)
+
+
+def test_parse_weights_ignores_malformed_items():
+    assert parse_weights("a=2, b = 0.5,junk,*=1") == {"a": 2.0, "b": 0.5, "*": 1.0}
+    assert parse_weights("") == {}
+
+
+def test_token_bucket_waits_and_caps_requests_at_capacity():
+    bucket = TokenBucket(rate=10.0, capacity=100.0)
+    assert bucket.wait_time(100) == 0
+    bucket.take(1000)
+    # Requests above capacity only drain the bucket once
+    assert bucket.tokens == pytest.approx(0.0, abs=0.1)
+    assert bucket.wait_time(50) == pytest.approx(5.0, abs=0.1)
+    bucket.adjust(-30)
+    assert bucket.wait_time(50) == pytest.approx(2.0, abs=0.1)
+
+
+def test_admit_raises_429_without_charging_anything():
+    quotas = TenantQuotas(llm_tokens_per_minute=60, llm_burst_tokens=100, tts_seconds_per_minute=60, tts_burst_seconds=10)
+    quotas.admit("a", {LLM_TOKENS: 100})
+    with pytest.raises(HTTPException) as error:
+        quotas.admit("a", {LLM_TOKENS: 50, "tts_seconds": 5})
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) >= 1
+    # The TTS budget was not touched by the rejected request, and other tenants are unaffected
+    assert quotas.bucket("a", "tts_seconds").tokens == pytest.approx(10)
+    quotas.admit("b", {LLM_TOKENS: 100})
+
+
+def test_weights_scale_budgets():
+    quotas = TenantQuotas(llm_burst_tokens=100, weights="big=3")
+    assert quotas.bucket("big", LLM_TOKENS).capacity == 300
+    assert quotas.bucket("small", LLM_TOKENS).capacity == 100
+
+
+def test_lease_settles_estimates_against_usage():
+    quotas = TenantQuotas(llm_tokens_per_minute=0.001, llm_burst_tokens=1000)
+    lease = TenantLease(quotas, "a")
+    lease.admit(llm_tokens=600)
+    lease.record(LLM_TOKENS, 100)
+    lease.settle()
+    assert quotas.bucket("a", LLM_TOKENS).tokens == pytest.approx(900, abs=1)
+
+
+def test_fair_queue_serves_waiting_tenants_in_start_tag_order():
+    async def main():
+        queue = FairQueue("test", capacity=1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with queue.slot("busy", 1.0, 1.0):
+                await release.wait()
+
+        async def work(tenant):
+            async with queue.slot(tenant, 1.0, 1.0):
+                order.append(tenant)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        # A tenant with a backlog queues first, then a quiet tenant arrives
+        tasks = [asyncio.create_task(work("busy")) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(work("quiet")))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        assert queue.active == 0
+        return order
+
+    order = asyncio.run(main())
+    # The quiet tenant goes ahead of the backlog queued before it
+    assert order == ["quiet", "busy", "busy", "busy"]
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    async def main():
+        queue = FairQueue("test", capacity=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with queue.slot("a", 1.0, 1.0):
+                await release.wait()
+
+        async def wait():
+            async with queue.slot("b", 1.0, 1.0):
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await holder
+        await asyncio.gather(waiter, return_exceptions=True)
+        return queue.active
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,39 @@
+import numpy as np
+
+from services.tts_text import crossfade_concat, normalize_tts_text, split_tts_chunks
+
+
+def test_english_math_and_numbers_are_spelled_out():
+    assert normalize_tts_text("Ali had 3 + 2 = 5 apples, 50% of 1,000.") == (
+        "Ali had three plus two equals five apples, fifty percent of one thousand."
+    )
+    # Hyphens and slashes in prose are not operators
+    assert normalize_tts_text("A well-known and/or story") == "A well-known and/or story"
+
+
+def test_other_languages_are_left_to_their_front_end():
+    text = "小明有两颗星星。他又找到了2颗。"
+    assert normalize_tts_text(text, "ZH") == text
+
+
+def test_chunks_follow_sentences_and_respect_the_limit():
+    assert split_tts_chunks("Hello there. How are you? Fine, thanks.") == ["Hello there.", "How are you?", "Fine, thanks."]
+    long_sentence = ", ".join(["one two three four"] * 20) + "."
+    chunks = split_tts_chunks(long_sentence, max_chars=40)
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks) == long_sentence
+
+
+def test_unspaced_text_splits_on_full_width_punctuation_and_length():
+    assert split_tts_chunks("小明有两颗星星。他又找到了2颗。") == ["小明有两颗星星。", "他又找到了2颗。"]
+    chunks = split_tts_chunks("一" * 450, max_chars=200)
+    assert [len(chunk) for chunk in chunks] == [200, 200, 50]
+
+
+def test_crossfade_keeps_the_expected_length():
+    sample_rate = 1000
+    chunks = [np.ones(100, dtype=np.float32), np.ones(100, dtype=np.float32)]
+    audio = crossfade_concat(chunks, sample_rate, crossfade_seconds=0.01, pause_seconds=0.05)
+    # The pause is added once and the crossfade overlaps 10 samples
+    assert len(audio) == 100 + 50 + 100 - 10
+    assert crossfade_concat([], sample_rate).size == 0
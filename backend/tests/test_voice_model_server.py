@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import pytest
+
+from services.voice_model_server import RemoteVoiceCloneService, VoiceModelServer
+
+
+class EchoService:
+    device = "cpu"
+
+    def synthesize_with_embedding(self, text, target_se, output_path, speed=1.0, language="English"):
+        return float(len(text))
+
+
+class ExitedProcess:
+    exitcode = 3
+
+    def is_alive(self):
+        return False
+
+
+def test_authkey_is_required(tmp_path):
+    address = str(tmp_path / "voice.sock")
+    with pytest.raises(ValueError):
+        RemoteVoiceCloneService(address, "")
+    with pytest.raises(ValueError):
+        VoiceModelServer(EchoService(), address, "")
+
+
+def test_calls_are_forwarded_to_the_server(tmp_path):
+    address = str(tmp_path / "private" / "voice.sock")
+    server = VoiceModelServer(EchoService(), address, "key")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = RemoteVoiceCloneService(address, "key")
+    assert client.wait_until_ready(timeout=5, poll_interval=0.05) == "cpu"
+    assert client.synthesize_with_embedding("hello", None, "out.wav") == 5.0
+    assert os.stat(os.path.dirname(address)).st_mode & 0o077 == 0
+
+
+def test_hung_server_times_out(tmp_path):
+    address = str(tmp_path / "voice.sock")
+    listener = Listener(address, family="AF_UNIX", authkey=b"key")
+    accepted = []
+    # Accepts the connection but never answers
+    threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True).start()
+    client = RemoteVoiceCloneService(address, "key", call_timeout=0.2)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        client.synthesize_with_embedding("hello", None, "out.wav")
+    assert time.monotonic() - start < 2
+    listener.close()
+
+
+def test_startup_fails_fast_when_the_server_process_dies(tmp_path):
+    client = RemoteVoiceCloneService(str(tmp_path / "voice.sock"), "key")
+    with pytest.raises(RuntimeError, match="exit code 3"):
+        client.wait_until_ready(timeout=60, process=ExitedProcess())